@@ -0,0 +1,73 @@
+"""
+Compare the write_readline round trip of the sockio backends:
+sockio.aio (asyncio) and sockio.anyio (on asyncio and on trio).
+
+The simulator runs in a separate thread (its own asyncio loop) so every
+backend talks to the same server:
+
+    python benchmarks/bench_backends.py -n 20000
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+import sockio.sio
+from sockio.sim import Simulator
+
+REQUEST = b"*idn?\n"
+TABLE = {"*idn?": "ACME, bla ble ble, 1234, 5678"}
+
+
+async def measure(sock, n):
+    await sock.write_readline(REQUEST)
+    start = time.perf_counter()
+    for _ in range(n):
+        await sock.write_readline(REQUEST)
+    dt = time.perf_counter() - start
+    await sock.close()
+    return dt / n
+
+
+def run_aio(address, n):
+    from sockio.aio import TCP
+
+    return asyncio.run(measure(TCP(*address), n))
+
+
+def run_anyio(address, n, backend):
+    import anyio
+    from sockio.anyio import TCP
+
+    return anyio.run(measure, TCP(*address), n, backend=backend)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=20000, help="calls per backend")
+    options = parser.parse_args(args)
+    loop = sockio.sio.DefaultEventLoop
+    sim = loop.run_coroutine(Simulator(TABLE).start()).result()
+    runs = [("aio (asyncio)", run_aio, ())]
+    try:
+        import anyio  # noqa: F401
+
+        runs.append(("anyio (asyncio)", run_anyio, ("asyncio",)))
+        runs.append(("anyio (trio)", run_anyio, ("trio",)))
+    except ImportError:
+        print("anyio not installed: skipping anyio backend")
+    print("{:<16} {:>10} {:>12}".format("backend", "us/call", "calls/s"))
+    for name, func, extra in runs:
+        try:
+            dt = func(sim.address, options.n, *extra)
+        except ImportError as error:
+            print("{:<16} skipped ({})".format(name, error))
+            continue
+        print("{:<16} {:>10.2f} {:>12.0f}".format(name, dt * 1e6, 1 / dt))
+    loop.run_coroutine(sim.stop()).result()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
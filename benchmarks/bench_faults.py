@@ -0,0 +1,104 @@
+"""
+Cost of sockio failure handling (auto-reconnect, close-on-error, timeouts)
+under injected network faults.
+
+For each scenario a client loops on TCP.write_readline against a local
+simulator through a sockio.faults.FaultProxy which plays a fault schedule.
+For each scenario the number of failed calls and the recovery time (from
+the first failed call to the next successful one) are reported:
+
+    python benchmarks/bench_faults.py --timeout 0.1 --duration 2
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+from sockio.aio import TCP
+from sockio.cli import LatencyHistogram, format_time
+from sockio.faults import FaultProxy, Reset, Restart, Resume, Shape, Stall
+from sockio.sim import Simulator
+
+REQUEST = b"*idn?\n"
+TABLE = {"*idn?": "ACME, bla ble ble, 1234, 5678"}
+
+SCENARIOS = {
+    "baseline": [],
+    "reset": [(0.5, Reset())],
+    "reset mid-reply": [(0.5, Reset(after=5))],
+    "restart 0.3s": [(0.5, Restart(0.3))],
+    "stall 0.3s": [(0.5, Stall(0.3))],
+    "half-open 0.5s": [(0.5, Stall()), (1.0, Resume())],
+    "slow drip": [(0.5, Shape(bandwidth=2000, fragment=1)), (1.0, Shape())],
+    "latency 10ms": [(0.5, Shape(latency=0.01)), (1.0, Shape())],
+}
+
+
+async def run_scenario(address, schedule, duration, timeout, connection_timeout):
+    async with FaultProxy(*address, schedule=schedule) as proxy:
+        sock = TCP(
+            *proxy.address, timeout=timeout, connection_timeout=connection_timeout
+        )
+        histogram, failed, recoveries = LatencyHistogram(), 0, []
+        failed_since = None
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            try:
+                await sock.write_readline(REQUEST)
+            except (ConnectionError, OSError):
+                failed += 1
+                if failed_since is None:
+                    failed_since = start
+                await asyncio.sleep(0.001)
+                continue
+            now = time.perf_counter()
+            histogram.record(now - start)
+            if failed_since is not None:
+                recoveries.append(now - failed_since)
+                failed_since = None
+        await sock.close()
+    return dict(
+        calls=histogram.count,
+        failed=failed,
+        reconnects=max(sock.connection_counter - 1, 0),
+        recovery=max(recoveries) if recoveries else float("nan"),
+        histogram=histogram,
+    )
+
+
+async def run(duration, timeout, connection_timeout, names):
+    async with Simulator(TABLE) as sim:
+        for name in names:
+            result = await run_scenario(
+                sim.address, SCENARIOS[name], duration, timeout, connection_timeout
+            )
+            print("{:<16} {calls:>8} {failed:>7} {reconnects:>10} {:>10} {:>10}".format(
+                name, format_time(result["recovery"]),
+                format_time(result["histogram"].percentile(99)), **result
+            ))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duration", type=float, default=2.0, help="per scenario (s)")
+    parser.add_argument("--timeout", type=float, default=0.1, help="call timeout (s)")
+    parser.add_argument("--connection-timeout", type=float, default=0.1)
+    parser.add_argument("scenario", nargs="*",
+                        help="scenarios to run (default: all): " + ", ".join(SCENARIOS))
+    options = parser.parse_args(args)
+    names = options.scenario or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error("unknown scenario(s): {}".format(", ".join(sorted(unknown))))
+    print("{:<16} {:>8} {:>7} {:>10} {:>10} {:>10}".format(
+        "scenario", "ok", "failed", "reconnects", "recovery", "p99"
+    ))
+    coro = run(options.duration, options.timeout, options.connection_timeout, names)
+    asyncio.run(coro)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Compare the socket tuning profiles: write_readline round trip (REQ-REP
+latency, against the simulator) and bulk writelines throughput (against a
+server discarding everything it receives).
+
+    python benchmarks/bench_profiles.py -n 20000 --size 64 --mb 256
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+from sockio.aio import TCP
+from sockio.sim import Simulator
+
+REQUEST = b"*idn?\n"
+TABLE = {"*idn?": "ACME, bla ble ble, 1234, 5678"}
+PROFILES = [None, "lowlatency", "throughput", "bulk"]
+
+
+async def discard(reader, writer):
+    try:
+        while await reader.read(2 ** 20):
+            pass
+    except asyncio.CancelledError:
+        pass  # server stopped
+    finally:
+        writer.close()
+
+
+async def latency(address, profile, n):
+    sock = TCP(*address, profile=profile)
+    await sock.write_readline(REQUEST)
+    start = time.perf_counter()
+    for _ in range(n):
+        await sock.write_readline(REQUEST)
+    dt = time.perf_counter() - start
+    await sock.close()
+    return dt / n
+
+
+async def throughput(address, profile, size, total):
+    sock = TCP(*address, profile=profile)
+    await sock.open()
+    lines = [b"x" * (size - 1) + b"\n"] * (2 ** 20 // size)
+    chunk = len(lines) * size
+    start = time.perf_counter()
+    for _ in range(total // chunk):
+        await sock.writelines(lines)
+    dt = time.perf_counter() - start
+    await sock.close()
+    return (total // chunk) * chunk / dt
+
+
+async def run(options):
+    sim = await Simulator(TABLE).start()
+    server = await asyncio.start_server(discard, "127.0.0.1", 0)
+    sink = server.sockets[0].getsockname()[:2]
+    total = options.mb * 2 ** 20
+    print("{:<12} {:>10} {:>12}".format("profile", "us/call", "MB/s"))
+    try:
+        for profile in PROFILES:
+            dt = await latency(sim.address, profile, options.n)
+            rate = await throughput(sink, profile, options.size, total)
+            print("{:<12} {:>10.2f} {:>12.1f}".format(
+                str(profile), dt * 1e6, rate / 2 ** 20
+            ))
+    finally:
+        await sim.stop()
+        server.close()
+        await server.wait_closed()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=20000, help="calls per profile")
+    parser.add_argument("--size", type=int, default=64, help="bulk line size (bytes)")
+    parser.add_argument("--mb", type=int, default=256, help="bulk MB per profile")
+    asyncio.run(run(parser.parse_args(args)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Tail latency of the blocking client (sockio.py2.TCP) write_readline round
+trip with and without busy polling (spin mode).
+
+The server is a minimal blocking line server running in a separate process
+(so the spinning client doesn't compete with it for the GIL):
+
+    python benchmarks/bench_spin.py -n 50000 --spin 20 100
+"""
+
+import sys
+import time
+import socket
+import argparse
+import multiprocessing
+
+from sockio.py2 import TCP
+
+REQUEST = b"*idn?\n"
+REPLY = b"ACME, bla ble ble, 1234, 5678\n"
+
+
+def serve(listener):
+    while True:
+        conn, _ = listener.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        fobj = conn.makefile("rb")
+        with conn:
+            for _ in iter(fobj.readline, b""):
+                conn.sendall(REPLY)
+
+
+def measure(address, spin, n):
+    sock = TCP(*address, spin=spin)
+    for _ in range(1000):
+        sock.write_readline(REQUEST)
+    times = []
+    clock = time.perf_counter
+    for _ in range(n):
+        start = clock()
+        sock.write_readline(REQUEST)
+        times.append(clock() - start)
+    conn = sock.conn
+    hits = getattr(conn, "spin_hits", 0), getattr(conn, "spin_misses", 0)
+    sock.close()
+    times.sort()
+    return times, hits
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=50000, help="calls per mode")
+    parser.add_argument(
+        "--spin", type=float, nargs="+", default=[20, 100], help="spin budgets (us)"
+    )
+    options = parser.parse_args(args)
+    listener = socket.create_server(("127.0.0.1", 0))
+    server = multiprocessing.Process(target=serve, args=(listener,), daemon=True)
+    server.start()
+    address = listener.getsockname()
+    header = "{:<10} {:>8} {:>8} {:>8} {:>8} {:>8} {:>7}"
+    print(header.format("spin (us)", "p50", "p90", "p99", "p99.9", "max", "hits %"))
+    try:
+        for spin in [None] + options.spin:
+            times, (hits, misses) = measure(address, spin and spin * 1e-6, options.n)
+            n = len(times)
+            pcts = [times[int(n * p)] * 1e6 for p in (0.5, 0.9, 0.99, 0.999)]
+            ratio = 100 * hits / (hits + misses) if hits + misses else 0
+            print(
+                "{:<10} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>7.1f}".format(
+                    str(spin), *pcts, times[-1] * 1e6, ratio
+                )
+            )
+    finally:
+        server.terminate()
+        listener.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
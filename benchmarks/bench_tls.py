@@ -0,0 +1,106 @@
+"""
+TLS reconnect latency (open + first write_readline) with and without
+session resumption, against a local server using a self-signed
+certificate (generated with openssl):
+
+    python benchmarks/bench_tls.py -n 500 --openssl /usr/bin/openssl
+"""
+
+import os
+import ssl
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from sockio.aio import TCP
+from sockio.tls import ResumingContext
+
+REQUEST = b"*idn?\n"
+REPLY = b"ACME, bla ble ble, 1234, 5678\n"
+
+
+def self_signed(openssl, directory):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [openssl, "req", "-x509", "-newkey", "ec", "-pkeyopt",
+         "ec_paramgen_curve:prime256v1", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+async def handle(reader, writer):
+    try:
+        while await reader.readline():
+            writer.write(REPLY)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def reconnect(address, context, n):
+    sock = TCP(*address, ssl=context)
+    await sock.write_readline(REQUEST)
+    times = []
+    for _ in range(n):
+        await sock.close()
+        start = time.perf_counter()
+        await sock.write_readline(REQUEST)  # auto-reconnect
+        times.append(time.perf_counter() - start)
+    await sock.close()
+    times.sort()
+    return times, sock.stats()
+
+
+async def run(options, cert, key):
+    server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_context.load_cert_chain(cert, key)
+    tls_server = await asyncio.start_server(
+        handle, "127.0.0.1", 0, ssl=server_context
+    )
+    tcp_server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    tls_address = tls_server.sockets[0].getsockname()[:2]
+    tcp_address = tcp_server.sockets[0].getsockname()[:2]
+    client_context = ssl.create_default_context(cafile=cert)
+    modes = [
+        ("tcp", tcp_address, None),
+        ("tls full", tls_address, ResumingContext(client_context, resume=False)),
+        ("tls resumed", tls_address, ResumingContext(client_context)),
+    ]
+    print("{:<12} {:>9} {:>9} {:>9} {:>8}".format(
+        "mode", "mean us", "p50 us", "p99 us", "resumed"
+    ))
+    try:
+        for name, address, context in modes:
+            times, stats = await reconnect(address, context, options.n)
+            n = len(times)
+            print("{:<12} {:>9.1f} {:>9.1f} {:>9.1f} {:>8}".format(
+                name, sum(times) / n * 1e6, times[n // 2] * 1e6,
+                times[int(n * 0.99)] * 1e6, stats.get("tls_resumed", "-"),
+            ))
+    finally:
+        for server in (tls_server, tcp_server):
+            server.close()
+            await server.wait_closed()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=500, help="reconnections per mode")
+    parser.add_argument("--openssl", default="openssl", help="openssl executable")
+    options = parser.parse_args(args)
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = self_signed(options.openssl, directory)
+        asyncio.run(run(options, cert, key))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
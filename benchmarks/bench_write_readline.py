@@ -0,0 +1,92 @@
+"""
+Micro benchmark of the sockio per call overhead on TCP.write_readline.
+
+A trivial loopback server replies to every line. The same request is
+timed using raw asyncio streams and using sockio.aio.TCP (with and
+without a timeout). The difference is the price paid for sockio
+(lock, auto-reconnect check, timeout, EOF handling).
+
+Exits with status 1 if the overhead exceeds the budget, so it can be
+used to hold regressions:
+
+    python benchmarks/bench_write_readline.py --budget 20
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+from sockio.aio import TCP, open_connection
+
+REQUEST, REPLY = b"*idn?\n", b"ACME, bla ble ble, 1234, 5678\n"
+
+# maximum accepted sockio overhead per write_readline call (microseconds)
+OVERHEAD_BUDGET_US = 20.0
+
+
+class ReplyProtocol(asyncio.Protocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.transport.write(data.count(b"\n") * REPLY)
+
+
+async def raw_write_readline(reader, writer, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        writer.write(REQUEST)
+        await writer.drain()
+        await reader.readline()
+    return time.perf_counter() - start
+
+
+async def tcp_write_readline(sock, n, **kwargs):
+    start = time.perf_counter()
+    for _ in range(n):
+        await sock.write_readline(REQUEST, **kwargs)
+    return time.perf_counter() - start
+
+
+async def run(n, repeat):
+    loop = asyncio.get_event_loop()
+    server = await loop.create_server(ReplyProtocol, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()
+    reader, writer = await open_connection(host, port)
+    sock = TCP(host, port)
+    await sock.open()
+    results = dict(raw=[], sockio=[], sockio_timeout=[])
+    for _ in range(repeat):
+        results["raw"].append(await raw_write_readline(reader, writer, n))
+        results["sockio"].append(await tcp_write_readline(sock, n))
+        results["sockio_timeout"].append(await tcp_write_readline(sock, n, timeout=1))
+    writer.close()
+    await sock.close()
+    server.close()
+    return {name: min(values) / n * 1e6 for name, values in results.items()}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=20000, help="calls per round")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="rounds")
+    parser.add_argument("--budget", type=float, default=OVERHEAD_BUDGET_US,
+                        help="overhead budget per call (us)")
+    options = parser.parse_args(args)
+    result = asyncio.run(run(options.n, options.repeat))
+    raw = result["raw"]
+    print("{:<16} {:>10} {:>10}".format("mode", "us/call", "overhead"))
+    for name, value in result.items():
+        print("{:<16} {:>10.2f} {:>10.2f}".format(name, value, value - raw))
+    overhead = max(value - raw for value in result.values())
+    if overhead > options.budget:
+        message = "FAIL: overhead {:.2f}us > budget {:.2f}us"
+        print(message.format(overhead, options.budget))
+        return 1
+    print("OK: overhead within {:.2f}us budget".format(options.budget))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,8 +18,6 @@ setup(
         "Natural Language :: English",
         "Programming Language :: Python :: 2.7",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
@@ -30,12 +28,17 @@ setup(
     long_description_content_type="text/markdown",
     keywords="socket, asyncio",
     packages=find_packages(include=["sockio"]),
+    extras_require={"anyio": ["anyio>=3"]},
+    entry_points={"console_scripts": ["sockio = sockio.cli:main"]},
     url="https://tiagocoutinho.github.io/sockio/",
     project_urls={
         "Documentation": "https://tiagocoutinho.github.io/sockio/",
         "Source": "https://github.com/tiagocoutinho/sockio/",
     },
     version="0.15.0",
-    python_requires=">=2.7",
+    # python 2.7 for sockio.py2 only, python >= 3.7 for the rest
+    python_requires=(
+        ">=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, !=3.4.*, !=3.5.*, !=3.6.*"
+    ),
     zip_safe=True,
 )
@@ -6,6 +6,10 @@ CONCURRENCY_MAP = {
     "syncio": "sync",
     "async": "async",
     "asyncio": "async",
+    "anyio": "anyio",
+    "trio": "anyio",
+    "process": "process",
+    "multiprocessing": "process",
 }
 
 
@@ -16,8 +20,16 @@ def socket_for_url(url, *args, **kwargs):
         from . import aio
 
         return aio.socket_for_url(url, *args, **kwargs)
+    elif concurrency == "anyio":
+        from . import anyio
+
+        return anyio.socket_for_url(url, *args, **kwargs)
     elif concurrency == "sync":
         from . import sio
 
         return sio.socket_for_url(url, *args, **kwargs)
+    elif concurrency == "process":
+        from . import process
+
+        return process.socket_for_url(url, *args, **kwargs)
     raise ValueError("unsupported concurrency {!r}".format(conc))
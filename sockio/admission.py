@@ -0,0 +1,136 @@
+"""
+Process-wide connect admission control.
+
+When many sockets (re)connect at the same moment (ex: a rack power cycle)
+each one runs open() and its on_connection_made sequence at once. An
+AdmissionController bounds the number of connections being opened at a
+time, across all TCP objects and all event loops (sio loops included):
+
+    from sockio import admission
+
+    admission.configure(max_connecting=8, jitter=2.0)
+
+- max_connecting: number of opens (connect + on_connection_made) in
+  progress at a time
+- jitter: opens without pending requests (explicit open(), ...) first wait
+  a random delay in [0, jitter] seconds, spreading the storm
+
+Opens triggered by a request (auto-reconnect) skip the jitter and are
+admitted before the others (PENDING priority).
+"""
+
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+
+IDLE, PENDING = 0, 1
+
+
+class AdmissionController:
+    def __init__(self, max_connecting=16, jitter=0.0):
+        if max_connecting < 1:
+            raise ValueError("max_connecting must be >= 1")
+        self.max_connecting = max_connecting
+        self.jitter = jitter
+        self.connecting = 0
+        self.admitted = 0
+        self._waiters = []  # heap of [-priority, order, loop, future]
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def waiting(self):
+        return len(self._waiters)
+
+    def stats(self):
+        return dict(
+            max_connecting=self.max_connecting,
+            connecting=self.connecting,
+            waiting=self.waiting(),
+            admitted=self.admitted,
+        )
+
+    async def acquire(self, priority=IDLE):
+        if self.jitter and priority < PENDING:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.connecting < self.max_connecting and not self._waiters:
+                self.connecting += 1
+                self.admitted += 1
+                return
+            future = loop.create_future()
+            entry = [-priority, next(self._order), loop, future]
+            heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    raise
+            if future.done() and not future.cancelled():
+                # admitted while being cancelled: give the slot back
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self.connecting -= 1
+                return
+            # hand the slot over to the best waiter (connecting unchanged)
+            _, _, loop, future = heapq.heappop(self._waiters)
+            self.admitted += 1
+        try:
+            loop.call_soon_threadsafe(self._admit, future)
+        except RuntimeError:  # loop closed
+            self.release()
+
+    def _admit(self, future):
+        if future.done():
+            # waiter cancelled after leaving the queue
+            self.release()
+        else:
+            future.set_result(None)
+
+    def slot(self, priority=IDLE):
+        """Asynchronous context manager holding an admission slot"""
+        return _Slot(self, priority)
+
+
+class _Slot:
+    __slots__ = ("controller", "priority")
+
+    def __init__(self, controller, priority):
+        self.controller = controller
+        self.priority = priority
+
+    async def __aenter__(self):
+        await self.controller.acquire(self.priority)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.controller.release()
+
+
+_controller = None
+
+
+def configure(max_connecting=16, jitter=0.0):
+    """Install (and return) the process-wide admission controller"""
+    global _controller
+    _controller = AdmissionController(max_connecting, jitter)
+    return _controller
+
+
+def disable():
+    """Remove the process-wide admission controller"""
+    global _controller
+    _controller = None
+
+
+def controller():
+    """The process-wide admission controller (None if not configured)"""
+    return _controller
@@ -1,43 +1,184 @@
 import sys
+import time
 import socket
+import struct
 import asyncio
 import functools
+import contextlib
 import threading
+import contextvars
 import urllib.parse
 
-from .common import IPTOS_LOWDELAY, DEFAULT_LIMIT, ConnectionEOFError, ConnectionTimeoutError, log
-
-
-_PY_37 = sys.version_info >= (3, 7)
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .batch import LineBatch, split_lines
+from .capture import CLOSE, OPEN, capture_for
+from .rtt import RTTEstimator, adaptive_timeout_for
+from .breaker import circuit_breaker_for
+from .tls import ssl_context_for
+from . import admission
+from .tuning import (
+    apply_profile, corked, profile_for, rearm_quickack, url_options, wants_quickack
+)
+from .pipeline import Pipeline
+from .common import (
+    IPTOS_LOWDELAY,
+    DEFAULT_LIMIT,
+    LEAN_LIMIT,
+    ConnectionEOFError,
+    ConnectionTimeoutError,
+    block_header,
+    log,
+)
+
+
+# asyncio primitives are no longer bound to a loop on creation
+_PY_310 = sys.version_info >= (3, 10)
 
 _LOCK = threading.Lock()
 
+_DFT = object()  # "use the TCP default" marker for per call options
+
 DFT_KEEP_ALIVE = dict(active=1, idle=60, retry=3, interval=10)
 
+# (when, armed, owner): absolute loop time of the innermost deadline, whether
+# a loop timer is already scheduled to enforce it and the task it belongs to.
+# Tasks created inside a deadline copy the context but not the deadline.
+_DEADLINE = contextvars.ContextVar("sockio_deadline", default=(None, False, None))
+
+
+def _current_task():
+    try:
+        return asyncio.current_task()
+    except RuntimeError:  # no running loop
+        return None
+
+
+def _deadline():
+    """(when, armed) of the deadline of the current task"""
+    when, armed, owner = _DEADLINE.get()
+    if when is None or owner is not _current_task():
+        return None, False
+    return when, armed
+
+
+class Deadline:
+    """
+    Context manager which bounds every sockio call made inside it by a
+    single absolute deadline (in the event loop clock).
+
+    Nested deadlines and per call timeouts can only make it tighter.
+    """
+
+    def __init__(self, timeout=None, when=None):
+        self.timeout = timeout
+        self.when = when
+        self._token = None
+
+    def remaining(self):
+        if self.when is None:
+            return None
+        return max(self.when - asyncio.get_event_loop().time(), 0)
+
+    def __enter__(self):
+        if self.timeout is not None:
+            when = asyncio.get_event_loop().time() + self.timeout
+            self.when = when if self.when is None else min(self.when, when)
+        outer, armed = _deadline()
+        if self.when is None or (outer is not None and outer <= self.when):
+            self.when = outer
+        else:
+            armed = False
+        self._token = _DEADLINE.set((self.when, armed, _current_task()))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _DEADLINE.reset(self._token)
+        return False
+
+
+deadline = Deadline
+
+
+class TimeoutScope:
+    """
+    Enforces the effective deadline of one operation (lock wait,
+    auto-reconnect, write and all reads) with a single loop timer which
+    cancels the running task. No extra task is created per call.
+    """
+
+    __slots__ = ("timeout", "deadline", "message", "args", "task", "handle",
+                 "expired", "token")
+
+    def __init__(self, timeout=None, deadline=None, message="", *args):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.message = message
+        self.args = args
+        self.handle = None
+        self.expired = False
+
+    def __enter__(self):
+        when, timeout = self.deadline, self.timeout
+        outer, armed = _deadline()
+        if when is None and timeout is None and outer is None:
+            return self
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        if timeout is not None:
+            when = now + timeout if when is None else min(when, now + timeout)
+        if outer is not None and (when is None or outer <= when):
+            if armed:
+                # an enclosing operation already enforces a tighter deadline
+                return self
+            when = outer
+        if when <= now:
+            raise ConnectionTimeoutError(self.message.format(*self.args))
+        self.task = asyncio.current_task(loop)
+        if self.task is None:
+            return self
+        self.token = _DEADLINE.set((when, True, self.task))
+        self.handle = loop.call_at(when, self._expire)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.handle is None:
+            return False
+        self.handle.cancel()
+        _DEADLINE.reset(self.token)
+        cancelled = exc_type is not None and issubclass(
+            exc_type, asyncio.CancelledError
+        )
+        if self.expired and cancelled:
+            if hasattr(self.task, "uncancel"):
+                self.task.uncancel()
+            raise ConnectionTimeoutError(self.message.format(*self.args)) from exc
+        return False
+
+    def _expire(self):
+        self.expired = True
+        self.task.cancel()
+
 
 def ensure_connection(f):
     assert asyncio.iscoroutinefunction(f)
-    name = f.__name__
+    message = f.__name__ + " call timeout on '{}:{}'"
 
     @functools.wraps(f)
     async def wrapper(self, *args, **kwargs):
-        if self._lock is None:
-            with _LOCK:
-                if self._lock is None:
-                    self._lock = asyncio.Lock()
+        lock = self._lock or self._create_lock()
         timeout = kwargs.pop("timeout", self.timeout)
-        async with self._lock:
-            if self.auto_reconnect and not self.connected():
-                await self.open()
-            coro = f(self, *args, **kwargs)
-            if timeout is not None:
-                coro = asyncio.wait_for(coro, timeout)
-            try:
-                return await coro
-            except asyncio.TimeoutError as error:
-                msg = "{} call timeout on '{}:{}'".format(name, self.host, self.port)
-                raise ConnectionTimeoutError(msg) from error
-
+        deadline = kwargs.pop("deadline", None)
+        with TimeoutScope(timeout, deadline, message, self.host, self.port):
+            async with lock:
+                if self.auto_reconnect and not self.connected():
+                    await self.open(priority=admission.PENDING)
+                return await f(self, *args, **kwargs)
+
+    wrapper.deadline_aware = True
     return wrapper
 
 
@@ -84,6 +225,36 @@ class StreamReaderProtocol(asyncio.StreamReaderProtocol):
 
 
 class StreamReader(asyncio.StreamReader):
+    """
+    If max_limit is given, the limit starts small, grows on demand (doubling
+    up to max_limit) when a line or block does not fit and shrinks back, with
+    the buffer, once all buffered data has been consumed.
+    """
+
+    def __init__(self, limit=DEFAULT_LIMIT, loop=None, max_limit=None):
+        super().__init__(limit=limit, loop=loop)
+        self._min_limit = limit
+        self._max_limit = limit if max_limit is None else max(limit, max_limit)
+
+    def _grow_limit(self):
+        if self._limit >= self._max_limit:
+            return False
+        self._limit = min(2 * self._limit, self._max_limit)
+        return True
+
+    def _maybe_resume_transport(self):
+        super()._maybe_resume_transport()
+        if self._limit > self._min_limit and not self._buffer:
+            self._limit = self._min_limit
+            self._buffer = bytearray()
+
+    async def readuntil(self, separator=b"\n"):
+        while True:
+            try:
+                return await super().readuntil(separator)
+            except asyncio.LimitOverrunError:
+                if not self._grow_limit():
+                    raise
 
     async def readline(self, eol=b"\n"):
         # This implementation is a copy of the asyncio.StreamReader.readline()
@@ -103,6 +274,91 @@ class StreamReader(asyncio.StreamReader):
             raise ValueError(e.args[0])
         return line
 
+    async def readlines(self, n, eol=b"\n", compact=False):
+        if compact:
+            return await self.readlines_compact(n, eol=eol)
+        return [await self.readline(eol=eol) for _ in range(n)]
+
+    def readlines_available(self, eol=b"\n", n=None):
+        """Take all (at most n) complete lines from the buffer in one go"""
+        buff = self._buffer
+        offsets = split_lines(buff, eol, n)
+        size = offsets[-1]
+        if not size:
+            return LineBatch()
+        data = bytes(buff[:size])
+        del buff[:size]
+        self._maybe_resume_transport()
+        return LineBatch(data, offsets)
+
+    async def readlines_compact(self, n, eol=b"\n"):
+        batches, missing = [], n
+        while True:
+            batch = self.readlines_available(eol, missing)
+            batches.append(batch)
+            missing -= len(batch)
+            if not missing:
+                break
+            if self._eof:
+                if self._buffer:
+                    batches.append(LineBatch.from_lines([bytes(self._buffer)]))
+                    self._buffer.clear()
+                break
+            if len(self._buffer) > self._limit and not self._grow_limit():
+                self._buffer.clear()
+                self._maybe_resume_transport()
+                raise ValueError("Separator is not found, and chunk exceed the limit")
+            await self._wait_for_data("readlines")
+        return LineBatch.concat(batches)
+
+    async def _fill(self, size, name):
+        while len(self._buffer) < size:
+            if self._exception is not None:
+                raise self._exception
+            if self._eof:
+                partial = bytes(self._buffer)
+                self._buffer.clear()
+                raise asyncio.IncompleteReadError(partial, size)
+            await self._wait_for_data(name)
+
+    async def readframe(self, header, length_field=-1, length_adjust=0):
+        """
+        Read one frame made of a struct header holding the payload length
+        (header[length_field] + length_adjust bytes) followed by the payload.
+        Returns (header fields, payload memoryview). Header and payload
+        are taken from the buffer with a single copy.
+        """
+        hsize = header.size
+        if len(self._buffer) < hsize:
+            await self._fill(hsize, "readframe")
+        fields = header.unpack_from(self._buffer)
+        size = hsize + fields[length_field] + length_adjust
+        if size < hsize:
+            raise ValueError("invalid frame length {}".format(size - hsize))
+        if len(self._buffer) < size:
+            await self._fill(size, "readframe")
+        buff = self._buffer
+        frame = bytes(buff[:size])
+        del buff[:size]
+        self._maybe_resume_transport()
+        return fields, memoryview(frame)[hsize:]
+
+    async def readrecords(self, size, n=None):
+        """
+        Read as many whole records of size bytes as the buffer holds (at
+        least one, at most n), waiting for the first one if needed
+        """
+        if len(self._buffer) < size:
+            await self._fill(size, "readrecords")
+        count = len(self._buffer) // size
+        if n is not None:
+            count = min(count, n)
+        buff, end = self._buffer, count * size
+        data = bytes(buff[:end])
+        del buff[:end]
+        self._maybe_resume_transport()
+        return data
+
     def __len__(self):
         return len(self._buffer)
 
@@ -110,7 +366,45 @@ class StreamReader(asyncio.StreamReader):
         self._buffer.clear()
 
 
-def configure_socket(sock, no_delay=True, tos=IPTOS_LOWDELAY, keep_alive=DFT_KEEP_ALIVE):
+class HookStreamReaderProtocol(StreamReaderProtocol):
+    """
+    StreamReaderProtocol with per read hooks: records received data to a
+    Capture and/or re-arms TCP_QUICKACK on the quickack socket
+    """
+
+    def data_received(self, data):
+        if self.capture is not None:
+            self.capture.received(data)
+        super().data_received(data)
+        if self.quickack is not None:
+            rearm_quickack(self.quickack)
+
+    def connection_lost(self, exc):
+        if self.capture is not None:
+            self.capture.record(CLOSE)
+            self.capture.flush()
+        return super().connection_lost(exc)
+
+
+def capture_transport(transport, capture):
+    """Record the data written to the transport"""
+    write = transport.write
+
+    def capture_write(data):
+        capture.sent(data)
+        write(data)
+
+    def capture_writelines(lines):
+        # (the default writelines may itself call write)
+        capture_write(b"".join(lines))
+
+    transport.write = capture_write
+    transport.writelines = capture_writelines
+
+
+def configure_socket(
+    sock, no_delay=True, tos=IPTOS_LOWDELAY, keep_alive=DFT_KEEP_ALIVE, profile=None
+):
     if hasattr(socket, "TCP_NODELAY") and no_delay:
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     if hasattr(socket, "IP_TOS"):
@@ -130,6 +424,8 @@ def configure_socket(sock, no_delay=True, tos=IPTOS_LOWDELAY, keep_alive=DFT_KEE
             sock.setsockopt(socket.SOL_TCP, socket.TCP_KEEPINTVL, interval)
         if retry is not None:
             sock.setsockopt(socket.SOL_TCP, socket.TCP_KEEPCNT, retry)
+    if profile:
+        apply_profile(sock, profile)
 
 
 async def open_connection(
@@ -142,32 +438,56 @@ async def open_connection(
     on_eof_received=None,
     no_delay=True,
     tos=IPTOS_LOWDELAY,
-    keep_alive=DFT_KEEP_ALIVE
+    keep_alive=DFT_KEEP_ALIVE,
+    max_limit=None,
+    capture=None,
+    profile=None,
+    ssl=None,
+    server_hostname=None,
 ):
     if loop is None:
         loop = asyncio.get_event_loop()
-    reader = StreamReader(limit=limit, loop=loop)
-    protocol = StreamReaderProtocol(reader, loop=loop)
+    reader = StreamReader(limit=limit, loop=loop, max_limit=max_limit)
+    quickack = wants_quickack(profile)
+    if capture is None and not quickack:
+        protocol = StreamReaderProtocol(reader, loop=loop)
+    else:
+        protocol = HookStreamReaderProtocol(reader, loop=loop)
+        protocol.capture = capture
+        protocol.quickack = None
     protocol.connection_lost_cb = on_connection_lost
     protocol.eof_received_cb = on_eof_received
     transport, _ = await loop.create_connection(
-        lambda: protocol, host, port, flags=flags
+        lambda: protocol, host, port, flags=flags, ssl=ssl,
+        server_hostname=server_hostname if ssl else None,
     )
+    if capture is not None:
+        capture.record(OPEN)
+        capture_transport(transport, capture)
     writer = asyncio.StreamWriter(transport, protocol, reader, loop)
     sock = writer.transport.get_extra_info("socket")
-    configure_socket(sock, no_delay=no_delay, tos=tos, keep_alive=keep_alive)
+    configure_socket(
+        sock, no_delay=no_delay, tos=tos, keep_alive=keep_alive, profile=profile
+    )
+    if quickack:
+        protocol.quickack = sock
     return reader, writer
 
 
 class BaseStream:
     """Base asynchronous iterator stream helper for TCP connections"""
 
+    __slots__ = ("tcp",)
+
     def __init__(self, tcp):
         self.tcp = tcp
 
     async def _read(self):
         raise NotImplementedError
 
+    async def _read_batch(self):
+        return [await self._read()]
+
     def __aiter__(self):
         return self
 
@@ -177,10 +497,37 @@ class BaseStream:
         except ConnectionEOFError:
             raise StopAsyncIteration
 
+    def pipeline(self):
+        """Pipeline of batch operators over this stream (see sockio.pipeline)"""
+        return Pipeline(self)
+
+    def map(self, function, executor=None, concurrency=2):
+        return self.pipeline().map(function, executor, concurrency)
+
+    def map_batch(self, function, executor=None, concurrency=2):
+        return self.pipeline().map_batch(function, executor, concurrency)
+
+    def filter(self, predicate, executor=None, concurrency=2):
+        return self.pipeline().filter(predicate, executor, concurrency)
+
+    def reduce(self, function, executor=None, concurrency=2):
+        return self.pipeline().reduce(function, executor, concurrency)
+
+    def decimate(self, n):
+        return self.pipeline().decimate(n)
+
+    def window(self, size, step=None):
+        return self.pipeline().window(size, step)
+
+    def rebatch(self, size):
+        return self.pipeline().rebatch(size)
+
 
 class LineStream(BaseStream):
     """Line based asynchronous iterator stream helper for TCP connections"""
 
+    __slots__ = ("eol",)
+
     def __init__(self, tcp, eol=None):
         super().__init__(tcp)
         self.eol = eol
@@ -188,6 +535,13 @@ class LineStream(BaseStream):
     async def _read(self):
         return await self.tcp.readline(eol=self.eol)
 
+    async def _read_batch(self):
+        # one line (waiting if needed) + all the complete lines already received
+        batch = [await self.tcp.readline(eol=self.eol)]
+        if self.tcp.in_waiting():
+            batch.extend(await self.tcp.readlines_available(eol=self.eol))
+        return batch
+
 
 class BlockStream(BaseStream):
     """
@@ -199,6 +553,8 @@ class BlockStream(BaseStream):
       found (TCP.readuntil semantics)
     """
 
+    __slots__ = ("limit",)
+
     def __init__(self, tcp, limit):
         super().__init__(tcp)
         self.limit = limit
@@ -215,8 +571,238 @@ class BlockStream(BaseStream):
             else:
                 raise ConnectionEOFError()
 
+    async def _read_batch(self):
+        size = self.limit
+        if not isinstance(size, int):
+            return [await self._read()]
+        batch = [await self._read()]
+        n = self.tcp.in_waiting() // size
+        if n:
+            data = await self.tcp.readexactly(n * size)
+            batch.extend(data[i: i + size] for i in range(0, len(data), size))
+        return batch
+
+
+class FrameStream(BaseStream):
+    """
+    Header framed asynchronous iterator stream helper for TCP connections
+    (TCP.readframe semantics). Yields (header fields, payload) pairs.
+    """
+
+    __slots__ = ("header", "length_field", "length_adjust")
+
+    def __init__(self, tcp, header, length_field=-1, length_adjust=0):
+        super().__init__(tcp)
+        self.header = frame_header(header)
+        self.length_field = length_field
+        self.length_adjust = length_adjust
+
+    async def _read(self):
+        try:
+            return await self.tcp.readframe(
+                self.header, self.length_field, self.length_adjust
+            )
+        except asyncio.IncompleteReadError as error:
+            if error.partial:
+                raise
+            else:
+                raise ConnectionEOFError()
+
+
+class RecordStream(BaseStream):
+    """
+    Fixed size binary record asynchronous iterator stream helper for TCP
+    connections. Each item is a numpy structured array (read-only, no copy)
+    with all the whole records of the given dtype available at that time
+    (at most max_records)
+    """
+
+    __slots__ = ("dtype", "max_records")
+
+    def __init__(self, tcp, dtype, max_records=None):
+        if numpy is None:
+            raise RuntimeError("RecordStream requires numpy")
+        super().__init__(tcp)
+        self.dtype = numpy.dtype(dtype)
+        self.max_records = max_records
+
+    async def _read(self):
+        try:
+            data = await self.tcp.readrecords(self.dtype.itemsize, self.max_records)
+        except asyncio.IncompleteReadError as error:
+            if error.partial:
+                raise
+            else:
+                raise ConnectionEOFError()
+        return numpy.frombuffer(data, self.dtype)
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_header(header):
+    return struct.Struct(header)
+
+
+def frame_header(header):
+    """struct.Struct for the given frame header (format string or struct)"""
+    if isinstance(header, struct.Struct):
+        return header
+    return _compile_header(header)
+
+
+BLOCK_CHUNK = 2 ** 20  # write_block chunk size (bytes)
+
+
+SUBSCRIPTION_POLICIES = ("block", "drop-oldest", "drop-newest")
+_END = object()  # end of broadcast marker
+
+
+class Subscription:
+    """
+    Asynchronous iterator over the records of a Broadcast, buffered in a
+    bounded queue. When the queue is full the policy decides:
+
+    - "block": wait for room (slows the broadcast down for everybody)
+    - "drop-oldest": discard the oldest queued record
+    - "drop-newest": discard the incoming record
+
+    Discarded records are counted in dropped.
+    """
+
+    __slots__ = ("broadcast", "queue", "policy", "dropped", "finished")
+
+    def __init__(self, broadcast, maxsize=100, policy="block"):
+        if policy not in SUBSCRIPTION_POLICIES:
+            raise ValueError(
+                "policy must be one of {}".format(", ".join(SUBSCRIPTION_POLICIES))
+            )
+        self.broadcast = broadcast
+        self.queue = asyncio.Queue(maxsize)
+        self.policy = policy
+        self.dropped = 0
+        self.finished = None  # True or error when the broadcast ended
+
+    async def _put_full(self, record):
+        if self.policy == "block":
+            await self.queue.put(record)
+        elif self.policy == "drop-oldest":
+            self.queue.get_nowait()
+            self.queue.put_nowait(record)
+            self.dropped += 1
+        else:
+            self.dropped += 1
+
+    def _finish(self, error=None):
+        self.finished = error or True
+        if not self.queue.full():
+            self.queue.put_nowait(_END)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        queue = self.queue
+        if queue.empty() and self.finished is not None:
+            record = _END
+        else:
+            record = await queue.get()
+        if record is _END:
+            error, self.finished = self.finished, True
+            if error is not True:
+                raise error
+            raise StopAsyncIteration
+        return record
+
+    def close(self):
+        """Unsubscribe"""
+        self.broadcast.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Broadcast:
+    """
+    Reads a stream once and dispatches every record to all subscriptions.
+    The reader task starts with the first subscription and stops at the end
+    of the stream or after the first record received once the last
+    subscription is closed (the read in progress is never cancelled: that
+    would close the connection). A subscription made before it stops gets
+    that record.
+    """
+
+    __slots__ = ("stream", "subscriptions", "task")
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.subscriptions = []
+        self.task = None
+
+    def subscribe(self, maxsize=100, policy="block"):
+        subscription = Subscription(self, maxsize, policy)
+        self.subscriptions.append(subscription)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription not in self.subscriptions:
+            return
+        self.subscriptions.remove(subscription)
+        if subscription.queue.full():
+            # release the reader if it is blocked on this subscription
+            subscription.queue.get_nowait()
+
+    async def _run(self):
+        read, error = self.stream._read, None
+        try:
+            while True:
+                record = await read()
+                for subscription in tuple(self.subscriptions):
+                    if subscription.queue.full():
+                        if subscription in self.subscriptions:
+                            await subscription._put_full(record)
+                    else:
+                        subscription.queue.put_nowait(record)
+                if not self.subscriptions:
+                    break
+        except ConnectionEOFError:
+            pass
+        except Exception as err:
+            error = err
+        subscriptions, self.subscriptions, self.task = self.subscriptions, [], None
+        for subscription in subscriptions:
+            subscription._finish(error)
+
+
+_NO_SCOPE = contextlib.nullcontext()
+_WRITE = asyncio.StreamWriter.write
+_WRITELINES = asyncio.StreamWriter.writelines
+_READ = StreamReader.read
+_READLINE = StreamReader.readline
+_READLINES = StreamReader.readlines
+_READFRAME = StreamReader.readframe
+
+
+# shared by all lean TCP objects: a child logger per object is kept
+# forever by the logging module
+_TCP_LOG = log.getChild("TCP")
+
 
 class TCP:
+
+    __slots__ = (
+        "host", "port", "eol", "buffer_size", "auto_reconnect",
+        "connection_counter", "on_connection_made", "on_connection_lost",
+        "on_eof_received", "no_delay", "tos", "connection_timeout", "timeout",
+        "keep_alive", "lean", "capture", "profile", "adaptive_timeout", "probe",
+        "probe_interval", "rtt", "circuit_breaker", "ssl", "server_hostname",
+        "reader", "writer", "_lock", "_log", "_capture_owned",
+        "_broadcast", "_probe_task", "_last_exchange", "__weakref__",
+    )
+
     def __init__(
         self,
         host,
@@ -232,7 +818,17 @@ class TCP:
         connection_timeout=None,
         timeout=None,
         keep_alive=DFT_KEEP_ALIVE,
+        lean=False,
+        capture=None,
+        profile=None,
+        adaptive_timeout=None,
+        probe=None,
+        probe_interval=1.0,
+        circuit_breaker=None,
+        ssl=None,
+        server_hostname=None,
     ):
+        profile = profile_for(profile)
         self.host = host
         self.port = port
         self.eol = eol
@@ -247,47 +843,141 @@ class TCP:
         self.connection_timeout = connection_timeout
         self.timeout = timeout
         self.keep_alive = keep_alive
+        self.lean = lean
+        self.capture = capture_for(capture)
+        # a capture created from a filename is closed with the connection
+        self._capture_owned = self.capture is not capture
+        self.profile = profile
+        self.adaptive_timeout = adaptive_timeout_for(adaptive_timeout)
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.rtt = RTTEstimator()
+        self.circuit_breaker = circuit_breaker_for(circuit_breaker)
+        self.ssl = ssl_context_for(ssl)
+        self.server_hostname = server_hostname
+        self._probe_task = None
+        self._last_exchange = 0.0
         self.reader = None
         self.writer = None
-        self._lock = None
-        self._log = log.getChild("TCP({}:{})".format(host, port))
+        self._lock = asyncio.Lock() if _PY_310 else None
+        self._broadcast = None
+        if lean:
+            self._log = _TCP_LOG
+        else:
+            self._log = log.getChild("TCP({}:{})".format(host, port))
 
     def __del__(self):
-        if self.writer is not None:
+        # writer is not set if __init__ failed (ex: unknown profile)
+        if getattr(self, "writer", None) is not None:
             loop = self.writer._loop  # !watch out: access internal stream loop
             if loop is not None and not loop.is_closed():
                 self.writer.close()
             else:
-                self._log.info("could not close stream: loop closed")
+                self._log.info(
+                    "could not close stream to %s:%s: loop closed", self.host, self.port
+                )
+        if getattr(self, "_capture_owned", False):
+            self.capture.close()
 
     def __aiter__(self):
         return LineStream(self)
 
+    def subscribe(self, maxsize=100, policy="block", stream=None):
+        """
+        New Subscription to the records of this socket. The socket is read
+        once (by a single task) and every record is given to all
+        subscribers. stream (default: LineStream(self)) is only taken into
+        account by the first of concurrent subscriptions. The reader is not
+        bound by the deadline (if any) of the subscriber which started it.
+        """
+        broadcast = self._broadcast
+        if broadcast is None or broadcast.task is None:
+            broadcast = Broadcast(LineStream(self) if stream is None else stream)
+            self._broadcast = broadcast
+        return broadcast.subscribe(maxsize, policy)
+
+    def correlate(self, encode, extract, eol=None, tags=None, on_unmatched=None):
+        """
+        Correlator (tagged out of order request/reply) over this socket
+        (see sockio.dispatch)
+        """
+        from .dispatch import Correlator
+
+        return Correlator(self, encode, extract, eol, tags, on_unmatched)
+
+    def route(self, is_event, on_event=None, maxsize=0, eol=None, on_unmatched=None):
+        """
+        Router (unsolicited events vs replies) over this socket
+        (see sockio.dispatch)
+        """
+        from .dispatch import Router
+
+        return Router(self, is_event, on_event, maxsize, eol, on_unmatched)
+
     async def open(self, **kwargs):
         connection_timeout = kwargs.get("timeout", self.connection_timeout)
         if self.connected():
             raise ConnectionError("socket already open")
-        self._log.debug("open connection (#%d)", self.connection_counter + 1)
+        self._log.debug(
+            "open connection to %s:%s (#%d)", self.host, self.port,
+            self.connection_counter + 1
+        )
         # make sure everything is clean before creating a new connection
         await self.close()
-        coro = open_connection(
-            self.host,
-            self.port,
-            limit=self.buffer_size,
-            on_connection_lost=self.on_connection_lost,
-            on_eof_received=self.on_eof_received,
-            no_delay=self.no_delay,
-            tos=self.tos,
-            keep_alive=self.keep_alive
-        )
-        if connection_timeout is not None:
-            coro = asyncio.wait_for(coro, connection_timeout)
-
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before("{}:{}".format(self.host, self.port))
+        try:
+            controller = admission.controller()
+            if controller is None:
+                await self._connect(connection_timeout)
+            else:
+                async with controller.slot(kwargs.get("priority", admission.IDLE)):
+                    await self._connect(connection_timeout)
+        except BaseException:
+            # ex: cancelled while waiting for admission (not a failure)
+            if breaker is not None:
+                breaker.abort()
+            raise
+        self.connection_counter += 1
+        if self.probe is not None and self._probe_task is None:
+            self._last_exchange = time.perf_counter()
+            self._probe_task = asyncio.ensure_future(self._probe_loop())
+
+    async def _connect(self, connection_timeout):
+        # only the connection itself counts for the circuit breaker
+        breaker = self.circuit_breaker
+        addr = self.host, self.port
+        limit = min(LEAN_LIMIT, self.buffer_size) if self.lean else self.buffer_size
+        if self._capture_owned:
+            self.capture.reopen()
         try:
-            self.reader, self.writer = await coro
-        except asyncio.TimeoutError:
-            addr = self.host, self.port
-            raise ConnectionTimeoutError("Connect call timeout on {}".format(addr))
+            with TimeoutScope(
+                connection_timeout, None, "Connect call timeout on {}", addr
+            ):
+                self.reader, self.writer = await open_connection(
+                    self.host,
+                    self.port,
+                    limit=limit,
+                    max_limit=self.buffer_size,
+                    on_connection_lost=self.on_connection_lost,
+                    on_eof_received=self.on_eof_received,
+                    no_delay=self.no_delay,
+                    tos=self.tos,
+                    keep_alive=self.keep_alive,
+                    capture=self.capture,
+                    profile=self.profile,
+                    ssl=self.ssl,
+                    server_hostname=self.server_hostname,
+                )
+        except BaseException:
+            if breaker is not None:
+                breaker.failure()
+            raise
+        if breaker is not None:
+            breaker.success()
+        if self.ssl is not None:
+            self.ssl.connection_made(self.writer.get_extra_info("ssl_object"))
 
         if self.on_connection_made is not None:
             try:
@@ -299,17 +989,90 @@ class TCP:
                     "Error in connection_made callback %r",
                     self.on_connection_made.__name__,
                 )
-        self.connection_counter += 1
+
+    async def _probe_loop(self):
+        # idle probe: keeps the RTT estimate fresh and detects dead links.
+        # Its own task: the deadline of the call which opened the socket (if
+        # any) does not apply, each probe gets the socket timeout
+        try:
+            while self.connected():
+                idle = time.perf_counter() - self._last_exchange
+                if idle < self.probe_interval:
+                    await asyncio.sleep(self.probe_interval - idle)
+                    continue
+                try:
+                    await self.write_readline(self.probe)
+                except Exception as error:
+                    self._log.info("idle probe failed: %r", error)
+                    break
+        finally:
+            self._probe_task = None
 
     async def close(self):
+        task = self._probe_task
+        if task is not None and task is not asyncio.current_task():
+            self._probe_task = None
+            task.cancel()
         try:
             if self.writer is not None:
                 self.writer.close()
-                if _PY_37:
-                    await self.writer.wait_closed()
+                await self.writer.wait_closed()
         finally:
             self.reader = None
             self.writer = None
+            if self._capture_owned:
+                self.capture.close()
+
+    def _create_lock(self):
+        with _LOCK:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _write_read(self, name, write, data, read, args, timeout, deadline):
+        # Single frame fast path for the write_read family: it does what
+        # ensure_connection + _write + raw_handle_read(_read*) do together
+        lock = self._lock or self._create_lock()
+        if timeout is _DFT:
+            timeout = self.timeout
+            if self.adaptive_timeout is not None:
+                timeout = self.adaptive_timeout.timeout(self.rtt, timeout)
+        if timeout is None and deadline is None and _deadline()[0] is None:
+            scope = _NO_SCOPE
+        else:
+            msg = name + " call timeout on '{}:{}'"
+            scope = TimeoutScope(timeout, deadline, msg, self.host, self.port)
+        try:
+            with scope:
+                async with lock:
+                    if self.auto_reconnect and not self.connected():
+                        await self.open(priority=admission.PENDING)
+                    writer = self.writer
+                    cork, profile = _NO_SCOPE, self.profile
+                    if write is _WRITELINES and profile and profile.get("cork"):
+                        cork = self.corked()
+                    start = time.perf_counter()
+                    try:
+                        with cork:
+                            write(writer, data)
+                            await writer.drain()
+                    except ConnectionError:
+                        await self.close()
+                        raise
+                    try:
+                        reply = await read(self.reader, *args)
+                    except BaseException:
+                        await self.close()
+                        raise
+                    if not reply:
+                        await self.close()
+                        raise ConnectionEOFError("Connection closed by peer")
+                    self._last_exchange = now = time.perf_counter()
+                    self.rtt.update(now - start)
+                    return reply
+        except ConnectionTimeoutError:
+            self.rtt.timeouts += 1
+            raise
 
     def in_waiting(self):
         return len(self.reader) if self.connected() else 0
@@ -330,6 +1093,14 @@ class TCP:
     async def _readexactly(self, n):
         return await self.reader.readexactly(n)
 
+    @raw_handle_read
+    async def _readframe(self, header, length_field=-1, length_adjust=0):
+        return await self.reader.readframe(header, length_field, length_adjust)
+
+    @raw_handle_read
+    async def _readrecords(self, size, n=None):
+        return await self.reader.readrecords(size, n)
+
     @raw_handle_read
     async def _readuntil(self, separator=b"\n"):
         return await self.reader.readuntil(separator)
@@ -341,14 +1112,10 @@ class TCP:
         return await self.reader.readline(eol=eol)
 
     @raw_handle_read
-    async def _readlines(self, n, eol=None):
+    async def _readlines(self, n, eol=None, compact=False):
         if eol is None:
             eol = self.eol
-        replies = []
-        for i in range(n):
-            reply = await self.reader.readline(eol=eol)
-            replies.append(reply)
-        return replies
+        return await self.reader.readlines(n, eol=eol, compact=compact)
 
     async def _write(self, data):
         try:
@@ -360,8 +1127,13 @@ class TCP:
 
     async def _writelines(self, lines):
         try:
-            self.writer.writelines(lines)
-            await self.writer.drain()
+            if self.profile and self.profile.get("cork"):
+                with self.corked():
+                    self.writer.writelines(lines)
+                    await self.writer.drain()
+            else:
+                self.writer.writelines(lines)
+                await self.writer.drain()
         except ConnectionError:
             await self.close()
             raise
@@ -375,8 +1147,20 @@ class TCP:
         return await self._readline(eol=eol)
 
     @ensure_connection
-    async def readlines(self, n, eol=None):
-        return await self._readlines(n, eol=eol)
+    async def readlines(self, n, eol=None, compact=False):
+        """
+        Read n lines. With compact=True the lines are returned in a single
+        LineBatch, splitting all lines already in the buffer in one pass
+        """
+        return await self._readlines(n, eol=eol, compact=compact)
+
+    @ensure_connection
+    async def readlines_available(self, eol=None):
+        """
+        Read all complete lines currently available in the underlying
+        buffer (without waiting) as a LineBatch
+        """
+        return self.reader.readlines_available(self.eol if eol is None else eol)
 
     @ensure_connection
     async def readexactly(self, n):
@@ -386,6 +1170,23 @@ class TCP:
     async def readuntil(self, separator=b"\n"):
         return await self._readuntil(separator)
 
+    @ensure_connection
+    async def readrecords(self, size, n=None):
+        """
+        Read all whole records of size bytes available (at least one, at
+        most n) in a single bytes object
+        """
+        return await self._readrecords(size, n)
+
+    @ensure_connection
+    async def readframe(self, header, length_field=-1, length_adjust=0):
+        """
+        Read a frame made of a struct header (format string or
+        struct.Struct) followed by a payload of header[length_field] +
+        length_adjust bytes. Returns (header fields, payload memoryview)
+        """
+        return await self._readframe(frame_header(header), length_field, length_adjust)
+
     @ensure_connection
     async def readbuffer(self):
         """Read all bytes currently available in the underlying buffer"""
@@ -401,35 +1202,130 @@ class TCP:
         return await self._writelines(lines)
 
     @ensure_connection
-    async def write_read(self, data, n=-1):
-        await self._write(data)
-        return await self._read(n=n)
+    async def write_block(self, command, buffer, eol=None, chunk_size=BLOCK_CHUNK):
+        """
+        Send command followed by buffer as an IEEE 488.2 definite length
+        block (#<n><size><data>) and eol (default: the socket eol).
+        buffer is any C contiguous buffer (bytes, memoryview, mmap, numpy
+        array...): it is sent in chunks of chunk_size bytes, waiting for
+        the transport to drain between chunks, without being copied into a
+        single message. It must not be modified until the call returns and
+        is not used afterwards.
+        """
+        view = memoryview(buffer)
+        if view.format != "B" or view.ndim != 1:
+            view = view.cast("B")
+        eol = self.eol if eol is None else eol
+        writer = self.writer
+        # the transport may keep references to written data (python >= 3.12)
+        # and drain() leaves up to the high water mark buffered: that tail
+        # of the block is sent from a copy
+        tail = max(view.nbytes - writer.transport.get_write_buffer_limits()[1], 0)
+        head = view[:tail]
+        cork = self.profile and self.profile.get("cork")
+        try:
+            with self.corked() if cork else _NO_SCOPE:
+                writer.write(command + block_header(view.nbytes))
+                for start in range(0, tail, chunk_size):
+                    writer.write(head[start: start + chunk_size])
+                    await writer.drain()
+                writer.write(bytes(view[tail:]))
+                if eol:
+                    writer.write(eol)
+                await writer.drain()
+        except ConnectionError:
+            await self.close()
+            raise
 
-    @ensure_connection
-    async def write_readline(self, data, eol=None):
-        await self._write(data)
-        return await self._readline(eol=eol)
+    async def write_read(self, data, n=-1, timeout=_DFT, deadline=None):
+        return await self._write_read(
+            "write_read", _WRITE, data, _READ, (n,), timeout, deadline
+        )
 
-    @ensure_connection
-    async def write_readlines(self, data, n, eol=None):
-        await self._write(data)
-        return await self._readlines(n, eol=eol)
+    async def write_readline(self, data, eol=None, timeout=_DFT, deadline=None):
+        eol = self.eol if eol is None else eol
+        return await self._write_read(
+            "write_readline", _WRITE, data, _READLINE, (eol,), timeout, deadline
+        )
 
-    @ensure_connection
-    async def writelines_readlines(self, lines, n=None, eol=None):
-        if n is None:
-            n = len(lines)
-        await self._writelines(lines)
-        return await self._readlines(n, eol=eol)
+    async def write_readlines(
+        self, data, n, eol=None, compact=False, timeout=_DFT, deadline=None
+    ):
+        eol = self.eol if eol is None else eol
+        return await self._write_read(
+            "write_readlines", _WRITE, data, _READLINES, (n, eol, compact),
+            timeout, deadline
+        )
+
+    async def writelines_readlines(
+        self, lines, n=None, eol=None, compact=False, timeout=_DFT, deadline=None
+    ):
+        n = len(lines) if n is None else n
+        eol = self.eol if eol is None else eol
+        return await self._write_read(
+            "writelines_readlines", _WRITELINES, lines, _READLINES, (n, eol, compact),
+            timeout, deadline
+        )
+
+    async def write_readframe(
+        self, data, header, length_field=-1, length_adjust=0, timeout=_DFT,
+        deadline=None
+    ):
+        args = frame_header(header), length_field, length_adjust
+        return await self._write_read(
+            "write_readframe", _WRITE, data, _READFRAME, args, timeout, deadline
+        )
+
+    write_read.deadline_aware = True
+    write_readframe.deadline_aware = True
+    write_readline.deadline_aware = True
+    write_readlines.deadline_aware = True
+    writelines_readlines.deadline_aware = True
 
     def reset_input_buffer(self):
         if self.connected():
             self.reader.reset()
 
+    def corked(self):
+        """
+        Context manager holding partial frames (TCP_CORK) until its end:
+
+            with sock.corked():
+                await sock.write(header)
+                await sock.write(payload)
+        """
+        if not self.connected():
+            raise ConnectionError("not connected")
+        return corked(self.writer.transport.get_extra_info("socket"))
+
+    def stats(self):
+        """
+        Connection statistics: RTT estimate of the REQ-REP exchanges
+        (write_read family), the timeout the next exchange would get, the
+        circuit breaker state and the TLS handshakes (if any)
+        """
+        stats = self.rtt.stats()
+        timeout = self.timeout
+        if self.adaptive_timeout is not None:
+            timeout = self.adaptive_timeout.timeout(self.rtt, timeout)
+        stats.update(
+            connected=self.connected(),
+            connection_counter=self.connection_counter,
+            timeout=timeout,
+        )
+        if self.circuit_breaker is not None:
+            stats.update(self.circuit_breaker.stats())
+        if self.ssl is not None:
+            stats.update(self.ssl.stats())
+        return stats
+
 
 def socket_for_url(url, *args, **kwargs):
     addr = urllib.parse.urlparse(url)
     scheme = addr.scheme
-    if scheme == "tcp":
+    if scheme in ("tcp", "tls"):
+        kwargs = dict(url_options(addr.query), **kwargs)
+        if scheme == "tls":
+            kwargs.setdefault("ssl", True)
         return TCP(addr.hostname, addr.port, *args, **kwargs)
     raise ValueError("unsupported async scheme {!r} for {}".format(scheme, url))
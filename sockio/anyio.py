@@ -0,0 +1,461 @@
+"""
+AnyIO backend: the sockio TCP API on top of anyio.
+
+Runs natively on any event loop supported by anyio (asyncio, trio) so
+trio applications don't need a second event loop in a bridge thread.
+
+The socket is driven directly (non-blocking send/recv + anyio readiness
+waits) rather than through an anyio byte stream: streams may hold data
+read ahead from the socket, which would make in_waiting() and
+readbuffer() impossible to implement.
+
+    import trio
+    from sockio.anyio import TCP
+
+    async def main():
+        sock = TCP('acme.example.com', 5000)
+        print(await sock.write_readline(b'*IDN?\\n'))
+
+    trio.run(main)
+"""
+
+import socket
+import asyncio
+import functools
+import urllib.parse
+
+import anyio
+
+from .aio import DFT_KEEP_ALIVE, configure_socket
+from .tuning import profile_for, rearm_quickack, url_options, wants_quickack
+from .common import (
+    IPTOS_LOWDELAY,
+    DEFAULT_LIMIT,
+    ConnectionEOFError,
+    ConnectionTimeoutError,
+    log,
+)
+
+
+CHUNK_SIZE = 2 ** 16
+
+# anyio >= 4.7 renamed the socket readiness functions
+wait_readable = getattr(anyio, "wait_readable", None) or anyio.wait_socket_readable
+wait_writable = getattr(anyio, "wait_writable", None) or anyio.wait_socket_writable
+notify_closing = getattr(anyio, "notify_closing", None)
+
+_DFT = object()  # "use the TCP default" marker for per call options
+
+
+def ensure_connection(f):
+    name = f.__name__
+
+    @functools.wraps(f)
+    async def wrapper(self, *args, timeout=_DFT, deadline=None, **kwargs):
+        timeout = self.timeout if timeout is _DFT else timeout
+        if timeout is not None:
+            when = anyio.current_time() + timeout
+            deadline = when if deadline is None else min(deadline, when)
+        try:
+            with anyio.fail_after(None if deadline is None else
+                                  max(deadline - anyio.current_time(), 0)):
+                async with self._lock:
+                    if self.auto_reconnect and not self.connected():
+                        await self.open()
+                    return await f(self, *args, **kwargs)
+        except TimeoutError as error:
+            msg = "{} call timeout on '{}:{}'".format(name, self.host, self.port)
+            raise ConnectionTimeoutError(msg) from error
+
+    return wrapper
+
+
+def raw_handle_read(f):
+    @functools.wraps(f)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            reply = await f(self, *args, **kwargs)
+        except BaseException:
+            await self.close()
+            raise
+        if not reply:
+            await self.close()
+            raise ConnectionEOFError("Connection closed by peer")
+        return reply
+
+    return wrapper
+
+
+class BaseStream:
+    """Base asynchronous iterator stream helper for TCP connections"""
+
+    __slots__ = ("tcp",)
+
+    def __init__(self, tcp):
+        self.tcp = tcp
+
+    async def _read(self):
+        raise NotImplementedError
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._read()
+        except ConnectionEOFError:
+            raise StopAsyncIteration
+
+
+class LineStream(BaseStream):
+    """Line based asynchronous iterator stream helper for TCP connections"""
+
+    __slots__ = ("eol",)
+
+    def __init__(self, tcp, eol=None):
+        super().__init__(tcp)
+        self.eol = eol
+
+    async def _read(self):
+        return await self.tcp.readline(eol=self.eol)
+
+
+class BlockStream(BaseStream):
+    """
+    Fixed based asynchronous iterator stream helper for TCP connections.
+
+    - If limit is an int the block is of fixed size
+      (TCP.readexactly semantics)
+    - If limit is a string, block ends when the limit string is
+      found (TCP.readuntil semantics)
+    """
+
+    __slots__ = ("limit",)
+
+    def __init__(self, tcp, limit):
+        super().__init__(tcp)
+        self.limit = limit
+
+    async def _read(self):
+        try:
+            if isinstance(self.limit, int):
+                return await self.tcp.readexactly(self.limit)
+            else:
+                return await self.tcp.readuntil(self.limit)
+        except asyncio.IncompleteReadError as error:
+            if error.partial:
+                raise
+            else:
+                raise ConnectionEOFError()
+
+
+class TCP:
+    """
+    Same API as sockio.aio.TCP. Received data is kept in an internal
+    buffer; in_waiting() and readbuffer() also collect whatever the kernel
+    already received (non-blocking).
+    """
+
+    def __init__(
+        self,
+        host,
+        port,
+        eol=b"\n",
+        auto_reconnect=True,
+        on_connection_made=None,
+        on_connection_lost=None,
+        on_eof_received=None,
+        buffer_size=DEFAULT_LIMIT,
+        no_delay=True,
+        tos=IPTOS_LOWDELAY,
+        connection_timeout=None,
+        timeout=None,
+        keep_alive=DFT_KEEP_ALIVE,
+        profile=None,
+    ):
+        self.host = host
+        self.port = port
+        self.eol = eol
+        self.buffer_size = buffer_size
+        self.auto_reconnect = auto_reconnect
+        self.connection_counter = 0
+        self.on_connection_made = on_connection_made
+        self.on_connection_lost = on_connection_lost
+        self.on_eof_received = on_eof_received
+        self.no_delay = no_delay
+        self.tos = tos
+        self.connection_timeout = connection_timeout
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.profile = profile_for(profile)
+        self._quickack = wants_quickack(self.profile)
+        self.sock = None
+        self._buffer = bytearray()
+        self._eof = False
+        self._lock = anyio.Lock()
+        self._log = log.getChild("TCP({}:{})".format(host, port))
+
+    def __aiter__(self):
+        return LineStream(self)
+
+    async def _callback(self, name, *args):
+        callback = getattr(self, name)
+        if callback is None:
+            return
+        try:
+            res = callback(*args)
+            if hasattr(res, "__await__"):
+                await res
+        except Exception:
+            log.exception("Error in %s callback %r", name, callback.__name__)
+
+    async def open(self, **kwargs):
+        connection_timeout = kwargs.get("timeout", self.connection_timeout)
+        if self.connected():
+            raise ConnectionError("socket already open")
+        self._log.debug("open connection (#%d)", self.connection_counter + 1)
+        # make sure everything is clean before creating a new connection
+        await self.close()
+        try:
+            with anyio.fail_after(connection_timeout):
+                sock = await connect(self.host, self.port)
+        except TimeoutError:
+            addr = self.host, self.port
+            raise ConnectionTimeoutError("Connect call timeout on {}".format(addr))
+        configure_socket(sock, no_delay=self.no_delay, tos=self.tos,
+                         keep_alive=self.keep_alive, profile=self.profile)
+        self.sock = sock
+        self._buffer = bytearray()
+        self._eof = False
+        await self._callback("on_connection_made")
+        self.connection_counter += 1
+
+    async def close(self):
+        sock, self.sock = self.sock, None
+        self._buffer = bytearray()
+        self._eof = False
+        if sock is not None:
+            try:
+                if notify_closing is not None:
+                    notify_closing(sock)
+                sock.close()
+            finally:
+                await self._callback("on_connection_lost", None)
+
+    def connected(self):
+        return self.sock is not None and not self.at_eof()
+
+    is_open = property(connected)
+
+    def at_eof(self):
+        return self.sock is not None and self._eof and not self._buffer
+
+    def _receive_nowait(self):
+        """Move what the kernel already received to the buffer. False on EOF"""
+        try:
+            data = self.sock.recv(CHUNK_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return True
+        if not data:
+            self._eof = True
+            return False
+        self._buffer += data
+        if self._quickack:
+            rearm_quickack(self.sock)
+        return True
+
+    async def _receive(self):
+        """Wait for more data. Returns False on EOF"""
+        if self._eof:
+            return False
+        size = len(self._buffer)
+        while self._receive_nowait() and len(self._buffer) == size:
+            await wait_readable(self.sock)
+        if self._eof:
+            await self._callback("on_eof_received")
+            return False
+        return True
+
+    def in_waiting(self):
+        if not self.connected():
+            return 0
+        size = -1
+        while size != len(self._buffer) and not self._eof:
+            size = len(self._buffer)
+            self._receive_nowait()
+        return len(self._buffer)
+
+    async def _take_until(self, separator):
+        buff, start = self._buffer, 0
+        while True:
+            pos = buff.find(separator, start)
+            if pos >= 0:
+                end = pos + len(separator)
+                data = bytes(buff[:end])
+                del buff[:end]
+                return data
+            if len(buff) > self.buffer_size:
+                raise asyncio.LimitOverrunError(
+                    "Separator is not found, and chunk exceed the limit", len(buff)
+                )
+            start = max(len(buff) - len(separator) + 1, 0)
+            if not await self._receive():
+                partial = bytes(buff)
+                buff.clear()
+                raise asyncio.IncompleteReadError(partial, None)
+
+    async def _read_line(self, eol):
+        try:
+            return await self._take_until(eol)
+        except asyncio.IncompleteReadError as error:
+            return error.partial
+        except asyncio.LimitOverrunError as error:
+            self._buffer.clear()
+            raise ValueError(error.args[0])
+
+    @raw_handle_read
+    async def _read(self, n=-1):
+        if n < 0:
+            while await self._receive():
+                pass
+        elif not self._buffer and n:
+            await self._receive()
+        n = len(self._buffer) if n < 0 else n
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return data
+
+    @raw_handle_read
+    async def _readexactly(self, n):
+        while len(self._buffer) < n:
+            if not await self._receive():
+                partial = bytes(self._buffer)
+                self._buffer.clear()
+                raise asyncio.IncompleteReadError(partial, n)
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return data
+
+    @raw_handle_read
+    async def _readuntil(self, separator=b"\n"):
+        return await self._take_until(separator)
+
+    @raw_handle_read
+    async def _readline(self, eol=None):
+        return await self._read_line(self.eol if eol is None else eol)
+
+    @raw_handle_read
+    async def _readlines(self, n, eol=None):
+        eol = self.eol if eol is None else eol
+        return [await self._read_line(eol) for _ in range(n)]
+
+    async def _write(self, data):
+        sock, view = self.sock, memoryview(data)
+        try:
+            while view:
+                try:
+                    view = view[sock.send(view):]
+                except (BlockingIOError, InterruptedError):
+                    await wait_writable(sock)
+        except ConnectionError:
+            await self.close()
+            raise
+
+    async def _writelines(self, lines):
+        await self._write(b"".join(lines))
+
+    @ensure_connection
+    async def read(self, n=-1):
+        return await self._read(n)
+
+    @ensure_connection
+    async def readline(self, eol=None):
+        return await self._readline(eol=eol)
+
+    @ensure_connection
+    async def readlines(self, n, eol=None):
+        return await self._readlines(n, eol=eol)
+
+    @ensure_connection
+    async def readexactly(self, n):
+        return await self._readexactly(n)
+
+    @ensure_connection
+    async def readuntil(self, separator=b"\n"):
+        return await self._readuntil(separator)
+
+    @ensure_connection
+    async def readbuffer(self):
+        """Read all bytes currently available in the underlying buffer"""
+        size = self.in_waiting()
+        return (await self._read(size)) if size else b""
+
+    @ensure_connection
+    async def write(self, data):
+        return await self._write(data)
+
+    @ensure_connection
+    async def writelines(self, lines):
+        return await self._writelines(lines)
+
+    @ensure_connection
+    async def write_read(self, data, n=-1):
+        await self._write(data)
+        return await self._read(n=n)
+
+    @ensure_connection
+    async def write_readline(self, data, eol=None):
+        await self._write(data)
+        return await self._readline(eol=eol)
+
+    @ensure_connection
+    async def write_readlines(self, data, n, eol=None):
+        await self._write(data)
+        return await self._readlines(n, eol=eol)
+
+    @ensure_connection
+    async def writelines_readlines(self, lines, n=None, eol=None):
+        if n is None:
+            n = len(lines)
+        await self._writelines(lines)
+        return await self._readlines(n, eol=eol)
+
+    def reset_input_buffer(self):
+        if self.connected():
+            self.in_waiting()
+            self._buffer.clear()
+
+
+async def connect(host, port):
+    """Non-blocking TCP socket connected to the first reachable address"""
+    error = None
+    for family, type_, proto, _, addr in await anyio.getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    ):
+        sock = socket.socket(family, type_, proto)
+        sock.setblocking(False)
+        try:
+            try:
+                sock.connect(addr)
+            except (BlockingIOError, InterruptedError):
+                await wait_writable(sock)
+                code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if code:
+                    raise OSError(code, "Connect call failed {}".format(addr))
+            return sock
+        except OSError as err:
+            sock.close()
+            error = err
+        except BaseException:
+            sock.close()
+            raise
+    raise error or OSError("could not resolve {}:{}".format(host, port))
+
+
+def socket_for_url(url, *args, **kwargs):
+    addr = urllib.parse.urlparse(url)
+    scheme = addr.scheme
+    if scheme == "tcp":
+        kwargs = dict(url_options(addr.query), **kwargs)
+        return TCP(addr.hostname, addr.port, *args, **kwargs)
+    raise ValueError("unsupported anyio scheme {!r} for {}".format(scheme, url))
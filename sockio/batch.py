@@ -0,0 +1,123 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def split_lines(data, eol=b"\n", n=None):
+    """
+    Find the end offsets of the (at most n) complete lines in data
+    in a single pass. Returns an array of offsets starting with 0.
+    """
+    offsets = array("Q", [0])
+    if numpy is not None and len(eol) == 1 and len(data) > 256:
+        ends = numpy.flatnonzero(numpy.frombuffer(data, numpy.uint8) == eol[0])
+        if n is not None:
+            ends = ends[:n]
+        offsets.frombytes((ends + 1).astype(numpy.uint64).tobytes())
+        return offsets
+    size, pos = len(eol), 0
+    find, append = data.find, offsets.append
+    while n is None or len(offsets) <= n:
+        pos = find(eol, pos)
+        if pos < 0:
+            break
+        pos += size
+        append(pos)
+    return offsets
+
+
+class LineBatch:
+    """
+    Compact sequence of lines: one contiguous buffer plus an offsets array.
+
+    Lines are only materialized (as bytes or memoryview) on access.
+    """
+
+    __slots__ = ("data", "offsets")
+
+    def __init__(self, data=b"", offsets=None):
+        self.data = data
+        self.offsets = array("Q", [0]) if offsets is None else offsets
+
+    @classmethod
+    def from_lines(cls, lines):
+        offsets, end = array("Q", [0]), 0
+        for line in lines:
+            end += len(line)
+            offsets.append(end)
+        return cls(b"".join(lines), offsets)
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [batch for batch in batches if batch]
+        if len(batches) == 1:
+            return batches[0]
+        offsets, base = array("Q", [0]), 0
+        for batch in batches:
+            offsets.extend(base + offset for offset in batch.offsets[1:])
+            base += batch.nbytes
+        return cls(b"".join(batch.data[: batch.nbytes] for batch in batches), offsets)
+
+    @property
+    def nbytes(self):
+        return self.offsets[-1]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("line index out of range")
+        return self.data[self.offsets[index]: self.offsets[index + 1]]
+
+    def __iter__(self):
+        data, offsets = self.data, self.offsets
+        for i in range(len(offsets) - 1):
+            yield data[offsets[i]: offsets[i + 1]]
+
+    def __eq__(self, other):
+        if isinstance(other, LineBatch):
+            return self.data[: self.nbytes] == other.data[: other.nbytes] and (
+                self.offsets == other.offsets
+            )
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return "LineBatch({} lines, {} bytes)".format(len(self), self.nbytes)
+
+    def view(self, index):
+        """memoryview of a single line (no copy)"""
+        if index < 0:
+            index += len(self)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return memoryview(self.data)[start:end]
+
+    def views(self):
+        data, offsets = memoryview(self.data), self.offsets
+        for i in range(len(offsets) - 1):
+            yield data[offsets[i]: offsets[i + 1]]
+
+    def tolist(self):
+        return list(self)
+
+    def to_numpy(self):
+        """Fixed width bytes ("S") numpy array with one item per line"""
+        if numpy is None:
+            raise RuntimeError("to_numpy requires numpy")
+        offsets = numpy.frombuffer(self.offsets, dtype=numpy.uint64).astype(numpy.intp)
+        lengths = numpy.diff(offsets)
+        width = max(int(lengths.max()) if len(lengths) else 0, 1)
+        table = numpy.zeros((len(lengths), width), dtype=numpy.uint8)
+        mask = numpy.arange(width) < lengths[:, None]
+        table[mask] = numpy.frombuffer(self.data, numpy.uint8, count=int(offsets[-1]))
+        return table.view("S{}".format(width)).ravel()
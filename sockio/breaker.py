@@ -0,0 +1,117 @@
+"""
+Circuit breaker for unreachable endpoints.
+
+Without a breaker every call on a powered off instrument attempts a new
+connection and waits up to connection_timeout (holding the socket lock).
+With a breaker, failed connection attempts trip it:
+
+- closed: connections are attempted normally. failure_threshold
+  consecutive failures open the circuit
+- open: open() (and so every call needing a connection) fails immediately
+  with CircuitOpenError for reset_timeout seconds
+- half-open: the next open() is a probe; other attempts keep failing fast
+  until it is done. Success closes the circuit. Failure opens it again for
+  twice the previous reset timeout (at most max_reset_timeout)
+
+    sock = TCP(host, port, connection_timeout=1, circuit_breaker=True)
+    sock = TCP(host, port, circuit_breaker=dict(failure_threshold=5, reset_timeout=10))
+    print(sock.stats()["circuit"])
+"""
+
+import time
+
+from .common import CircuitOpenError
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitBreaker:
+
+    __slots__ = ("failure_threshold", "reset_timeout", "max_reset_timeout",
+                 "state", "failures", "trips", "rejected", "_retry_at",
+                 "_backoff", "_probing")
+
+    def __init__(self, failure_threshold=3, reset_timeout=5.0, max_reset_timeout=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        if max_reset_timeout is None:
+            max_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0  # consecutive failures
+        self.trips = 0
+        self.rejected = 0
+        self._retry_at = 0.0
+        self._backoff = reset_timeout
+        self._probing = False
+
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 if not open)"""
+        if self.state == CLOSED:
+            return 0.0
+        return max(self._retry_at - time.monotonic(), 0.0)
+
+    def before(self, address=""):
+        """Called before a connection attempt: raises CircuitOpenError to fail fast"""
+        if self.state == CLOSED:
+            return
+        if self.state == OPEN and time.monotonic() >= self._retry_at:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError(
+            "circuit open for {} (retry in {:.3f}s)".format(address, self.retry_in())
+        )
+
+    def success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._backoff = self.reset_timeout
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self._backoff = min(2 * self._backoff, self.max_reset_timeout)
+            self._trip()
+        elif self.failures >= self.failure_threshold:
+            self._trip()
+
+    def abort(self):
+        """
+        Called when an attempt ends before its outcome is known (ex: cancelled
+        while waiting for admission): not counted, frees the half-open probe
+        """
+        self._probing = False
+
+    def _trip(self):
+        self.state = OPEN
+        self.trips += 1
+        self._probing = False
+        self._retry_at = time.monotonic() + self._backoff
+
+    def reset(self):
+        """Close the circuit (ex: the instrument is known to be back)"""
+        self.success()
+
+    def stats(self):
+        return dict(
+            circuit=self.state,
+            circuit_failures=self.failures,
+            circuit_trips=self.trips,
+            circuit_rejected=self.rejected,
+            circuit_retry_in=self.retry_in(),
+        )
+
+
+def circuit_breaker_for(value):
+    """CircuitBreaker from True, a dict of options or a CircuitBreaker"""
+    if value is None or value is False:
+        return None
+    if value is True:
+        return CircuitBreaker()
+    if isinstance(value, dict):
+        return CircuitBreaker(**value)
+    return value
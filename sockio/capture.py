@@ -0,0 +1,231 @@
+"""
+Traffic capture and replay.
+
+A Capture records the traffic of a TCP (both directions, with timestamps)
+to a compact binary file:
+
+    sock = TCP(host, port, capture="session.cap")
+
+A ReplayServer serves a capture back: it waits for each request of the
+client and sends the recorded replies, with the original timing or as
+fast as possible. Each client connection replays the next recorded
+connection (cycling when there are more clients than recorded connections):
+
+    async with ReplayServer("session.cap", timing=False) as server:
+        sock = TCP(*server.address)
+
+or from the command line: `python -m sockio replay session.cap --port 5000`
+
+File format: a header (magic, start time) followed by records made of
+(time since start, kind, size) and size bytes of data. kind is one of
+SENT (client to server), RECEIVED (server to client), OPEN and CLOSE.
+"""
+
+import mmap
+import time
+import struct
+import asyncio
+
+from .common import log
+
+
+MAGIC = b"SOCKCAP1"
+FILE_HEADER = struct.Struct("<8sd")  # magic, start (time.time())
+RECORD = struct.Struct("<dBI")  # time since start (s), kind, size
+
+SENT, RECEIVED, OPEN, CLOSE = range(4)
+
+
+class Capture:
+    """
+    Capture file writer. Records are buffered (flush() or close() to make
+    sure they are written)
+    """
+
+    def __init__(self, filename, buffering=2 ** 16):
+        self.filename = filename
+        self.buffering = buffering
+        self.fobj = open(filename, "wb", buffering=buffering)
+        self.start = time.perf_counter()
+        self.fobj.write(FILE_HEADER.pack(MAGIC, time.time()))
+
+    def record(self, kind, data=b""):
+        if self.fobj is None:
+            return
+        now = time.perf_counter() - self.start
+        self.fobj.write(RECORD.pack(now, kind, len(data)))
+        if data:
+            self.fobj.write(data)
+
+    def sent(self, data):
+        self.record(SENT, data)
+
+    def received(self, data):
+        self.record(RECEIVED, data)
+
+    def flush(self):
+        if self.fobj is not None:
+            self.fobj.flush()
+
+    def close(self):
+        if self.fobj is not None:
+            self.fobj.close()
+            self.fobj = None
+
+    def reopen(self):
+        """Append the next records to the file of a closed capture"""
+        if self.fobj is None:
+            self.fobj = open(self.filename, "ab", buffering=self.buffering)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def capture_for(capture):
+    """Capture for a filename (or None or an existing Capture)"""
+    if capture is None or isinstance(capture, Capture):
+        return capture
+    return Capture(capture)
+
+
+class CaptureFile:
+    """mmap'ed capture file reader"""
+
+    def __init__(self, filename):
+        with open(filename, "rb") as fobj:
+            self.mmap = mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self.mmap)
+        magic, self.start = FILE_HEADER.unpack_from(self.buf)
+        if magic != MAGIC:
+            raise ValueError("{!r} is not a sockio capture file".format(filename))
+        self.records = self._index()
+
+    def _index(self):
+        """(time, kind, offset, size) of each record"""
+        records, offset, end = [], FILE_HEADER.size, len(self.buf)
+        unpack, header = RECORD.unpack_from, RECORD.size
+        while offset + header <= end:
+            t, kind, size = unpack(self.buf, offset)
+            offset += header
+            if offset + size > end:
+                log.warning("truncated capture file: last record ignored")
+                break
+            records.append((t, kind, offset, size))
+            offset += size
+        return records
+
+    def __iter__(self):
+        """(time, kind, data memoryview) of each record"""
+        buf = self.buf
+        for t, kind, offset, size in self.records:
+            yield t, kind, buf[offset: offset + size]
+
+    def sessions(self):
+        """Records grouped by connection (split on OPEN records)"""
+        sessions, session = [], []
+        for record in self.records:
+            if record[1] == OPEN:
+                if session:
+                    sessions.append(session)
+                session = []
+            elif record[1] != CLOSE:
+                session.append(record)
+        if session:
+            sessions.append(session)
+        return sessions
+
+    def close(self):
+        try:
+            self.buf.release()
+            self.mmap.close()
+        except BufferError:
+            # views still referenced (ex: by a transport write buffer)
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ReplayServer:
+    """
+    Serves a capture file. For each recorded connection, the server reads
+    as many bytes as the client sent at that point before sending the
+    recorded replies. With timing=True each reply is sent with the
+    recorded delay since the previous event; with timing=False as fast as
+    possible.
+    """
+
+    def __init__(self, filename, host="127.0.0.1", port=0, timing=True):
+        self.capture = CaptureFile(filename)
+        self.sessions = self.capture.sessions()
+        self.host = host
+        self.port = port
+        self.timing = timing
+        self.server = None
+        self.connections = 0
+        self.writers = set()
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def _handle(self, reader, writer):
+        self.writers.add(writer)
+        session = self.sessions[self.connections % len(self.sessions)]
+        self.connections += 1
+        loop = asyncio.get_event_loop()
+        buf, timing = self.capture.buf, self.timing
+        last_time, last_event = None, loop.time()
+        try:
+            for t, kind, offset, size in session:
+                if kind == SENT:
+                    if writer.transport.get_write_buffer_size():
+                        await writer.drain()
+                    await reader.readexactly(size)
+                    last_event = loop.time()
+                else:
+                    if timing and last_time is not None:
+                        delay = last_event + t - last_time - loop.time()
+                        if delay > 0:
+                            await writer.drain()
+                            await asyncio.sleep(delay)
+                    writer.write(buf[offset: offset + size])
+                    if timing:
+                        last_event = loop.time()
+                last_time = t
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def start(self):
+        if not self.sessions:
+            raise ValueError("empty capture")
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self
+
+    async def stop(self):
+        self.server.close()
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        await self.server.serve_forever()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+        self.capture.close()
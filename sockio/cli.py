@@ -0,0 +1,364 @@
+"""
+sockio command line.
+
+    python -m sockio repl tcp://acme.example.com:5000
+    python -m sockio bench tcp://acme.example.com:5000 -c 10 -d 4 -r "*IDN?" -t 10
+    python -m sockio sim simulator.yml --port 5000
+    python -m sockio replay session.cap --port 5000 --fast
+"""
+
+import sys
+import math
+import time
+import codecs
+import random
+import asyncio
+import logging
+import argparse
+
+from . import aio
+
+
+class LatencyHistogram:
+    """Logarithmic (base 2, microsecond resolution) latency histogram"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, dt, n=1):
+        us = max(int(dt * 1e6), 1)
+        bucket = us.bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+        self.count += n
+        self.total += dt * n
+        self.min = min(self.min, dt)
+        self.max = max(self.max, dt)
+
+    def merge(self, other):
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """Upper bound (seconds) of the bucket holding the p-th percentile"""
+        if not self.count:
+            return math.nan
+        target, acc = p / 100 * self.count, 0
+        for bucket in sorted(self.buckets):
+            acc += self.buckets[bucket]
+            if acc >= target:
+                return min((1 << bucket) * 1e-6, self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+    def summary(self):
+        return "n={} mean={} p50={} p99={} max={}".format(
+            self.count,
+            format_time(self.mean),
+            format_time(self.percentile(50)),
+            format_time(self.percentile(99)),
+            format_time(self.max),
+        )
+
+    def format(self, width=40):
+        if not self.count:
+            return "(empty)"
+        peak = max(self.buckets.values())
+        lines = []
+        for bucket in range(min(self.buckets), max(self.buckets) + 1):
+            n = self.buckets.get(bucket, 0)
+            low, high = (1 << (bucket - 1)) * 1e-6, (1 << bucket) * 1e-6
+            bar = "#" * int(round(width * n / peak))
+            lines.append(
+                "{:>9} - {:<9} {:>9} {}".format(
+                    format_time(low), format_time(high), n, bar
+                )
+            )
+        return "\n".join(lines)
+
+
+def format_time(t):
+    if math.isnan(t):
+        return "-"
+    for unit, factor in (("s", 1), ("ms", 1e3), ("us", 1e6)):
+        if t >= 1 / factor:
+            return "{:.3g}{}".format(t * factor, unit)
+    return "{:.3g}ns".format(t * 1e9)
+
+
+def parse_data(text, eol=b"\n"):
+    """Text with backslash escapes (ex: \\r) to bytes ending with eol"""
+    data = codecs.decode(text, "unicode_escape").encode("latin-1")
+    return data if data.endswith(eol) else data + eol
+
+
+def parse_request(text, eol=b"\n"):
+    """REQUEST[@WEIGHT] to (request bytes, weight)"""
+    request, sep, weight = text.rpartition("@")
+    if sep and weight.replace(".", "", 1).isdigit():
+        return parse_data(request, eol), float(weight)
+    return parse_data(text, eol), 1.0
+
+
+async def repl(sock, reply="auto", stdin=None, stdout=None):
+    """
+    Send each input line to the socket. With reply="auto", a reply line is
+    read when the command is a query (contains "?").
+    """
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+    loop = asyncio.get_event_loop()
+    eol = sock.eol
+    while True:
+        if stdin.isatty():
+            stdout.write("> ")
+            stdout.flush()
+        line = await loop.run_in_executor(None, stdin.readline)
+        if not line:
+            break
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        data = parse_data(line, eol)
+        try:
+            if reply == "always" or (reply == "auto" and b"?" in data):
+                start = time.perf_counter()
+                answer = await sock.write_readline(data)
+                dt = time.perf_counter() - start
+                stdout.write("{!r} ({})\n".format(answer, format_time(dt)))
+            else:
+                await sock.write(data)
+        except (ConnectionError, ValueError) as error:
+            stdout.write("ERROR: {!r}\n".format(error))
+        stdout.flush()
+
+
+# wait after a failed request, doubled on each consecutive failure
+ERROR_BACKOFF = 0.01
+MAX_ERROR_BACKOFF = 1.0
+
+
+class Bench:
+    """
+    Drive an endpoint with `concurrency` connections, each one keeping
+    `depth` pipelined requests (picked from the weighted request mix)
+    in flight. A connection backs off after a failed request (ERROR_BACKOFF
+    doubling up to MAX_ERROR_BACKOFF while the failures go on).
+    """
+
+    def __init__(self, url, requests, concurrency=1, depth=1, **kwargs):
+        self.url = url
+        self.requests = [request for request, _ in requests]
+        self.weights = [weight for _, weight in requests]
+        self.concurrency = concurrency
+        self.depth = depth
+        self.kwargs = kwargs
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+        self.start = None
+        self.stop = None
+
+    async def _worker(self, sock, stop, count):
+        requests, weights, depth = self.requests, self.weights, self.depth
+        histogram = LatencyHistogram()
+        self._histograms.append(histogram)
+        backoff = 0.0
+        while not stop.is_set() and (count is None or self._sent < count):
+            self._sent += depth
+            batch = random.choices(requests, weights, k=depth)
+            start = time.perf_counter()
+            try:
+                if depth == 1:
+                    await sock.write_readline(batch[0])
+                else:
+                    await sock.writelines_readlines(batch, compact=True)
+            except (ConnectionError, ValueError):
+                self.errors += 1
+                backoff = min(2 * backoff or ERROR_BACKOFF, MAX_ERROR_BACKOFF)
+                try:
+                    await asyncio.wait_for(stop.wait(), backoff)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            backoff = 0.0
+            histogram.record(time.perf_counter() - start, depth)
+
+    def _collect(self):
+        for histogram in self._histograms:
+            self.histogram.merge(histogram)
+            histogram.reset()
+
+    async def run(self, duration=None, count=None, interval=1.0, out=None):
+        out = sys.stdout if out is None else out
+        socks = [
+            aio.socket_for_url(self.url, **self.kwargs) for _ in range(self.concurrency)
+        ]
+        await asyncio.gather(*(sock.open() for sock in socks))
+        stop = asyncio.Event()
+        self._histograms, self._sent = [], 0
+        self.start = time.perf_counter()
+        workers = [
+            asyncio.ensure_future(self._worker(sock, stop, count)) for sock in socks
+        ]
+        end = None if duration is None else self.start + duration
+        last, last_count = self.start, 0
+        try:
+            while not all(worker.done() for worker in workers):
+                now = time.perf_counter()
+                waits = [interval or None, None if end is None else end - now]
+                waits = [t for t in waits if t is not None]
+                wait = max(min(waits), 0.001) if waits else None
+                await asyncio.wait(workers, timeout=wait)
+                self._collect()
+                now = time.perf_counter()
+                if interval and out is not None:
+                    rate = (self.histogram.count - last_count) / (now - last)
+                    out.write("{:8.1f}s {:>10.0f} req/s  errors={}  {}\n".format(
+                        now - self.start, rate, self.errors, self.histogram.summary()
+                    ))
+                    out.flush()
+                last, last_count = now, self.histogram.count
+                if end is not None and now >= end:
+                    stop.set()
+            await asyncio.gather(*workers)
+        finally:
+            stop.set()
+            self.stop = time.perf_counter()
+            self._collect()
+            await asyncio.gather(*(sock.close() for sock in socks))
+        return self.report()
+
+    def report(self):
+        elapsed = self.stop - self.start
+        return dict(
+            requests=self.histogram.count,
+            errors=self.errors,
+            elapsed=elapsed,
+            throughput=self.histogram.count / elapsed if elapsed else math.nan,
+            histogram=self.histogram,
+        )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="sockio", description="sockio command line")
+    log_level_choices = ["critical", "error", "warning", "info", "debug"]
+    log_level_choices += [i.upper() for i in log_level_choices]
+    parser.add_argument("--log-level", choices=log_level_choices, default="warning")
+    parser.add_argument("--eol", default="\\n", help="end of line (default: \\n)")
+    parser.add_argument("--timeout", type=float, default=None, help="call timeout (s)")
+    sub = parser.add_subparsers(dest="command")
+    sub.required = True
+
+    repl_parser = sub.add_parser("repl", help="interactive client")
+    repl_parser.add_argument("url", help="ex: tcp://acme.example.com:5000")
+    repl_parser.add_argument(
+        "--reply", choices=["auto", "always", "never"], default="auto",
+        help="when to read a reply (auto: only for queries, ie, containing '?')"
+    )
+
+    bench_parser = sub.add_parser("bench", help="load generator")
+    bench_parser.add_argument("url", help="ex: tcp://acme.example.com:5000")
+    bench_parser.add_argument(
+        "-r", "--request", action="append", required=True,
+        help="request (repeat for a request mix). Optional weight: '*IDN?@3'"
+    )
+    bench_parser.add_argument("-c", "--concurrency", type=int, default=1,
+                              help="number of connections")
+    bench_parser.add_argument("-d", "--depth", type=int, default=1,
+                              help="pipelined requests per connection")
+    bench_parser.add_argument("-t", "--duration", type=float, default=None,
+                              help="duration (s)")
+    bench_parser.add_argument("-n", "--count", type=int, default=None,
+                              help="total number of requests")
+    bench_parser.add_argument("-i", "--interval", type=float, default=1.0,
+                              help="live report interval (s)")
+
+    sim_parser = sub.add_parser("sim", help="instrument simulator")
+    sim_parser.add_argument("config", help="YAML command table")
+    sim_parser.add_argument("--host", default="0", help="host / IP")
+    sim_parser.add_argument("-p", "--port", type=int, default=0, help="port")
+
+    replay_parser = sub.add_parser("replay", help="capture replay server")
+    replay_parser.add_argument("capture", help="capture file (see TCP(capture=...))")
+    replay_parser.add_argument("--host", default="0", help="host / IP")
+    replay_parser.add_argument("-p", "--port", type=int, default=0, help="port")
+    replay_parser.add_argument(
+        "--fast", action="store_true",
+        help="reply as fast as possible (default: original timing)",
+    )
+
+    options = parser.parse_args(args)
+    fmt = "%(asctime)-15s %(levelname)-5s %(threadName)s %(name)s: %(message)s"
+    logging.basicConfig(level=options.log_level.upper(), format=fmt)
+    eol = codecs.decode(options.eol, "unicode_escape").encode("latin-1")
+    kwargs = dict(eol=eol, timeout=options.timeout)
+
+    if options.command == "repl":
+        async def run_repl():
+            sock = aio.socket_for_url(options.url, **kwargs)
+            try:
+                await repl(sock, options.reply)
+            finally:
+                await sock.close()
+
+        asyncio.run(run_repl())
+        return 0
+
+    if options.command == "sim":
+        from .sim import Simulator
+
+        async def run_sim():
+            sim = await Simulator(options.config, options.host, options.port).start()
+            print("serving on {}".format(sim.url))
+            await sim.serve_forever()
+
+        try:
+            asyncio.run(run_sim())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if options.command == "replay":
+        from .capture import ReplayServer
+
+        async def run_replay():
+            server = ReplayServer(
+                options.capture, options.host, options.port, timing=not options.fast
+            )
+            await server.start()
+            print("serving on tcp://{}:{}".format(*server.address))
+            await server.serve_forever()
+
+        try:
+            asyncio.run(run_replay())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if options.duration is None and options.count is None:
+        options.duration = 10
+    requests = [parse_request(request, eol) for request in options.request]
+    bench = Bench(options.url, requests, options.concurrency, options.depth, **kwargs)
+    try:
+        coro = bench.run(options.duration, options.count, options.interval)
+        result = asyncio.run(coro)
+    except KeyboardInterrupt:
+        return 1
+    print("\nrequests: {requests}  errors: {errors}  elapsed: {elapsed:.3f}s  "
+          "throughput: {throughput:.0f} req/s".format(**result))
+    print(result["histogram"].summary())
+    print(result["histogram"].format())
+    return 0
@@ -7,6 +7,7 @@ IPTOS_THROUGHPUT = 0x08
 IPTOS_RELIABILITY = 0x04
 IPTOS_MINCOST = 0x02
 DEFAULT_LIMIT = 2 ** 20  # 1MB
+LEAN_LIMIT = 2 ** 14  # 16KB: initial limit in lean mode (grows up to the buffer size)
 
 
 log = logging.getLogger("sockio")
@@ -18,3 +19,15 @@ class ConnectionEOFError(ConnectionError):
 
 class ConnectionTimeoutError(ConnectionError):
     pass
+
+
+class CircuitOpenError(ConnectionError):
+    """The circuit breaker of the socket is open: the call failed fast"""
+
+
+def block_header(size):
+    """IEEE 488.2 definite length arbitrary block header: #<n><size>"""
+    digits = b"%d" % size
+    if len(digits) > 9:
+        raise ValueError("block too large for a definite length header")
+    return b"#%d%s" % (len(digits), digits)
@@ -0,0 +1,302 @@
+"""
+Reader side dispatch of replies for protocols that don't fit the
+one-exchange-at-a-time model of TCP.write_readline.
+
+A Dispatcher owns the reading side of a TCP: a single reader task reads
+every line and dispatches it. Requests only write (without taking the TCP
+lock), so many requests can be outstanding at once. While a dispatcher is
+in use, the TCP read methods must not be used.
+
+Correlator: the device echoes a request tag in each reply and may answer
+out of order.
+
+    def encode(data, tag):
+        return b"%d " % tag + data
+
+    def extract(line):
+        return int(line.split(b" ", 1)[0])
+
+    correlator = sock.correlate(encode, extract)
+    requests = (correlator.request(b"MEAS?\\n") for _ in range(100))
+    replies = await asyncio.gather(*requests)
+
+Router: the device pushes unsolicited event lines on the connection which
+also answers queries. Events go to a callback or a queue, the other lines
+are the replies to the pending requests (in order).
+
+    router = sock.route(b"EVENT ", on_event=print)
+    reply = await router.write_readline(b"POS?\\n")
+"""
+
+import asyncio
+import itertools
+import collections
+
+from . import admission
+from .aio import _DFT, TimeoutScope
+from .common import ConnectionEOFError, log
+
+
+class Dispatcher:
+    """
+    Base class: a single reader task reads the lines of tcp and gives each
+    one to _dispatch. The connection (and the reader task) is (re)opened
+    on demand by the first request.
+    """
+
+    def __init__(self, tcp, eol=None):
+        self.tcp = tcp
+        self.eol = eol
+        self.task = None
+        self._lock = None
+
+    def _dispatch(self, line):
+        raise NotImplementedError
+
+    def _fail(self, error):
+        """Reader task ended: error is given to all pending requests"""
+        raise NotImplementedError
+
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    async def _ensure_reader(self):
+        if self.running():
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.running():
+                return
+            if not self.tcp.connected():
+                if not self.tcp.auto_reconnect and self.tcp.connection_counter:
+                    raise ConnectionError("Connection closed")
+                await self.tcp.open(priority=admission.PENDING)
+            self.task = asyncio.ensure_future(self._read_loop())
+
+    async def _read_loop(self):
+        tcp, eol, dispatch = self.tcp, self.eol, self._dispatch
+        error = ConnectionEOFError("Connection closed by peer")
+        try:
+            while True:
+                dispatch(await tcp._readline(eol))
+        except asyncio.CancelledError:
+            error = ConnectionError("Dispatcher closed")
+            raise
+        except Exception as err:
+            error = err
+        finally:
+            self._fail(error)
+
+    async def _send(self, data):
+        writer = self.tcp.writer
+        try:
+            writer.write(data)
+            await writer.drain()
+        except ConnectionError:
+            await self.tcp.close()
+            raise
+
+    async def close(self):
+        """Stop the reader task and close the connection"""
+        task, self.task = self.task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, ConnectionError):
+                pass
+        await self.tcp.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class Correlator(Dispatcher):
+    """
+    Tagged request/reply correlation: any number of requests can be in
+    flight and replies can come in any order.
+
+    - encode(data, tag) -> bytes to send
+    - extract(line) -> tag of a reply line
+    - tags: iterator of tags (default: 0, 1, 2...). Tags still in flight
+      are skipped, so a wrapping iterator is fine
+    - on_unmatched: called with a line that doesn't match any pending
+      request (default: log a warning)
+    """
+
+    def __init__(self, tcp, encode, extract, eol=None, tags=None, on_unmatched=None):
+        super().__init__(tcp, eol)
+        self.encode = encode
+        self.extract = extract
+        self.tags = itertools.count() if tags is None else iter(tags)
+        self.on_unmatched = on_unmatched
+        self.pending = {}
+
+    def _dispatch(self, line):
+        try:
+            tag = self.extract(line)
+        except Exception:
+            tag = None
+        future = self.pending.pop(tag, None)
+        if future is not None:
+            if not future.done():
+                future.set_result(line)
+        elif self.on_unmatched is not None:
+            self.on_unmatched(line)
+        else:
+            log.warning("%s:%s: unmatched reply %r", self.tcp.host, self.tcp.port, line)
+
+    def _fail(self, error):
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _next_tag(self):
+        tag = next(self.tags)
+        while tag in self.pending:
+            tag = next(self.tags)
+        return tag
+
+    async def request(self, data, timeout=_DFT, deadline=None):
+        """Send data tagged with a new tag and wait for the matching reply line"""
+        tcp = self.tcp
+        timeout = tcp.timeout if timeout is _DFT else timeout
+        message = "request call timeout on '{}:{}'"
+        with TimeoutScope(timeout, deadline, message, tcp.host, tcp.port):
+            await self._ensure_reader()
+            tag = self._next_tag()
+            future = asyncio.get_event_loop().create_future()
+            self.pending[tag] = future
+            try:
+                await self._send(self.encode(data, tag))
+                return await future
+            finally:
+                if self.pending.get(tag) is future:
+                    del self.pending[tag]
+
+    request.deadline_aware = True
+
+
+class Router(Dispatcher):
+    """
+    Splits incoming lines between unsolicited events and replies.
+
+    - is_event: predicate(line) -> bool or event prefix (bytes or tuple
+      of bytes)
+    - on_event: called (coroutines are scheduled) with each event line.
+      If None, events are put in the events queue (at most maxsize; the
+      oldest events are dropped when full)
+    - on_unmatched: called with a reply line when no request is pending
+      (default: log a warning)
+
+    Replies are given to the pending requests in order. A request which
+    times out keeps its place, so its late reply is discarded instead of
+    being taken by the next request.
+    """
+
+    def __init__(
+        self, tcp, is_event, on_event=None, maxsize=0, eol=None, on_unmatched=None
+    ):
+        super().__init__(tcp, eol)
+        if not callable(is_event):
+            is_event = _prefix_predicate(is_event)
+        self.is_event = is_event
+        self.on_event = on_event
+        self.events = asyncio.Queue(maxsize) if on_event is None else None
+        self.dropped_events = 0
+        self.on_unmatched = on_unmatched
+        self.pending = collections.deque()
+
+    def _dispatch(self, line):
+        if self.is_event(line):
+            self._event(line)
+            return
+        pending = self.pending
+        while pending:
+            future = pending.popleft()
+            if not future.done():
+                future.set_result(line)
+                return
+            if future.cancelled():
+                # late reply of a request which timed out
+                return
+        if self.on_unmatched is not None:
+            self.on_unmatched(line)
+        else:
+            tcp = self.tcp
+            log.warning("%s:%s: unexpected reply %r", tcp.host, tcp.port, line)
+
+    def _event(self, line):
+        if self.on_event is not None:
+            try:
+                result = self.on_event(line)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception:
+                log.exception("Error in on_event callback %r", self.on_event)
+            return
+        events = self.events
+        if events.full():
+            events.get_nowait()
+            self.dropped_events += 1
+        events.put_nowait(line)
+
+    def _fail(self, error):
+        pending, self.pending = self.pending, collections.deque()
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    async def next_event(self, timeout=None):
+        """Next event line from the events queue (not available with on_event)"""
+        if self.events is None:
+            raise RuntimeError("events are given to on_event: no events queue")
+        with TimeoutScope(timeout, None, "next_event timeout on '{}:{}'",
+                          self.tcp.host, self.tcp.port):
+            await self._ensure_reader()
+            return await self.events.get()
+
+    async def write(self, data):
+        await self._ensure_reader()
+        await self._send(data)
+
+    async def write_readlines(self, data, n, timeout=_DFT, deadline=None):
+        """Send data and wait for the next n reply lines (events are skipped)"""
+        tcp = self.tcp
+        timeout = tcp.timeout if timeout is _DFT else timeout
+        message = "write_readlines call timeout on '{}:{}'"
+        with TimeoutScope(timeout, deadline, message, tcp.host, tcp.port):
+            await self._ensure_reader()
+            loop = asyncio.get_event_loop()
+            futures = [loop.create_future() for _ in range(n)]
+            self.pending.extend(futures)
+            try:
+                await self._send(data)
+                return [await future for future in futures]
+            finally:
+                for future in futures:
+                    # keep their place: their replies will be discarded
+                    future.cancel()
+
+    async def write_readline(self, data, timeout=_DFT, deadline=None):
+        """Send data and wait for the next reply line (events are skipped)"""
+        lines = await self.write_readlines(data, 1, timeout=timeout, deadline=deadline)
+        return lines[0]
+
+    write_readlines.deadline_aware = True
+    write_readline.deadline_aware = True
+
+
+def _prefix_predicate(prefix):
+    if isinstance(prefix, (list, set)):
+        prefix = tuple(prefix)
+
+    def is_event(line):
+        return line.startswith(prefix)
+
+    return is_event
@@ -0,0 +1,273 @@
+"""
+Fault injection TCP proxy.
+
+FaultProxy sits between a client (ex: sockio.aio.TCP) and a server and
+forwards traffic while injecting latency, bandwidth caps and packet
+fragmentation. Faults (resets, stalls, server restarts, shaping changes)
+can be triggered by hand or played from a schedule:
+
+    schedule = [(1.0, Reset()), (2.0, Stall(0.5)), (4.0, Restart(1.0))]
+    async with FaultProxy(host, port, schedule=schedule) as proxy:
+        sock = TCP(*proxy.address)
+"""
+
+import socket
+import struct
+import asyncio
+
+from .common import log
+
+
+class Shaping:
+    """
+    Traffic shaping of one direction:
+
+    - latency: delay (s) added to each received chunk
+    - bandwidth: max throughput (bytes/s)
+    - fragment: max size (bytes) of each forwarded packet
+    """
+
+    def __init__(self, latency=0, bandwidth=None, fragment=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.fragment = fragment
+
+
+class Fault:
+    """Base class for faults: apply is called when the fault triggers"""
+
+    async def apply(self, proxy):
+        raise NotImplementedError
+
+    def __repr__(self):
+        args = ", ".join("{}={!r}".format(k, v) for k, v in vars(self).items())
+        return "{}({})".format(type(self).__name__, args)
+
+
+class Reset(Fault):
+    """
+    Reset (RST) all open connections. If after is given, the next
+    server to client transfer is cut after that number of bytes
+    (reset mid-reply)
+    """
+
+    def __init__(self, after=None):
+        self.after = after
+
+    async def apply(self, proxy):
+        if self.after is None:
+            proxy.reset()
+        else:
+            proxy.reset_after = self.after
+
+
+class Stall(Fault):
+    """
+    Stop forwarding in both directions for duration seconds. Connections
+    stay open (duration=None simulates a half-open connection until the
+    next Resume)
+    """
+
+    def __init__(self, duration=None):
+        self.duration = duration
+
+    async def apply(self, proxy):
+        proxy.stall()
+        if self.duration is not None:
+            await asyncio.sleep(self.duration)
+            proxy.resume()
+
+
+class Resume(Fault):
+    async def apply(self, proxy):
+        proxy.resume()
+
+
+class Restart(Fault):
+    """
+    Simulate a server restart: close every connection and refuse new ones
+    during downtime seconds
+    """
+
+    def __init__(self, downtime=0):
+        self.downtime = downtime
+
+    async def apply(self, proxy):
+        await proxy.restart(self.downtime)
+
+
+class Shape(Fault):
+    """Change the traffic shaping (both directions unless direction is given)"""
+
+    def __init__(self, latency=0, bandwidth=None, fragment=None, direction=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.fragment = fragment
+        self.direction = direction
+
+    async def apply(self, proxy):
+        shaping = Shaping(self.latency, self.bandwidth, self.fragment)
+        if self.direction in (None, "upstream"):
+            proxy.upstream = shaping
+        if self.direction in (None, "downstream"):
+            proxy.downstream = shaping
+
+
+def abort_with_reset(writer):
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+            )
+        except OSError:
+            pass
+    writer.transport.abort()
+
+
+class FaultProxy:
+    def __init__(
+        self,
+        target_host,
+        target_port,
+        host="127.0.0.1",
+        port=0,
+        upstream=None,
+        downstream=None,
+        schedule=(),
+        chunk_size=2 ** 16,
+    ):
+        self.target = target_host, target_port
+        self.host = host
+        self.port = port
+        # upstream: client -> server; downstream: server -> client
+        self.upstream = upstream or Shaping()
+        self.downstream = downstream or Shaping()
+        self.schedule = sorted(schedule, key=lambda item: item[0])
+        self.chunk_size = chunk_size
+        self.reset_after = None
+        self.server = None
+        self.connections = set()
+        self.flowing = asyncio.Event()
+        self.flowing.set()
+        self.events = []  # (time, fault) log of applied faults
+        self._schedule_task = None
+        self._start_time = None
+
+    @property
+    def address(self):
+        return self.host, self.port
+
+    async def _listen(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.host, self.port = self.server.sockets[0].getsockname()[:2]
+
+    async def start(self):
+        await self._listen()
+        loop = asyncio.get_event_loop()
+        self._start_time = loop.time()
+        if self.schedule:
+            self._schedule_task = loop.create_task(self._run_schedule())
+        return self
+
+    async def stop(self):
+        if self._schedule_task is not None:
+            self._schedule_task.cancel()
+        self.resume()
+        self._close_server()
+        self.reset()
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def inject(self, fault):
+        loop = asyncio.get_event_loop()
+        log.info("fault proxy %s:%s: %r", self.host, self.port, fault)
+        self.events.append((loop.time(), fault))
+        await fault.apply(self)
+
+    async def _run_schedule(self):
+        loop = asyncio.get_event_loop()
+        for at, fault in self.schedule:
+            await asyncio.sleep(max(self._start_time + at - loop.time(), 0))
+            loop.create_task(self.inject(fault))
+
+    def stall(self):
+        self.flowing.clear()
+
+    def resume(self):
+        self.flowing.set()
+
+    def reset(self):
+        for client_writer, server_writer in list(self.connections):
+            abort_with_reset(client_writer)
+            abort_with_reset(server_writer)
+        self.connections.clear()
+
+    def _close_server(self):
+        if self.server is not None:
+            self.server.close()
+
+    async def restart(self, downtime=0):
+        self._close_server()
+        # reset first: wait_closed (python >= 3.12.1) waits for the connections
+        self.reset()
+        await self.server.wait_closed()
+        await asyncio.sleep(downtime)
+        await self._listen()
+
+    async def _handle(self, client_reader, client_writer):
+        try:
+            server_reader, server_writer = await asyncio.open_connection(*self.target)
+        except OSError:
+            abort_with_reset(client_writer)
+            return
+        connection = client_writer, server_writer
+        self.connections.add(connection)
+        pumps = [
+            self._pump(client_reader, server_writer, "upstream"),
+            self._pump(server_reader, client_writer, "downstream"),
+        ]
+        try:
+            await asyncio.gather(*pumps)
+        except (ConnectionError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections.discard(connection)
+            for writer in connection:
+                writer.close()
+
+    async def _pump(self, reader, writer, direction):
+        loop = asyncio.get_event_loop()
+        while True:
+            data = await reader.read(self.chunk_size)
+            received = loop.time()
+            if not data:
+                if writer.can_write_eof():
+                    writer.write_eof()
+                return
+            await self.flowing.wait()
+            shaping = getattr(self, direction)
+            if shaping.latency:
+                await asyncio.sleep(max(received + shaping.latency - loop.time(), 0))
+            if direction == "downstream" and self.reset_after is not None:
+                after, self.reset_after = self.reset_after, None
+                writer.write(data[:after])
+                await writer.drain()
+                self.reset()
+                return
+            size = shaping.fragment or len(data)
+            for start in range(0, len(data), size):
+                await self.flowing.wait()
+                piece = data[start: start + size]
+                writer.write(piece)
+                await writer.drain()
+                if shaping.bandwidth:
+                    await asyncio.sleep(len(piece) / shaping.bandwidth)
+                elif shaping.fragment:
+                    await asyncio.sleep(0)
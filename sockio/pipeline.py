@@ -0,0 +1,189 @@
+"""
+Composable stream operators.
+
+A Pipeline pulls records from a stream (LineStream, BlockStream or any
+asynchronous iterable) in batches: every record already received is taken
+in a single call, so the operators run once per batch instead of once per
+record.
+
+    pipeline = (
+        LineStream(sock)
+        .map(parse, executor=pool)    # parse batches in a process pool
+        .filter(lambda value: value > 0)
+        .decimate(10)
+        .window(100)
+        .map(statistics.mean)
+    )
+    async for mean in pipeline:
+        print(mean)
+
+Stages given an executor run in it (loop.run_in_executor) with up to
+`concurrency` batches in flight; results keep the stream order. With a
+process pool the functions must be picklable.
+"""
+
+import asyncio
+import functools
+import collections
+
+from .common import ConnectionEOFError
+
+
+def _map_items(function, batch):
+    return [function(item) for item in batch]
+
+
+def _filter_items(predicate, batch):
+    return [item for item in batch if predicate(item)]
+
+
+def _reduce_items(function, batch):
+    return [functools.reduce(function, item) for item in batch]
+
+
+async def stream_batches(stream):
+    """Batches (lists) of records of an asynchronous iterable"""
+    read_batch = getattr(stream, "_read_batch", None)
+    if read_batch is None:
+        async for record in stream:
+            yield [record]
+        return
+    while True:
+        try:
+            batch = await read_batch()
+        except ConnectionEOFError:
+            return
+        if batch:
+            yield batch
+
+
+class Pipeline:
+    """
+    Chain of batch operators over a stream. Operators return a new
+    Pipeline so a pipeline can be shared as a prefix. Iterating gives the
+    records one by one; batches() gives the lists of records.
+    """
+
+    def __init__(self, source, stages=()):
+        self.source = source
+        self.stages = tuple(stages)
+
+    def pipe(self, stage):
+        """
+        Append a stage: a function taking an asynchronous iterator of
+        batches and returning one
+        """
+        return type(self)(self.source, self.stages + (stage,))
+
+    def map_batch(self, function, executor=None, concurrency=2):
+        """Apply function(batch) -> batch (ex: a vectorized numpy function)"""
+        return self.pipe(_apply_stage(function, executor, concurrency))
+
+    def map(self, function, executor=None, concurrency=2):
+        """Apply function to each record"""
+        function = functools.partial(_map_items, function)
+        return self.map_batch(function, executor, concurrency)
+
+    def filter(self, predicate, executor=None, concurrency=2):
+        """Keep the records for which predicate is true"""
+        function = functools.partial(_filter_items, predicate)
+        return self.map_batch(function, executor, concurrency)
+
+    def reduce(self, function, executor=None, concurrency=2):
+        """Reduce each record (a sequence, ex: a window) with function"""
+        function = functools.partial(_reduce_items, function)
+        return self.map_batch(function, executor, concurrency)
+
+    def decimate(self, n):
+        """Keep one record out of n"""
+        return self.pipe(functools.partial(_decimate_stage, n))
+
+    def window(self, size, step=None):
+        """
+        Group records in lists of size records, starting a new window every
+        step records (default: size, ie, non overlapping windows)
+        """
+        return self.pipe(functools.partial(_window_stage, size, step or size))
+
+    def rebatch(self, size):
+        """Regroup the records in batches of size records (last one may be smaller)"""
+        return self.pipe(functools.partial(_rebatch_stage, size))
+
+    def batches(self):
+        """Asynchronous iterator over the (non empty) output batches"""
+        batches = stream_batches(self.source)
+        for stage in self.stages:
+            batches = stage(batches)
+        return _skip_empty(batches)
+
+    async def __aiter__(self):
+        async for batch in self.batches():
+            for record in batch:
+                yield record
+
+
+async def _skip_empty(batches):
+    async for batch in batches:
+        if batch:
+            yield batch
+
+
+def _apply_stage(function, executor, concurrency):
+    if executor is None:
+        async def stage(batches):
+            async for batch in batches:
+                yield function(batch)
+    else:
+        async def stage(batches):
+            loop = asyncio.get_event_loop()
+            pending = collections.deque()
+            try:
+                async for batch in batches:
+                    while pending and pending[0].done():
+                        yield pending.popleft().result()
+                    if len(pending) >= concurrency:
+                        yield await pending.popleft()
+                    pending.append(loop.run_in_executor(executor, function, batch))
+                while pending:
+                    yield await pending.popleft()
+            finally:
+                for future in pending:
+                    future.cancel()
+    return stage
+
+
+async def _decimate_stage(n, batches):
+    offset = 0
+    async for batch in batches:
+        yield batch[offset::n]
+        offset = (offset - len(batch)) % n
+
+
+async def _window_stage(size, step, batches):
+    window, skip = [], 0
+    async for batch in batches:
+        out = []
+        if skip:
+            skipped = min(skip, len(batch))
+            batch, skip = batch[skipped:], skip - skipped
+        window.extend(batch)
+        while len(window) >= size:
+            out.append(window[:size])
+            if step < len(window):
+                del window[:step]
+            else:
+                # step > size: also drop the next records of the gap
+                skip = step - len(window)
+                window = []
+        yield out
+
+
+async def _rebatch_stage(size, batches):
+    buffer = []
+    async for batch in batches:
+        buffer.extend(batch)
+        while len(buffer) >= size:
+            yield buffer[:size]
+            del buffer[:size]
+    if buffer:
+        yield buffer
@@ -0,0 +1,408 @@
+"""
+Process-backed connections.
+
+A Worker is a separate process running an asyncio event loop with any
+number of sockio.aio.TCP objects. The parent gets proxies with the same
+blocking API as sockio.sio, so the I/O and the work done in the worker
+(see TCPProxy.call) don't compete for the parent's GIL:
+
+    with Worker() as worker:
+        sock = worker.tcp("acme.example.com", 5000)
+        reply = sock.write_readline(b"*IDN?\\n")
+        # parse in the worker process: parse(tcp, *args) (may be a coroutine)
+        values = sock.call(acquire_and_parse, 1000)
+
+or `socket_for_url("tcp://acme.example.com:5000", concurrency="process")`
+for a socket with its own worker.
+
+Requests and small replies go through a pipe (pickled). Bulk replies
+(bytes or lists of bytes of at least shm_threshold bytes) are copied into
+a shared memory arena owned by the parent instead; the parent copies them
+out in reply order and releases the space. When the arena is full the
+reply is pickled.
+
+Arguments and callbacks given to the TCP (ex: on_connection_made) and the
+functions given to call() must be picklable: they run in the worker.
+"""
+
+import struct
+import asyncio
+import itertools
+import threading
+import urllib.parse
+import multiprocessing
+import concurrent.futures
+
+from multiprocessing import shared_memory
+
+from . import aio
+from .sio import _apply_deadline
+from .common import log
+
+
+ARENA_HEADER = 64  # parent read position (tail) + padding
+_TAIL = struct.Struct("<Q")
+
+VALUE, SHM_BYTES, SHM_LIST = range(3)
+
+# public synchronous methods of aio.TCP served by the worker
+SYNC_METHODS = ("connected", "at_eof", "in_waiting", "reset_input_buffer", "stats")
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # python < 3.13
+        return shared_memory.SharedMemory(name)
+
+
+class _Arena:
+    """Worker side of the shared memory arena (single writer)"""
+
+    def __init__(self, name, threshold):
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        self.capacity = self.shm.size - ARENA_HEADER
+        self.threshold = threshold
+        self.head = 0
+
+    def put(self, chunks, total):
+        """Copy chunks into the arena. Returns their position or None if full"""
+        capacity, pos = self.capacity, self.head
+        if total > capacity:
+            return None
+        if pos % capacity + total > capacity:
+            pos += capacity - pos % capacity  # never split: wrap
+        (tail,) = _TAIL.unpack_from(self.buf)
+        if pos + total - tail > capacity:
+            return None
+        offset = ARENA_HEADER + pos % capacity
+        for chunk in chunks:
+            size = len(chunk)
+            self.buf[offset: offset + size] = chunk
+            offset += size
+        self.head = pos + total
+        return pos
+
+    def encode(self, result):
+        """(kind, payload) for a call result"""
+        if isinstance(result, (bytes, bytearray, memoryview)):
+            if len(result) >= self.threshold:
+                pos = self.put((result,), len(result))
+                if pos is not None:
+                    return SHM_BYTES, (pos, len(result))
+            return VALUE, bytes(result)
+        if isinstance(result, list) and result and all(
+            isinstance(item, bytes) for item in result
+        ):
+            sizes = [len(item) for item in result]
+            total = sum(sizes)
+            if total >= self.threshold:
+                pos = self.put(result, total)
+                if pos is not None:
+                    return SHM_LIST, (pos, sizes)
+        elif isinstance(result, tuple):
+            # ex: readframe (fields, memoryview)
+            result = tuple(
+                bytes(item) if isinstance(item, memoryview) else item for item in result
+            )
+        return VALUE, result
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+def _serve(conn, arena_name, threshold):
+    asyncio.run(_Server(conn, arena_name, threshold).run())
+
+
+class _Server:
+    """Worker process: runs the TCP objects and answers the parent requests"""
+
+    def __init__(self, conn, arena_name, threshold):
+        self.conn = conn
+        self.arena = _Arena(arena_name, threshold)
+        self.objects = {}
+        self.done = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.done = loop.create_future()
+        reader = threading.Thread(
+            name="sockio-worker-requests", target=self._recv_loop, args=(loop,)
+        )
+        reader.daemon = True
+        reader.start()
+        try:
+            await self.done
+        finally:
+            for tcp in self.objects.values():
+                await tcp.close()
+            self.objects.clear()
+            self.arena.close()
+
+    def _recv_loop(self, loop):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                message = ("stop", None)
+            loop.call_soon_threadsafe(self._dispatch, message)
+            if message[0] == "stop":
+                break
+
+    def _reply(self, call_id, kind, payload):
+        try:
+            self.conn.send((call_id, kind, payload))
+        except (OSError, ValueError):
+            pass  # parent gone
+        except Exception as error:
+            # result (or exception) cannot be pickled
+            error = TypeError("cannot send reply to the parent: {!r}".format(error))
+            self.conn.send((call_id, "error", error))
+
+    def _dispatch(self, message):
+        action = message[0]
+        if action == "stop":
+            if not self.done.done():
+                self.done.set_result(None)
+            return
+        call_id = message[1]
+        try:
+            if action == "tcp":
+                _, _, sid, host, port, args, kwargs = message
+                self.objects[sid] = aio.TCP(host, port, *args, **kwargs)
+                self._reply(call_id, VALUE, None)
+            elif action == "getattr":
+                _, _, sid, name = message
+                self._reply(call_id, VALUE, getattr(self.objects[sid], name))
+            elif action == "delete":
+                tcp = self.objects.pop(message[2], None)
+                if tcp is not None:
+                    asyncio.ensure_future(tcp.close())
+                self._reply(call_id, VALUE, None)
+            else:
+                asyncio.ensure_future(self._call(*message[1:]))
+        except Exception as error:
+            self._reply(call_id, "error", error)
+
+    async def _call(self, call_id, sid, name, args, kwargs):
+        try:
+            tcp = self.objects[sid]
+            if name is None:
+                # call(function, *args): run function(tcp, *args) here
+                function, args = args[0], args[1:]
+                result = function(tcp, *args, **kwargs)
+            else:
+                result = getattr(tcp, name)(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception as error:
+            self._reply(call_id, "error", error)
+        else:
+            self._reply(call_id, *self.arena.encode(result))
+
+
+class Worker:
+    """
+    Worker process hosting TCP objects.
+
+    - arena_size: size of the shared memory arena for bulk replies (bytes)
+    - shm_threshold: replies of at least this size go through the arena
+    - context: multiprocessing start method (default: "spawn")
+    """
+
+    def __init__(self, arena_size=2 ** 24, shm_threshold=2 ** 16, context="spawn"):
+        size = ARENA_HEADER + arena_size
+        self.arena = shared_memory.SharedMemory(create=True, size=size)
+        _TAIL.pack_into(self.arena.buf, 0, 0)
+        self.capacity = arena_size
+        self.shm_threshold = shm_threshold
+        ctx = multiprocessing.get_context(context)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            name="sockio-worker",
+            target=_serve,
+            args=(child_conn, self.arena.name, shm_threshold),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(
+            name="sockio-worker-replies", target=self._recv_loop, daemon=True
+        )
+        self._reader.start()
+
+    def _recv_loop(self):
+        conn, pending = self.conn, self._pending
+        while True:
+            try:
+                call_id, kind, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            future = pending.pop(call_id, None)
+            try:
+                if kind == "error":
+                    raise payload
+                result = self._decode(kind, payload)
+            except Exception as error:
+                if future is not None:
+                    future.set_exception(error)
+            else:
+                if future is not None:
+                    future.set_result(result)
+        error = ConnectionError("sockio worker process terminated")
+        with self._lock:
+            futures, self._pending = list(pending.values()), {}
+        for future in futures:
+            future.set_exception(error)
+
+    def _decode(self, kind, payload):
+        if kind == VALUE:
+            return payload
+        buf, capacity = self.arena.buf, self.capacity
+        if kind == SHM_BYTES:
+            pos, total = payload
+            offset = ARENA_HEADER + pos % capacity
+            result = bytes(buf[offset: offset + total])
+        else:
+            pos, sizes = payload
+            offset = ARENA_HEADER + pos % capacity
+            result = []
+            for size in sizes:
+                result.append(bytes(buf[offset: offset + size]))
+                offset += size
+            total = sum(sizes)
+        # replies come in arena order: everything up to here can be reused
+        _TAIL.pack_into(buf, 0, pos + total)
+        return result
+
+    def submit(self, action, *args):
+        """Send a request to the worker. Returns a concurrent.futures.Future"""
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self.conn.closed:
+                raise ConnectionError("sockio worker stopped")
+            call_id = next(self._ids)
+            self._pending[call_id] = future
+            try:
+                self.conn.send((action, call_id) + args)
+            except OSError:
+                del self._pending[call_id]
+                raise ConnectionError("sockio worker process terminated")
+        return future
+
+    def tcp(self, host, port, *args, resolve_futures=True, **kwargs):
+        """New TCP living in the worker (see sockio.aio.TCP for the arguments)"""
+        sid = next(self._ids)
+        self.submit("tcp", sid, host, port, args, kwargs).result()
+        return TCPProxy(self, sid, kwargs.get("timeout"), resolve_futures)
+
+    def stop(self, timeout=5):
+        """Close the worker TCP objects and stop the worker process"""
+        if self.conn.closed:
+            return
+        try:
+            with self._lock:
+                self.conn.send(("stop", None))
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            log.warning("sockio worker did not stop: terminating it")
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self._reader.join(timeout)
+        self.arena.close()
+        self.arena.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _TCPProxyBase:
+    """Proxy to a TCP living in a Worker. Attributes are read from the worker"""
+
+    def __init__(self, worker, sid, timeout=None, resolve_futures=True):
+        self._worker = worker
+        self._sid = sid
+        self._resolve = resolve_futures
+        self.timeout = timeout
+
+    def _remote(self, name, args, kwargs):
+        future = self._worker.submit("call", self._sid, name, args, kwargs)
+        return future.result() if self._resolve else future
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._worker.submit("getattr", self._sid, name).result()
+
+    def call(self, function, *args, **kwargs):
+        """
+        Run function(tcp, *args, **kwargs) in the worker (it may be a
+        coroutine function) and return its result. function must be
+        picklable (ex: a module level function)
+        """
+        return self._remote(None, (function,) + args, kwargs)
+
+    def delete(self):
+        """Close the TCP and release it in the worker"""
+        self._worker.submit("delete", self._sid).result()
+
+
+def _remote_method(name, deadline_aware):
+    def method(self, *args, **kwargs):
+        if deadline_aware:
+            _apply_deadline(self, kwargs)
+        return self._remote(name, args, kwargs)
+
+    method.__name__ = name
+    method.__doc__ = getattr(aio.TCP, name).__doc__
+    return method
+
+
+def _create_proxy_class():
+    members = {}
+    for name in dir(aio.TCP):
+        if name.startswith("_"):
+            continue
+        member = getattr(aio.TCP, name)
+        if asyncio.iscoroutinefunction(member) or name in SYNC_METHODS:
+            deadline_aware = getattr(member, "deadline_aware", False)
+            members[name] = _remote_method(name, deadline_aware)
+    return type("TCPProxy", (_TCPProxyBase,), members)
+
+
+TCPProxy = _create_proxy_class()
+
+
+def socket_for_url(url, *args, **kwargs):
+    """TCP with its own Worker (stopped when the socket is garbage collected)"""
+    addr = urllib.parse.urlparse(url)
+    scheme = addr.scheme
+    if scheme in ("tcp", "tls"):
+        kwargs = dict(aio.url_options(addr.query), **kwargs)
+        if scheme == "tls":
+            kwargs.setdefault("ssl", True)
+        worker = Worker()
+        sock = worker.tcp(addr.hostname, addr.port, *args, **kwargs)
+        sock._owner = _WorkerOwner(worker)
+        return sock
+    raise ValueError("unsupported process scheme {!r} for {}".format(scheme, url))
+
+
+class _WorkerOwner:
+    def __init__(self, worker):
+        self.worker = worker
+
+    def __del__(self):
+        self.worker.stop()
@@ -0,0 +1,103 @@
+"""
+Round trip time estimation and adaptive timeouts (in the style of the TCP
+retransmission timeout, RFC 6298).
+
+Each REQ-REP exchange (write_read family) of a TCP is a RTT sample. The
+smoothed RTT (SRTT) and its variation (RTTVAR) give an adaptive timeout:
+
+    timeout = SRTT + k * RTTVAR  (clamped to [min_timeout, max_timeout])
+
+    sock = TCP(host, port, timeout=2, adaptive_timeout=True)
+    print(sock.stats())
+"""
+
+import math
+
+
+class RTTEstimator:
+    """SRTT / RTTVAR estimator (alpha=1/8, beta=1/4 as in RFC 6298)"""
+
+    __slots__ = ("alpha", "beta", "srtt", "rttvar", "min", "max", "last",
+                 "samples", "timeouts")
+
+    def __init__(self, alpha=0.125, beta=0.25):
+        self.alpha = alpha
+        self.beta = beta
+        self.reset()
+
+    def reset(self):
+        self.srtt = math.nan
+        self.rttvar = math.nan
+        self.min = math.inf
+        self.max = 0.0
+        self.last = math.nan
+        self.samples = 0
+        self.timeouts = 0
+
+    def update(self, rtt):
+        if self.samples:
+            self.rttvar += self.beta * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += self.alpha * (rtt - self.srtt)
+        else:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        self.samples += 1
+        self.last = rtt
+        if rtt < self.min:
+            self.min = rtt
+        if rtt > self.max:
+            self.max = rtt
+
+    def rto(self, k=4):
+        return self.srtt + k * self.rttvar
+
+    def stats(self):
+        return dict(
+            srtt=self.srtt,
+            rttvar=self.rttvar,
+            rtt_min=self.min if self.samples else math.nan,
+            rtt_max=self.max if self.samples else math.nan,
+            rtt_last=self.last,
+            samples=self.samples,
+            timeouts=self.timeouts,
+        )
+
+
+class AdaptiveTimeout:
+    """
+    Adaptive timeout policy:
+
+    - k: RTTVAR factor
+    - min_timeout: lower bound (protects against very regular devices
+      which would otherwise get an almost zero timeout)
+    - max_timeout: upper bound (default: the TCP timeout, if any)
+    - min_samples: number of samples before the adaptive timeout is used
+      (the TCP timeout is used until then)
+    """
+
+    __slots__ = ("k", "min_timeout", "max_timeout", "min_samples")
+
+    def __init__(self, k=4, min_timeout=0.01, max_timeout=None, min_samples=4):
+        self.k = k
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+
+    def timeout(self, rtt, default=None):
+        """Timeout for the next exchange (default: the static timeout)"""
+        if rtt.samples < self.min_samples:
+            return default
+        timeout = max(rtt.rto(self.k), self.min_timeout)
+        upper = default if self.max_timeout is None else self.max_timeout
+        return timeout if upper is None else min(timeout, upper)
+
+
+def adaptive_timeout_for(value):
+    """AdaptiveTimeout from True, a dict of options or an AdaptiveTimeout"""
+    if value is None or value is False:
+        return None
+    if value is True:
+        return AdaptiveTimeout()
+    if isinstance(value, dict):
+        return AdaptiveTimeout(**value)
+    return value
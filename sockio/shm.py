@@ -0,0 +1,320 @@
+"""
+Shared memory stream fan-out.
+
+A Publisher reads one stream (ex: a LineStream or a BlockStream, or any
+asynchronous iterable of bytes) and writes each record into a ring buffer
+living in a multiprocessing.shared_memory block. Any number of Subscribers,
+in any process, read the records without copies, each one with its own
+cursor. The publisher never waits for subscribers: a subscriber which falls
+more than the buffer capacity behind is overrun and loses records (counted
+in Subscriber.lost).
+
+    # publisher process
+    async with Publisher(sock, capacity=2**24) as pub:
+        print(pub.name)
+        await pub.run()
+
+    # subscriber process(es)
+    with Subscriber(name) as sub:
+        for record in sub:
+            process(record)
+
+Layout: a header (magic, capacity, head, tail, count, closed) followed by
+the data area. Records are 16 byte aligned, prefixed by their size and
+sequence number and never split: a record that doesn't fit before the end
+of the data area starts again at the beginning. head and tail are
+monotonic byte positions of the end of the last record and of the start of
+the oldest record still intact.
+"""
+
+import sys
+import time
+import struct
+import secrets
+
+from multiprocessing import shared_memory
+
+from .common import log
+
+
+MAGIC = b"SOCKIORB"
+HEADER = struct.Struct("<8sQQQQQ")  # magic, capacity, head, tail, count, closed
+RECORD = struct.Struct("<IIQ")  # size, (reserved), sequence number
+DATA_OFFSET = 64
+ALIGN = RECORD.size  # so that a wrap marker always fits
+WRAP = 0xFFFFFFFF
+
+_HEAD = struct.Struct("<Q")
+_HEAD_OFFSET = 24
+_TAIL_OFFSET = 32
+_COUNT_OFFSET = 40
+_CLOSED_OFFSET = 48
+
+_OWNED = set()  # names of the blocks created by this process
+
+
+class OverrunError(Exception):
+    """The subscriber was too slow: records were overwritten before read"""
+
+    def __init__(self, lost):
+        super().__init__("subscriber overrun: {} record(s) lost".format(lost))
+        self.lost = lost
+
+
+def _align(n):
+    return (n + ALIGN - 1) & ~(ALIGN - 1)
+
+
+def _attach(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    shm = shared_memory.SharedMemory(name)
+    if name in _OWNED:
+        return shm
+    # before 3.13 attaching registers the block in the resource tracker
+    # which would destroy it when this (subscriber) process exits
+    try:
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+class Publisher:
+    """
+    Single writer of a shared memory ring buffer.
+
+    - stream: asynchronous iterable of bytes records consumed by run()
+      (optional: records can also be given directly to write())
+    - capacity: size of the data area (bytes)
+    - name: shared memory block name (default: random)
+    """
+
+    def __init__(self, stream=None, capacity=2 ** 24, name=None):
+        capacity = _align(capacity)
+        if name is None:
+            name = "sockio_" + secrets.token_hex(6)
+        self.stream = stream
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(
+            name, create=True, size=DATA_OFFSET + capacity
+        )
+        _OWNED.add(self.shm.name)
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, MAGIC, capacity, 0, 0, 0, 0)
+        self.head = 0
+        self.tail = 0
+        self.count = 0
+        self._starts = []  # start positions of the records still intact
+        self._first = 0  # index in _starts of the oldest intact record
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, record):
+        """Append one record (bytes-like)"""
+        size = len(record)
+        total = _align(RECORD.size + size)
+        capacity = self.capacity
+        if total > capacity:
+            raise ValueError(
+                "record of {} bytes does not fit in the ring buffer".format(size)
+            )
+        start = self.head
+        offset = start % capacity
+        if offset + total > capacity:
+            # not enough room before the end: mark and restart at the beginning
+            start += capacity - offset
+            self._release(start + total - capacity, start)
+            RECORD.pack_into(self.buf, DATA_OFFSET + offset, WRAP, 0, 0)
+            offset = 0
+        else:
+            self._release(start + total - capacity, start)
+        data = DATA_OFFSET + offset
+        self.buf[data + RECORD.size: data + RECORD.size + size] = record
+        RECORD.pack_into(self.buf, data, size, 0, self.count)
+        self._starts.append(start)
+        self.count += 1
+        self.head = start + total
+        _HEAD.pack_into(self.buf, _COUNT_OFFSET, self.count)
+        _HEAD.pack_into(self.buf, _HEAD_OFFSET, self.head)
+
+    def _release(self, until, start):
+        """Advance tail past the records that start before until"""
+        starts, first = self._starts, self._first
+        while first < len(starts) and starts[first] < until:
+            first += 1
+        tail = start if first == len(starts) else starts[first]
+        if first > 1024 and first * 2 > len(starts):
+            del starts[:first]
+            first = 0
+        self._first = first
+        if tail != self.tail:
+            self.tail = tail
+            # published before the data is overwritten
+            _HEAD.pack_into(self.buf, _TAIL_OFFSET, tail)
+
+    async def run(self):
+        """Publish every record of the stream. Closes at the end of the stream"""
+        try:
+            async for record in self.stream:
+                self.write(record)
+        finally:
+            self.close()
+
+    def close(self):
+        """Mark the end of the stream. Subscribers stop after the last record"""
+        if self.buf is not None:
+            _HEAD.pack_into(self.buf, _CLOSED_OFFSET, 1)
+
+    def unlink(self):
+        self.close()
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+        _OWNED.discard(self.shm.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.unlink()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.unlink()
+
+
+class Subscriber:
+    """
+    Reader of a shared memory ring buffer with its own cursor.
+
+    - name: shared memory block name (Publisher.name)
+    - start: "oldest" (start with the oldest intact record) or "latest"
+      (only records published from now on)
+    - overrun: "skip" (count the lost records in lost and continue with the
+      oldest intact record) or "raise" (raise OverrunError and continue
+      with the oldest intact record on the next read)
+    - poll: sleep time (s) between checks when waiting for a record
+    """
+
+    def __init__(self, name, start="oldest", overrun="skip", poll=0.0005):
+        if overrun not in ("skip", "raise"):
+            raise ValueError("overrun must be 'skip' or 'raise'")
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, capacity, head, tail, count, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError("{!r} is not a sockio ring buffer".format(name))
+        self.capacity = capacity
+        self.overrun = overrun
+        self.poll = poll
+        if start == "oldest" and head > tail:
+            self.pos = tail
+            self._skip_wrap()
+            offset = DATA_OFFSET + self.pos % capacity
+            self.seq = RECORD.unpack_from(self.buf, offset)[2]
+        else:
+            self.pos, self.seq = head, count
+        self.lost = 0
+        self._last = None
+
+    def _header(self, offset):
+        return _HEAD.unpack_from(self.buf, offset)[0]
+
+    def _resync(self, tail):
+        self.pos = tail
+        self._skip_wrap()
+        size, _, seq = RECORD.unpack_from(self.buf, DATA_OFFSET + tail % self.capacity)
+        lost = seq - self.seq
+        if self._header(_TAIL_OFFSET) > tail:
+            # overrun again while resyncing: try again from the new tail
+            return lost + self._resync(self._header(_TAIL_OFFSET))
+        self.lost += lost
+        self.seq = seq
+        return lost
+
+    def _skip_wrap(self):
+        offset = self.pos % self.capacity
+        size = RECORD.unpack_from(self.buf, DATA_OFFSET + offset)[0]
+        if size == WRAP:
+            self.pos += self.capacity - offset
+
+    def available(self):
+        """True if a record is ready to be read"""
+        return self._header(_HEAD_OFFSET) > self.pos
+
+    @property
+    def closed(self):
+        return bool(self._header(_CLOSED_OFFSET)) and not self.available()
+
+    def read_view(self, timeout=None):
+        """
+        Zero copy: memoryview on the next record inside the shared memory.
+        The view is only guaranteed to hold the record while valid() is
+        True (ie, until the publisher wraps around over it).
+        Returns None on timeout or at the end of the stream.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        while self._header(_HEAD_OFFSET) <= self.pos:
+            if self._header(_CLOSED_OFFSET):
+                return None
+            if end is not None and time.monotonic() >= end:
+                return None
+            time.sleep(self.poll)
+        tail = self._header(_TAIL_OFFSET)
+        if tail > self.pos:
+            lost = self._resync(tail)
+            if lost and self.overrun == "raise":
+                raise OverrunError(lost)
+        else:
+            self._skip_wrap()
+        offset = DATA_OFFSET + self.pos % self.capacity
+        size, _, seq = RECORD.unpack_from(self.buf, offset)
+        self._last, previous = self.pos, self.seq
+        if not self.valid():
+            # overwritten while reading the record header: resync
+            self.seq = previous
+            return self.read_view(timeout)
+        self.pos += _align(RECORD.size + size)
+        self.seq = seq + 1
+        return self.buf[offset + RECORD.size: offset + RECORD.size + size]
+
+    def valid(self):
+        """True if the last record returned by read_view is still intact"""
+        return self._last is not None and self._header(_TAIL_OFFSET) <= self._last
+
+    def read(self, timeout=None):
+        """Copy of the next record (None on timeout or at the end of the stream)"""
+        while True:
+            view = self.read_view(timeout)
+            if view is None:
+                return None
+            data = bytes(view)
+            view.release()
+            if self.valid():
+                return data
+            self.lost += 1
+            log.debug("shm subscriber: record overwritten while copying")
+
+    def __iter__(self):
+        while True:
+            record = self.read()
+            if record is None:
+                return
+            yield record
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,331 @@
+"""
+Scriptable instrument simulator.
+
+The behavior is given by a declarative command table. Either a dict
+mapping requests to replies:
+
+    {
+        "*IDN?": "ACME, bla ble ble, 1234, 5678",
+        "MEAS?": {"reply": "1.23", "latency": 0.01},
+    }
+
+or a list of command specs (the form used in YAML files):
+
+    eol: "\\n"
+    default: "ERROR: unknown command"
+    commands:
+      - request: "*IDN?"
+        reply: "ACME, bla ble ble, 1234, 5678"
+      - regex: "VOLT (.*)"
+        reply: "OK \\\\1"
+        latency: {dist: normal, mu: 0.002, sigma: 0.0005}
+        jitter: 0.0001
+      - request: "CURVE?"
+        block: 100000
+      - request: "DATA?"
+        reply: "1.2345 5.4321"
+        stream: {count: 1000, rate: 500}
+
+Requests are matched case insensitively (after stripping the EOL).
+Replies get the EOL appended (except binary blocks).
+
+Usage:
+
+    async with Simulator(table) as sim:
+        sock = TCP(*sim.address)
+
+or from the command line: `python -m sockio sim config.yml --port 5000`
+"""
+
+import os
+import re
+import random
+import asyncio
+import functools
+
+from .common import block_header, log
+
+
+def make_delay(spec, jitter=0):
+    """
+    Build a function returning a delay (seconds) from a latency spec:
+    a number, or a dict with a "dist" key (constant, uniform, normal,
+    exponential, lognormal) and the distribution parameters.
+    """
+    if spec is None:
+        spec = 0
+    if isinstance(spec, (int, float)):
+        base = functools.partial(float, spec)
+    else:
+        spec = dict(spec)
+        dist = spec.pop("dist", "constant")
+        if dist == "constant":
+            base = functools.partial(float, spec.get("value", 0))
+        elif dist == "uniform":
+            base = functools.partial(random.uniform, spec["low"], spec["high"])
+        elif dist == "normal":
+            base = functools.partial(random.gauss, spec["mu"], spec["sigma"])
+        elif dist == "exponential":
+            base = functools.partial(random.expovariate, 1 / spec["mean"])
+        elif dist == "lognormal":
+            base = functools.partial(random.lognormvariate, spec["mu"], spec["sigma"])
+        else:
+            raise ValueError("unsupported latency distribution {!r}".format(dist))
+    if not jitter:
+        if isinstance(spec, (int, float)) and not spec:
+            return None
+        return lambda: max(base(), 0)
+    return lambda: max(base() + random.uniform(-jitter, jitter), 0)
+
+
+def to_bytes(data):
+    if data is None or isinstance(data, bytes):
+        return data
+    return data.encode()
+
+
+class Command:
+    """One entry of the command table"""
+
+    def __init__(
+        self,
+        request=None,
+        reply=None,
+        regex=None,
+        latency=None,
+        jitter=0,
+        block=None,
+        stream=None,
+    ):
+        if (request is None) == (regex is None):
+            raise ValueError("command needs exactly one of request or regex")
+        self.request = None if request is None else to_bytes(request).lower()
+        self.regex = None
+        if regex is not None:
+            self.regex = re.compile(to_bytes(regex), re.IGNORECASE)
+        self.reply = reply if callable(reply) else to_bytes(reply)
+        self.delay = make_delay(latency, jitter)
+        if isinstance(block, int):
+            block = os.urandom(block)
+        self.block = None if block is None else to_bytes(block)
+        self.stream = stream
+
+    @classmethod
+    def from_spec(cls, request, spec):
+        if isinstance(spec, dict):
+            return cls(request, **spec)
+        return cls(request, spec)
+
+    def match(self, request):
+        if self.regex is None:
+            return request.lower() == self.request
+        return self.regex.fullmatch(request)
+
+    def render(self, match, eol):
+        """Reply bytes for the given match (None means no reply)"""
+        if self.block is not None:
+            return block_header(len(self.block)) + self.block + eol
+        reply = self.reply
+        if callable(reply):
+            reply = to_bytes(reply(match))
+        elif reply is not None and self.regex is not None:
+            reply = match.expand(reply)
+        return None if reply is None else reply + eol
+
+
+class CommandTable:
+    def __init__(self, commands=(), eol=b"\n", default=None):
+        self.eol = to_bytes(eol)
+        self.default = to_bytes(default)
+        self.exact = {}
+        self.patterns = []
+        for command in commands:
+            self.add(command)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from a {request: reply} dict or a dict with a commands list"""
+        if "commands" not in config:
+            config = dict(commands=config)
+        commands = config["commands"]
+        if isinstance(commands, dict):
+            commands = [Command.from_spec(req, rep) for req, rep in commands.items()]
+        else:
+            commands = [
+                cmd if isinstance(cmd, Command) else Command(**cmd) for cmd in commands
+            ]
+        return cls(commands, config.get("eol", b"\n"), config.get("default"))
+
+    @classmethod
+    def from_yaml(cls, filename):
+        import yaml  # optional dependency
+
+        with open(filename) as fobj:
+            return cls.from_config(yaml.safe_load(fobj))
+
+    def add(self, command):
+        if command.regex is None:
+            self.exact[command.request] = command
+        else:
+            self.patterns.append(command)
+
+    def find(self, request):
+        command = self.exact.get(request.lower())
+        if command is not None:
+            return command, None
+        for command in self.patterns:
+            match = command.match(request)
+            if match:
+                return command, match
+        return None, None
+
+
+class SimProtocol(asyncio.Protocol):
+    """
+    Serves one client. Requests are processed in order: a reply is only
+    sent after the previous one (like a real, single threaded instrument).
+    Immediate replies to all requests of one packet go in a single write.
+    """
+
+    def __init__(self, table, on_close=None):
+        self.table = table
+        self.on_close = on_close
+        self.buffer = b""
+        self.transport = None
+        self.busy_until = 0
+        self.tasks = set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.loop = asyncio.get_event_loop()
+
+    def connection_lost(self, exc):
+        for task in self.tasks:
+            task.cancel()
+        self.transport = None
+        if self.on_close is not None:
+            self.on_close(self)
+
+    def data_received(self, data):
+        table, eol = self.table, self.table.eol
+        buff = self.buffer + data if self.buffer else data
+        requests = buff.split(eol)
+        self.buffer = requests.pop()
+        out = []
+        for request in requests:
+            command, match = table.find(request)
+            if command is None:
+                if table.default is not None:
+                    out.append(table.default + eol)
+                continue
+            if command.stream is not None:
+                self._flush(out)
+                out = []
+                self._stream(command, match)
+                continue
+            reply = command.render(match, eol)
+            if command.delay is None and self.busy_until <= 0:
+                if reply is not None:
+                    out.append(reply)
+            else:
+                self._flush(out)
+                out = []
+                self._delay(command.delay() if command.delay else 0, reply)
+        self._flush(out)
+
+    def _flush(self, out):
+        if not out:
+            return
+        if self.busy_until > 0:
+            # earlier replies are still pending: keep order
+            self._delay(0, b"".join(out))
+        else:
+            self.transport.write(b"".join(out) if len(out) > 1 else out[0])
+
+    def _delay(self, delay, reply):
+        now = self.loop.time()
+        when = max(now, self.busy_until) + delay
+        self.busy_until = when
+        self.loop.call_at(when, self._send_delayed, reply, when)
+
+    def _send_delayed(self, reply, when):
+        if when >= self.busy_until:
+            self.busy_until = 0
+        if reply is not None and self.transport is not None:
+            self.transport.write(reply)
+
+    def _stream(self, command, match):
+        task = self.loop.create_task(self._stream_task(command, match))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _stream_task(self, command, match):
+        spec = command.stream
+        count, rate = spec.get("count"), spec.get("rate")
+        period = 1 / rate if rate else 0
+        start, i = self.loop.time(), 0
+        eol = self.table.eol
+        while (count is None or i < count) and self.transport is not None:
+            self.transport.write(command.render(match, eol))
+            i += 1
+            if period:
+                delay = start + i * period - self.loop.time()
+                await asyncio.sleep(max(delay, 0))
+            elif i % 100 == 0:
+                await asyncio.sleep(0)
+
+
+class Simulator:
+    """
+    asyncio TCP server serving a command table (see module documentation).
+    """
+
+    def __init__(self, config, host="127.0.0.1", port=0):
+        if isinstance(config, str):
+            config = CommandTable.from_yaml(config)
+        elif not isinstance(config, CommandTable):
+            config = CommandTable.from_config(config)
+        self.table = config
+        self.host = host
+        self.port = port
+        self.server = None
+        self.protocols = set()
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()[:2]
+
+    @property
+    def url(self):
+        return "tcp://{}:{}".format(*self.address)
+
+    def _protocol_factory(self):
+        protocol = SimProtocol(self.table, on_close=self.protocols.discard)
+        self.protocols.add(protocol)
+        return protocol
+
+    async def start(self):
+        loop = asyncio.get_event_loop()
+        self.server = await loop.create_server(
+            self._protocol_factory, self.host, self.port, reuse_address=True
+        )
+        log.info("simulator serving on %s:%s", *self.address)
+        return self
+
+    async def stop(self):
+        self.server.close()
+        for protocol in list(self.protocols):
+            if protocol.transport is not None:
+                protocol.transport.close()
+        await self.server.wait_closed()
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        await self.server.serve_forever()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
@@ -1,11 +1,61 @@
+import time
+import queue
+import types
 import asyncio
 import functools
 import threading
+import collections
 import urllib.parse
+import concurrent.futures
 
 from . import aio
 
 
+_DEADLINE = threading.local()
+
+
+class Deadline:
+    """
+    Context manager which bounds every sockio call made by the current
+    thread inside it by a single absolute deadline (time.monotonic clock).
+    The remaining budget is propagated to each call as its timeout.
+    """
+
+    def __init__(self, timeout=None, when=None):
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            when = deadline if when is None else min(when, deadline)
+        self.when = when
+        self._outer = None
+
+    def remaining(self):
+        if self.when is None:
+            return None
+        return max(self.when - time.monotonic(), 0)
+
+    def __enter__(self):
+        self._outer = getattr(_DEADLINE, "when", None)
+        if self._outer is not None and (self.when is None or self._outer < self.when):
+            self.when = self._outer
+        _DEADLINE.when = self.when
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _DEADLINE.when = self._outer
+        return False
+
+
+deadline = Deadline
+
+
+def _apply_deadline(ref, kwargs):
+    when = getattr(_DEADLINE, "when", None)
+    if when is not None:
+        remaining = max(when - time.monotonic(), 0)
+        timeout = kwargs.get("timeout", ref.timeout)
+        kwargs["timeout"] = remaining if timeout is None else min(timeout, remaining)
+
+
 class BaseProxy:
     def __init__(self, ref):
         self._ref = ref
@@ -39,6 +89,9 @@ class EventLoop:
 
         def run():
             self.loop = asyncio.new_event_loop()
+            if hasattr(asyncio, "eager_task_factory"):
+                # calls start executing as soon as they reach the loop
+                self.loop.set_task_factory(asyncio.eager_task_factory)
             asyncio.set_event_loop(self.loop)
             started.set()
             self.loop.run_forever()
@@ -63,22 +116,29 @@ class EventLoop:
         return asyncio.run_coroutine_threadsafe(coro, self.loop)
 
     def _create_coroutine_threadsafe(self, corof, resolve_future):
+        deadline_aware = getattr(corof, "deadline_aware", False)
+
         @functools.wraps(corof)
         def wrapper(obj, *args, **kwargs):
+            if deadline_aware:
+                _apply_deadline(obj._ref, kwargs)
             coro = corof(obj._ref, *args, **kwargs)
             future = self.run_coroutine(coro)
             return future.result() if resolve_future else future
 
+        wrapper._corof = corof
         return wrapper
 
     def _create_proxy_for(self, klass, resolve_futures=True):
         class Proxy(BaseProxy):
-            pass
+            _event_loop = self
 
         for name in dir(klass):
             if name.startswith("_"):
                 continue
             member = getattr(klass, name)
+            if isinstance(member, types.MemberDescriptorType):
+                continue  # __slots__ attribute: served by BaseProxy.__getattr__
             if asyncio.iscoroutinefunction(member):
                 member = self._create_coroutine_threadsafe(member, resolve_futures)
             setattr(Proxy, name, member)
@@ -94,6 +154,48 @@ class EventLoop:
             self.proxies[key] = Proxy
         return Proxy(obj)
 
+    @ensure_running
+    def submit_calls(self, calls):
+        """
+        Schedule many (method, args) calls with a single crossing to the
+        event loop thread. method is a coroutine method of a proxy (or of
+        the underlying object) owned by this event loop and args is either
+        a tuple of positional arguments, a dict of keyword arguments or a
+        single positional argument.
+        Returns the list of concurrent.futures.Future (in order)
+        """
+        prepared = []
+        for method, args in calls:
+            obj = method.__self__
+            # proxy methods: call the aio coroutine method they wrap
+            func = getattr(method.__func__, "_corof", method.__func__)
+            ref = getattr(obj, "_ref", obj)
+            kwargs = {}
+            if isinstance(args, dict):
+                args, kwargs = (), dict(args)
+            elif not isinstance(args, tuple):
+                args = (args,)
+            if getattr(func, "deadline_aware", False):
+                _apply_deadline(ref, kwargs)
+            prepared.append((func, ref, args, kwargs, concurrent.futures.Future()))
+
+        def schedule():
+            for func, ref, args, kwargs, future in prepared:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                task = self.loop.create_task(func(ref, *args, **kwargs))
+                task.add_done_callback(functools.partial(_copy_result, future))
+
+        self.loop.call_soon_threadsafe(schedule)
+        return [item[-1] for item in prepared]
+
+    def submit_many(self, method, arg_list):
+        """
+        Schedule method(*args) for each args in arg_list with a single
+        crossing to the event loop thread (see submit_calls).
+        """
+        return self.submit_calls((method, args) for args in arg_list)
+
     @ensure_running
     def tcp(self, host, port, resolve_futures=True, **kwargs):
         async def create():
@@ -103,6 +205,83 @@ class EventLoop:
         return self.proxy(sock, resolve_futures)
 
 
+def _copy_result(future, task):
+    if task.cancelled():
+        future.set_exception(concurrent.futures.CancelledError())
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+def submit_many(method, arg_list):
+    """
+    Schedule method(*args) for each args in arg_list on the event loop of
+    the proxy with a single thread crossing. Returns a list of futures.
+
+        futures = submit_many(sock.write_readline, 1000 * [b"*IDN?\n"])
+    """
+    return method.__self__._event_loop.submit_many(method, arg_list)
+
+
+def as_completed(futures, timeout=None):
+    """
+    Iterator over the futures as they complete (like
+    concurrent.futures.as_completed but with a single queue shared by
+    all futures instead of a waiter per call)
+    """
+    futures = set(futures)
+    end = None if timeout is None else time.monotonic() + timeout
+    done = queue.SimpleQueue()
+    active = True
+
+    def put(future):
+        # futures have no remove_done_callback: stay inert once finished
+        if active:
+            done.put(future)
+
+    for future in futures:
+        future.add_done_callback(put)
+    try:
+        for _ in range(len(futures)):
+            try:
+                remaining = None if end is None else max(end - time.monotonic(), 0)
+                yield done.get(timeout=remaining)
+            except queue.Empty:
+                raise concurrent.futures.TimeoutError() from None
+    finally:
+        active = False
+
+
+DoneAndNotDoneFutures = collections.namedtuple("DoneAndNotDoneFutures", "done not_done")
+
+FIRST_COMPLETED = concurrent.futures.FIRST_COMPLETED
+FIRST_EXCEPTION = concurrent.futures.FIRST_EXCEPTION
+ALL_COMPLETED = concurrent.futures.ALL_COMPLETED
+
+
+def wait(futures, timeout=None, return_when=ALL_COMPLETED):
+    """
+    Wait for the futures. Same semantics as concurrent.futures.wait.
+    Returns a (done, not_done) named tuple of sets
+    """
+    futures = set(futures)
+    done = set()
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            done.add(future)
+            if return_when == FIRST_COMPLETED:
+                break
+            if return_when == FIRST_EXCEPTION and not future.cancelled() and (
+                future.exception() is not None
+            ):
+                break
+    except concurrent.futures.TimeoutError:
+        pass
+    done |= {future for future in futures if future.done()}
+    return DoneAndNotDoneFutures(done, futures - done)
+
+
 DefaultEventLoop = EventLoop()
 TCP = DefaultEventLoop.tcp
 
@@ -110,6 +289,9 @@ TCP = DefaultEventLoop.tcp
 def socket_for_url(url, *args, **kwargs):
     addr = urllib.parse.urlparse(url)
     scheme = addr.scheme
-    if scheme == "tcp":
+    if scheme in ("tcp", "tls"):
+        kwargs = dict(aio.url_options(addr.query), **kwargs)
+        if scheme == "tls":
+            kwargs.setdefault("ssl", True)
         return TCP(addr.hostname, addr.port, *args, **kwargs)
     raise ValueError("unsupported sync scheme {!r} for {}".format(scheme, url))
@@ -0,0 +1,79 @@
+"""
+TLS with session resumption across reconnections.
+
+    sock = TCP(host, port, ssl=True)  # default client context
+    sock = TCP(host, port, ssl=context, server_hostname="gateway.acme")
+    sock = socket_for_url("tls://gateway.acme:5000")
+
+Each TCP keeps the TLS session of its last connection and offers it when
+it reconnects (auto-reconnect included): the server can then resume the
+session with an abbreviated handshake instead of a full one
+(ssl=ResumingContext(context, resume=False) disables it).
+TCP.stats() reports tls_handshakes and tls_resumed.
+"""
+
+import ssl as _ssl
+
+
+class ResumingContext:
+    """
+    SSLContext wrapper which offers the session of the previous connection
+    to the next one (asyncio creates the SSLObject with wrap_bio).
+    With resume=False it only counts the handshakes
+    """
+
+    __slots__ = ("context", "resume", "ssl_object", "handshakes", "resumed")
+
+    def __init__(self, context, resume=True):
+        self.context = context
+        self.resume = resume
+        self.ssl_object = None
+        self.handshakes = 0
+        self.resumed = 0
+
+    @property
+    def session(self):
+        # read late: TLS 1.3 tickets arrive after the handshake
+        ssl_object = self.ssl_object
+        return None if ssl_object is None else ssl_object.session
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None,
+                 session=None):
+        if session is None and self.resume:
+            session = self.session
+        ssl_object = self.context.wrap_bio(
+            incoming, outgoing, server_side=server_side,
+            server_hostname=server_hostname, session=session,
+        )
+        self.ssl_object = ssl_object
+        return ssl_object
+
+    def connection_made(self, ssl_object):
+        """Called once the handshake is done"""
+        self.handshakes += 1
+        if ssl_object is not None and ssl_object.session_reused:
+            self.resumed += 1
+
+    def clear(self):
+        """Forget the cached session (next connection does a full handshake)"""
+        self.ssl_object = None
+
+    def stats(self):
+        return dict(tls_handshakes=self.handshakes, tls_resumed=self.resumed)
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+
+def ssl_context_for(value):
+    """
+    ResumingContext from True (default client context), an SSLContext or
+    a ResumingContext
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        value = _ssl.create_default_context()
+    if isinstance(value, ResumingContext):
+        return value
+    return ResumingContext(value)
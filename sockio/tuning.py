@@ -0,0 +1,139 @@
+"""
+Socket tuning profiles.
+
+A profile is a dict of socket options applied when the connection is made:
+
+- quickack: TCP_QUICKACK (re-armed after each read, Linux)
+- user_timeout: TCP_USER_TIMEOUT (ms): max time sent data may remain
+  unacknowledged before the connection is dropped (Linux)
+- busy_poll: SO_BUSY_POLL (us): busy poll the device queue on blocking
+  reads (Linux, may need CAP_NET_ADMIN)
+- rcvbuf, sndbuf: SO_RCVBUF, SO_SNDBUF (bytes)
+- cork: TCP_CORK around writelines and writelines_readlines (Linux)
+- tos: IP_TOS
+
+Named profiles: "lowlatency", "throughput" and "bulk".
+
+    sock = TCP(host, port, profile="lowlatency")
+    sock = socket_for_url("tcp://host:5000?profile=bulk&sndbuf=8388608")
+"""
+
+import sys
+import socket
+import contextlib
+import urllib.parse
+
+from .common import IPTOS_LOWDELAY, IPTOS_THROUGHPUT, log
+
+
+_LINUX = sys.platform.startswith("linux")
+
+TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+TCP_USER_TIMEOUT = getattr(socket, "TCP_USER_TIMEOUT", 18 if _LINUX else None)
+TCP_CORK = getattr(socket, "TCP_CORK", None)
+SO_BUSY_POLL = getattr(socket, "SO_BUSY_POLL", 46 if _LINUX else None)
+
+PROFILES = {
+    "lowlatency": dict(
+        quickack=True, user_timeout=5000, busy_poll=50, tos=IPTOS_LOWDELAY
+    ),
+    "throughput": dict(rcvbuf=2 ** 22, sndbuf=2 ** 22, tos=IPTOS_THROUGHPUT),
+    "bulk": dict(rcvbuf=2 ** 22, sndbuf=2 ** 22, cork=True, tos=IPTOS_THROUGHPUT),
+}
+
+# option name: (level, option, type)
+_OPTIONS = {
+    "user_timeout": (socket.IPPROTO_TCP, TCP_USER_TIMEOUT, int),
+    "busy_poll": (socket.SOL_SOCKET, SO_BUSY_POLL, int),
+    "rcvbuf": (socket.SOL_SOCKET, socket.SO_RCVBUF, int),
+    "sndbuf": (socket.SOL_SOCKET, socket.SO_SNDBUF, int),
+    "tos": (socket.IPPROTO_IP, getattr(socket, "IP_TOS", None), int),
+    "quickack": (socket.IPPROTO_TCP, TCP_QUICKACK, bool),
+    "cork": (None, None, bool),  # applied per operation
+}
+
+
+def profile_for(profile):
+    """Profile dict from a profile name, a dict of options or None"""
+    if profile is None:
+        return None
+    if isinstance(profile, str):
+        try:
+            return dict(PROFILES[profile])
+        except KeyError:
+            raise ValueError(
+                "unknown socket profile {!r} (known: {})".format(
+                    profile, ", ".join(PROFILES)
+                )
+            )
+    options = dict(profile)
+    base = options.pop("profile", None)
+    if base is not None:
+        options = dict(profile_for(base), **options)
+    unknown = set(options) - set(_OPTIONS)
+    if unknown:
+        raise ValueError(
+            "unknown socket option(s): {}".format(", ".join(sorted(unknown)))
+        )
+    return options
+
+
+def apply_profile(sock, profile):
+    """Set the socket options of the profile (unsupported ones are skipped)"""
+    for name, value in profile.items():
+        level, option, kind = _OPTIONS[name]
+        if option is None or value is None:
+            continue
+        try:
+            sock.setsockopt(level, option, int(kind(value)))
+        except OSError as error:
+            log.debug("could not set socket option %s=%r: %r", name, value, error)
+
+
+def wants_quickack(profile):
+    """True if the profile asks for TCP_QUICKACK and the platform has it"""
+    return TCP_QUICKACK is not None and bool(profile and profile.get("quickack"))
+
+
+def rearm_quickack(sock):
+    # the kernel leaves quick ack mode on its own: set it again after each read
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def corked(sock):
+    """Hold partial frames (TCP_CORK) until the end of the block"""
+    if TCP_CORK is None:
+        yield
+        return
+    sock.setsockopt(socket.IPPROTO_TCP, TCP_CORK, 1)
+    try:
+        yield
+    finally:
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, TCP_CORK, 0)
+        except OSError:
+            pass
+
+
+def url_options(query):
+    """TCP keyword arguments from a URL query (ex: profile=bulk&sndbuf=65536)"""
+    options = dict(urllib.parse.parse_qsl(query))
+    if not options:
+        return {}
+    profile = {}
+    for name, value in options.items():
+        if name == "profile":
+            profile[name] = value
+        elif name in _OPTIONS:
+            kind = _OPTIONS[name][2]
+            if kind is bool:
+                profile[name] = value.lower() in ("1", "true", "yes", "on")
+            else:
+                profile[name] = kind(value)
+        else:
+            raise ValueError("unsupported URL parameter {!r}".format(name))
+    return dict(profile=profile_for(profile))
@@ -1,18 +1,21 @@
 import queue
+import struct
 import asyncio
 
 import pytest
 
 import sockio.aio
+import sockio.admission
 import sockio.sio
 import sockio.py2
+import sockio.sim
 
 
 IDN_REQ, IDN_REP = b"*idn?\n", b"ACME, bla ble ble, 1234, 5678\n"
 WRONG_REQ, WRONG_REP = b"wrong question\n", b"ERROR: unknown command\n"
 
 
-async def server_coro(start_serving=True):
+async def server_coro(start_serving=True, port=0, ssl=None):
     writers = set()
 
     async def cb(reader, writer):
@@ -44,6 +47,22 @@ async def server_coro(start_serving=True):
                     writer.close()
                     await writer.wait_closed()
                     return
+                elif data_l.startswith(b"big"):
+                    n = int(data.strip().split(b" ", 1)[-1])
+                    msg = n * b"x" + b"\n"
+                elif data_l.startswith(b"frames"):
+                    # n frames: >HI header (frame index, payload size) + payload
+                    n = int(data.strip().split(b" ", 1)[-1])
+                    msg = b"".join(
+                        struct.pack(">HI", i, 10 * i) + 10 * i * bytes([65 + i])
+                        for i in range(n)
+                    )
+                elif data_l.startswith(b"records"):
+                    # n binary records: <dHf (timestamp, channel, value)
+                    n = int(data.strip().split(b" ", 1)[-1])
+                    msg = b"".join(
+                        struct.pack("<dHf", i / 10, i % 4, i) for i in range(n)
+                    )
                 elif data_l.startswith(b"kill"):
                     writer.close()
                     await writer.wait_closed()
@@ -71,7 +90,9 @@ async def server_coro(start_serving=True):
             writer.close()
             await writer.wait_closed()
 
-    server = await asyncio.start_server(cb, host="0", start_serving=start_serving)
+    server = await asyncio.start_server(
+        cb, host="0", port=port, ssl=ssl, start_serving=start_serving
+    )
     server.stop = stop
     return server
 
@@ -83,6 +104,27 @@ async def aio_server():
     await server.stop()
 
 
+SIM_TABLE = {
+    "default": WRONG_REP.strip(),
+    "commands": [
+        dict(request=IDN_REQ.strip(), reply=IDN_REP.strip()),
+        dict(regex=rb"echo (.*)", reply=rb"\1"),
+    ],
+}
+
+
+@pytest.fixture
+async def sim_server():
+    async with sockio.sim.Simulator(SIM_TABLE) as sim:
+        yield sim
+
+
+@pytest.fixture
+def controller():
+    yield sockio.admission.configure(max_connecting=2)
+    sockio.admission.disable()
+
+
 @pytest.fixture
 async def aio_tcp(aio_server):
     addr = aio_server.sockets[0].getsockname()
@@ -97,7 +139,7 @@ def sio_server():
     channel = queue.Queue()
 
     async def serve_forever():
-        server = await server_coro(start_serving=False)
+        server = await server_coro()
         channel.put(server)
         await server.serve_forever()
         await server.stop()
@@ -0,0 +1,137 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+import sockio.sio
+from sockio import admission
+from sockio.aio import TCP, ConnectionTimeoutError
+
+from conftest import IDN_REQ, IDN_REP
+
+
+class Tracker:
+    """on_connection_made callback recording concurrency and order"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+        self.order = []
+
+    def callback(self, name):
+        async def on_connection_made():
+            with self.lock:
+                self.current += 1
+                self.peak = max(self.peak, self.current)
+                self.order.append(name)
+            await asyncio.sleep(self.delay)
+            with self.lock:
+                self.current -= 1
+
+        return on_connection_made
+
+
+@pytest.mark.asyncio
+async def test_max_connecting(aio_server, controller):
+    addr = aio_server.sockets[0].getsockname()
+    tracker = Tracker()
+    socks = [TCP(*addr, on_connection_made=tracker.callback(i)) for i in range(10)]
+    await asyncio.gather(*(sock.open() for sock in socks))
+    assert all(sock.connected() for sock in socks)
+    assert tracker.peak == 2
+    assert controller.stats() == dict(
+        max_connecting=2, connecting=0, waiting=0, admitted=10
+    )
+    for sock in socks:
+        await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_pending_priority(aio_server, controller):
+    addr = aio_server.sockets[0].getsockname()
+    tracker = Tracker()
+    idle = [TCP(*addr, on_connection_made=tracker.callback("idle")) for _ in range(4)]
+    busy = TCP(*addr, on_connection_made=tracker.callback("busy"))
+    opens = [asyncio.ensure_future(sock.open()) for sock in idle]
+    await asyncio.sleep(0.005)
+    assert controller.waiting() == 2
+    assert await busy.write_readline(IDN_REQ) == IDN_REP
+    await asyncio.gather(*opens)
+    # the socket with a pending request went before the waiting idle ones
+    assert tracker.order == ["idle", "idle", "busy", "idle", "idle"]
+    for sock in idle + [busy]:
+        await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_timeout_while_waiting(aio_server, controller):
+    addr = aio_server.sockets[0].getsockname()
+    tracker = Tracker(delay=0.2)
+    socks = [TCP(*addr, on_connection_made=tracker.callback(i)) for i in range(2)]
+    opens = [asyncio.ensure_future(sock.open()) for sock in socks]
+    await asyncio.sleep(0.005)
+    late = TCP(*addr)
+    with pytest.raises(ConnectionTimeoutError):
+        await late.write_readline(IDN_REQ, timeout=0.05)
+    assert controller.waiting() == 0
+    await asyncio.gather(*opens)
+    assert controller.connecting == 0
+    assert await late.write_readline(IDN_REQ) == IDN_REP
+    for sock in socks + [late]:
+        await sock.close()
+
+
+def test_across_event_loops(sio_server):
+    controller = admission.configure(max_connecting=1)
+    addr = sio_server.sockets[0].getsockname()
+    tracker = Tracker()
+    try:
+        sio_socks = [
+            sockio.sio.TCP(*addr, on_connection_made=tracker.callback("sio"))
+            for _ in range(3)
+        ]
+        futures = [
+            sockio.sio.DefaultEventLoop.run_coroutine(sock._ref.open())
+            for sock in sio_socks
+        ]
+
+        async def open_aio():
+            socks = [TCP(*addr, on_connection_made=tracker.callback("aio"))
+                     for _ in range(3)]
+            await asyncio.gather(*(sock.open() for sock in socks))
+            for sock in socks:
+                await sock.close()
+
+        asyncio.run(open_aio())
+        for future in futures:
+            future.result()
+        assert tracker.peak == 1
+        assert sorted(tracker.order) == 3 * ["aio"] + 3 * ["sio"]
+        assert controller.stats()["admitted"] == 6
+        for sock in sio_socks:
+            sock.close()
+    finally:
+        admission.disable()
+
+
+@pytest.mark.asyncio
+async def test_jitter(aio_server):
+    admission.configure(max_connecting=100, jitter=0.1)
+    addr = aio_server.sockets[0].getsockname()
+    try:
+        socks = [TCP(*addr) for _ in range(10)]
+        start = time.monotonic()
+        await asyncio.gather(*(sock.open() for sock in socks))
+        assert 0.01 < time.monotonic() - start < 0.5
+        # requests don't wait
+        for sock in socks:
+            await sock.close()
+        start = time.monotonic()
+        await socks[0].write_readline(IDN_REQ)
+        assert time.monotonic() - start < 0.05
+        await socks[0].close()
+    finally:
+        admission.disable()
@@ -1,14 +1,25 @@
+import sys
+import socket
 import time
+import tracemalloc
 import asyncio.subprocess
 
 import pytest
 
+import sockio.tuning
+from sockio.batch import LineBatch
+from sockio.common import DEFAULT_LIMIT, LEAN_LIMIT
 from sockio.aio import (
     TCP,
     ConnectionTimeoutError,
     ConnectionEOFError,
     LineStream,
     BlockStream,
+    FrameStream,
+    RecordStream,
+    TimeoutScope,
+    block_header,
+    deadline,
     socket_for_url
 )
 
@@ -502,6 +513,43 @@ async def test_readlines(aio_tcp):
         assert expected == reply
 
 
+@pytest.mark.asyncio
+async def test_readlines_compact(aio_tcp):
+    request = 3 * IDN_REQ + WRONG_REQ
+    reply = await aio_tcp.write_readlines(request, 4, compact=True)
+    assert isinstance(reply, LineBatch)
+    assert reply == 3 * [IDN_REP] + [WRONG_REP]
+
+    reply = await aio_tcp.writelines_readlines(2 * [IDN_REQ], compact=True)
+    assert reply == 2 * [IDN_REP]
+
+    await aio_tcp.write(2 * IDN_REQ)
+    reply = await aio_tcp.readlines(2, compact=True)
+    assert reply == 2 * [IDN_REP]
+
+
+@pytest.mark.asyncio
+async def test_readlines_available(aio_tcp):
+    await aio_tcp.open()
+    assert not await aio_tcp.readlines_available()
+    await aio_tcp.write(3 * IDN_REQ)
+    for i in range(50):
+        if aio_tcp.in_waiting() >= 3 * len(IDN_REP):
+            break
+        await asyncio.sleep(0.01)
+    reply = await aio_tcp.readlines_available()
+    assert reply == 3 * [IDN_REP]
+    assert aio_tcp.in_waiting() == 0
+
+
+@pytest.mark.asyncio
+async def test_readlines_compact_eof(aio_tcp):
+    await aio_tcp.write(b"data? 2\n")
+    reply = await aio_tcp.readlines(3, compact=True)
+    assert reply == 2 * [b"1.2345 5.4321 12345.54321\n"]
+    assert not aio_tcp.connected()
+
+
 @pytest.mark.asyncio
 async def test_read(aio_tcp):
     for request, expected in [(IDN_REQ, IDN_REP), (WRONG_REQ, WRONG_REP)]:
@@ -603,6 +651,63 @@ async def test_timeout(aio_tcp):
     await aio_tcp.close()
 
 
+@pytest.mark.asyncio
+async def test_deadline(aio_tcp):
+    loop = asyncio.get_event_loop()
+    # absolute deadline on a single call
+    with pytest.raises(ConnectionTimeoutError):
+        await aio_tcp.write_readline(b"sleep 1\n", deadline=loop.time() + 0.05)
+    assert not aio_tcp.connected()
+
+    # one budget covering reconnect and several calls
+    start = time.time()
+    with pytest.raises(ConnectionTimeoutError):
+        with deadline(0.1):
+            for i in range(10):
+                await aio_tcp.write_readline(b"sleep 0.03\n")
+    dt = time.time() - start
+    assert dt > 0.1 and dt < 0.15
+
+    # a tighter per call timeout still applies inside a deadline
+    with deadline(1):
+        with pytest.raises(ConnectionTimeoutError):
+            await aio_tcp.write_readline(b"sleep 1\n", timeout=0.05)
+        assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+
+    # no pending cancellation leaks from the timer
+    await asyncio.sleep(0.01)
+    assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+
+
+@pytest.mark.asyncio
+async def test_deadline_task(aio_tcp):
+    # tasks created inside a deadline or a call timeout do not inherit it
+    with deadline(0.05):
+        task = asyncio.ensure_future(aio_tcp.write_readline(b"sleep 0.1\n"))
+    assert await task == b"OK\n"
+
+    with TimeoutScope(0.05, None, "scope"):
+        # armed by the enclosing scope: must still enforce its own timeout
+        task = asyncio.ensure_future(
+            aio_tcp.write_readline(b"sleep 1\n", timeout=0.1)
+        )
+    start = time.time()
+    with pytest.raises(ConnectionTimeoutError):
+        await task
+    assert time.time() - start < 0.5
+
+
+@pytest.mark.asyncio
+async def test_stream_deadline(aio_tcp):
+    await aio_tcp.write(b"data? 10\n")
+    lines = []
+    with pytest.raises(ConnectionTimeoutError):
+        with deadline(0.12):
+            async for line in aio_tcp:
+                lines.append(line)
+    assert 1 <= len(lines) < 10
+
+
 @pytest.mark.asyncio
 async def test_line_stream(aio_tcp):
     request = b"data? 2\n"
@@ -629,6 +734,81 @@ async def test_block_stream(aio_tcp):
     assert not aio_tcp.connected()
 
 
+@pytest.mark.asyncio
+async def test_lean(aio_server):
+    host, port = aio_server.sockets[0].getsockname()
+    sock = TCP(host, port, lean=True)
+    assert not hasattr(sock, "__dict__")
+    reply = await sock.write_readline(IDN_REQ)
+    assert reply == IDN_REP
+    assert sock.reader._limit == LEAN_LIMIT
+
+    # buffer limit grows on demand...
+    reply = await sock.write_readline(b"big 100000\n")
+    assert len(reply) == 100001
+    # ... and shrinks back when everything has been consumed
+    assert sock.reader._limit == LEAN_LIMIT
+    assert len(sock.reader._buffer) == 0
+
+    with pytest.raises(ValueError):
+        await sock.write_readline("big {}\n".format(2 * DEFAULT_LIMIT).encode())
+    await sock.close()
+
+
+SCALE_SERVER = """
+import asyncio
+
+async def cb(reader, writer):
+    while True:
+        data = await reader.readline()
+        if not data:
+            break
+        writer.write(data)
+
+async def main():
+    server = await asyncio.start_server(cb, "127.0.0.1", 0, backlog=1024)
+    print(server.sockets[0].getsockname()[1], flush=True)
+    await server.serve_forever()
+
+asyncio.run(main())
+"""
+
+
+async def connection_memory(port, n, **kwargs):
+    socks = [TCP("127.0.0.1", port, **kwargs) for _ in range(n)]
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        await asyncio.gather(*(sock.write_readline(IDN_REQ) for sock in socks))
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+        await asyncio.gather(*(sock.close() for sock in socks))
+    return used / n
+
+
+@pytest.mark.asyncio
+async def test_lean_scale(record_testsuite_property):
+    n = 200
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", SCALE_SERVER, stdout=asyncio.subprocess.PIPE
+    )
+    try:
+        port = int(await server.stdout.readline())
+        # warm up: keep one time allocations out of the measurement
+        await connection_memory(port, 10)
+        await connection_memory(port, 10, lean=True)
+        default = await connection_memory(port, n)
+        lean = await connection_memory(port, n, lean=True)
+    finally:
+        server.kill()
+        await server.wait()
+    # memory per connection (bytes), reported in the junit xml
+    record_testsuite_property("memory_per_connection_default", round(default))
+    record_testsuite_property("memory_per_connection_lean", round(lean))
+    assert lean < default
+
+
 @pytest.mark.asyncio
 async def test_socket_for_url(aio_server):
     host, port = aio_server.sockets[0].getsockname()
@@ -651,3 +831,286 @@ async def test_socket_for_url(aio_server):
     assert aio_tcp.connected()
     assert aio_tcp.connection_counter == 1
     assert reply == IDN_REP
+
+
+@pytest.mark.asyncio
+async def test_subscribe(aio_tcp):
+    line = b"1.2345 5.4321 12345.54321\n"
+    await aio_tcp.write(b"data? 5\n")
+
+    async def consume(subscription):
+        return [record async for record in subscription]
+
+    subs = [aio_tcp.subscribe(), aio_tcp.subscribe(maxsize=1)]
+    results = await asyncio.gather(*(consume(sub) for sub in subs))
+    assert results == [5 * [line], 5 * [line]]
+    assert [sub.dropped for sub in subs] == [0, 0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", ["drop-oldest", "drop-newest"])
+async def test_subscribe_drop(aio_tcp, policy):
+    await aio_tcp.write(b"data? 5\n")
+    fast = aio_tcp.subscribe()
+    slow = aio_tcp.subscribe(maxsize=2, policy=policy)
+    records = [record async for record in fast]
+    assert len(records) == 5
+    assert slow.dropped == 3
+    assert len([record async for record in slow]) == 2
+
+
+@pytest.mark.asyncio
+async def test_subscribe_deadline(aio_tcp):
+    await aio_tcp.write(b"data? 5\n")
+    # the reader task does not inherit the deadline of the subscriber
+    with deadline(0.1):
+        sub = aio_tcp.subscribe()
+    assert len([record async for record in sub]) == 5
+    assert sub.finished is True
+
+
+@pytest.mark.asyncio
+async def test_subscribe_close(aio_tcp):
+    await aio_tcp.write(b"data? 5\n")
+    async with aio_tcp.subscribe(maxsize=1) as sub:
+        assert await sub.__anext__() == b"1.2345 5.4321 12345.54321\n"
+    # the reader stops after the next record without closing the socket
+    await asyncio.wait_for(aio_tcp._broadcast.task, 1)
+    assert aio_tcp._broadcast.task is None
+    assert aio_tcp.connected()
+    assert aio_tcp.connection_counter == 1
+    assert len(await aio_tcp.readlines(3)) == 3
+    with pytest.raises(ValueError):
+        aio_tcp.subscribe(policy="unknown")
+
+
+@pytest.mark.asyncio
+async def test_readframe(aio_tcp):
+    header, payload = await aio_tcp.write_readframe(b"frames 3\n", ">HI")
+    assert header == (0, 0)
+    assert isinstance(payload, memoryview)
+    assert payload == b""
+    header, payload = await aio_tcp.readframe(">HI")
+    assert header == (1, 10) and payload == 10 * b"B"
+    header, payload = await aio_tcp.readframe(">HI", length_field=1)
+    assert header == (2, 20) and payload == 20 * b"C"
+
+    # length from the frame index field (0) + 6: the payload is the next header
+    await aio_tcp.write(b"frames 2\n")
+    header, payload = await aio_tcp.readframe(">HI", length_field=0, length_adjust=6)
+    assert header == (0, 0) and payload == b"\x00\x01\x00\x00\x00\x0a"
+    assert await aio_tcp.readexactly(10) == 10 * b"B"
+
+
+@pytest.mark.asyncio
+async def test_frame_stream(aio_tcp):
+    await aio_tcp.write(b"frames 5\nkill\n")
+    stream = FrameStream(aio_tcp, ">HI")
+    frames = [(header, bytes(payload)) async for header, payload in stream]
+    assert frames == [((i, 10 * i), 10 * i * bytes([65 + i])) for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_readrecords(aio_tcp):
+    await aio_tcp.write(b"records 10\n")
+    data = await aio_tcp.readrecords(14, 3)
+    assert len(data) == 3 * 14
+    assert len(await aio_tcp.readexactly(7 * 14)) == 7 * 14
+
+
+@pytest.mark.asyncio
+async def test_record_stream(aio_tcp):
+    numpy = pytest.importorskip("numpy")
+    dtype = numpy.dtype([("time", "<f8"), ("channel", "<u2"), ("value", "<f4")])
+    await aio_tcp.write(b"records 1000\nkill\n")
+    batches = [batch async for batch in RecordStream(aio_tcp, dtype, max_records=300)]
+    assert all(0 < len(batch) <= 300 for batch in batches)
+    records = numpy.concatenate(batches)
+    assert records.dtype == dtype
+    assert len(records) == 1000
+    assert (records["value"] == numpy.arange(1000)).all()
+    assert (records["channel"] == numpy.arange(1000) % 4).all()
+
+
+@pytest.mark.asyncio
+async def test_stats_adaptive_timeout(aio_server):
+    host, port = aio_server.sockets[0].getsockname()
+    aio_tcp = TCP(host, port, timeout=1, adaptive_timeout=dict(min_samples=5))
+    stats = aio_tcp.stats()
+    assert stats["samples"] == 0 and stats["timeout"] == 1
+    for _ in range(5):
+        assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+    stats = aio_tcp.stats()
+    assert stats["samples"] == 5
+    assert 0.002 < stats["rtt_min"] <= stats["srtt"] < 0.1
+    assert 0.01 <= stats["timeout"] < 0.5
+    start = time.perf_counter()
+    with pytest.raises(ConnectionTimeoutError):
+        await aio_tcp.write_readline(b"sleep 0.5\n")
+    assert time.perf_counter() - start < 0.5
+    assert aio_tcp.stats()["timeouts"] == 1
+    # an explicit timeout is not adapted
+    assert await aio_tcp.write_readline(b"sleep 0.1\n", timeout=1) == b"OK\n"
+    await aio_tcp.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_probe(aio_server):
+    host, port = aio_server.sockets[0].getsockname()
+    aio_tcp = TCP(host, port, probe=IDN_REQ, probe_interval=0.05)
+    await aio_tcp.open()
+    await asyncio.sleep(0.22)
+    assert aio_tcp.stats()["samples"] >= 3
+    await aio_tcp.close()
+    samples = aio_tcp.stats()["samples"]
+    await asyncio.sleep(0.1)
+    assert aio_tcp.stats()["samples"] == samples
+
+
+@pytest.mark.asyncio
+async def test_profile(aio_server):
+    host, port = aio_server.sockets[0].getsockname()
+    with pytest.raises(ValueError):
+        TCP(host, port, profile="fastest")
+    with pytest.raises(ValueError):
+        TCP(host, port, profile=dict(nagle=False))
+    aio_tcp = TCP(host, port, profile=dict(profile="lowlatency", rcvbuf=2 ** 18))
+    assert aio_tcp.profile["quickack"] and aio_tcp.profile["rcvbuf"] == 2 ** 18
+    assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+    sock = aio_tcp.writer.transport.get_extra_info("socket")
+    assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) >= 2 ** 18
+    assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+    await aio_tcp.close()
+
+
+@pytest.mark.asyncio
+async def test_profile_no_quickack(aio_server, monkeypatch):
+    # platforms without TCP_QUICKACK (ex: macOS, Windows)
+    monkeypatch.setattr("sockio.tuning.TCP_QUICKACK", None)
+    host, port = aio_server.sockets[0].getsockname()
+    aio_tcp = TCP(host, port, profile="lowlatency")
+    assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+    protocol = aio_tcp.writer.transport.get_protocol()
+    assert getattr(protocol, "quickack", None) is None
+    assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+    await aio_tcp.close()
+
+
+@pytest.mark.asyncio
+async def test_profile_cork(aio_server, monkeypatch):
+    corks = []
+
+    def corked(sock):
+        corks.append(sock)
+        return sockio.tuning.corked(sock)
+
+    monkeypatch.setattr("sockio.aio.corked", corked)
+    host, port = aio_server.sockets[0].getsockname()
+    aio_tcp = TCP(host, port, profile="bulk")
+    with pytest.raises(ConnectionError):
+        aio_tcp.corked()
+    reply = await aio_tcp.writelines_readlines([IDN_REQ, IDN_REQ])
+    assert reply == [IDN_REP, IDN_REP]
+    await aio_tcp.writelines([IDN_REQ, IDN_REQ])
+    assert await aio_tcp.readlines(2) == [IDN_REP, IDN_REP]
+    assert len(corks) == 2
+    # only writelines are corked
+    assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+    assert len(corks) == 2
+    with aio_tcp.corked():
+        await aio_tcp.write(IDN_REQ[:2])
+        await aio_tcp.write(IDN_REQ[2:])
+    assert await aio_tcp.readline() == IDN_REP
+    await aio_tcp.close()
+
+
+@pytest.mark.asyncio
+async def test_profile_url(aio_server):
+    host, port = aio_server.sockets[0].getsockname()
+    url = "tcp://{}:{}?profile=throughput&sndbuf=65536&quickack=on".format(host, port)
+    aio_tcp = socket_for_url(url)
+    assert aio_tcp.profile["sndbuf"] == 65536
+    assert aio_tcp.profile["rcvbuf"] == 2 ** 22
+    assert aio_tcp.profile["quickack"] is True
+    assert await aio_tcp.write_readline(IDN_REQ) == IDN_REP
+    await aio_tcp.close()
+    with pytest.raises(ValueError):
+        socket_for_url("tcp://{}:{}?speed=max".format(host, port))
+
+
+async def block_handler(reader, writer):
+    # reads IEEE 488.2 blocks: replies "<command> <size> <sum of bytes>"
+    try:
+        while True:
+            command = await reader.readuntil(b"#")
+            n = int(await reader.readexactly(1))
+            size = int(await reader.readexactly(n))
+            data = await reader.readexactly(size)
+            assert await reader.readline() == b"\n"
+            writer.write(b"%s %d %d\n" % (command[:-1].strip(), size, sum(data)))
+    except asyncio.IncompleteReadError:
+        writer.close()
+
+
+async def slow_block_handler(reader, writer):
+    # reads one block slowly (4KB/ms): replies "<size> <sum of bytes>"
+    data = bytearray()
+    while not data.endswith(b"\n"):
+        chunk = await reader.read(4096)
+        if not chunk:
+            break
+        data += chunk
+        await asyncio.sleep(0.001)
+    n = int(data[data.index(b"#") + 1:][:1])
+    payload = data[data.index(b"#") + 2 + n: -1]
+    writer.write(b"%d %d\n" % (len(payload), sum(payload)))
+    writer.close()
+
+
+def test_block_header():
+    assert block_header(0) == b"#10"
+    assert block_header(1234) == b"#41234"
+    with pytest.raises(ValueError):
+        block_header(10 ** 9)
+
+
+@pytest.mark.asyncio
+async def test_write_block():
+    server = await asyncio.start_server(block_handler, "127.0.0.1", 0)
+    aio_tcp = TCP(*server.sockets[0].getsockname())
+    try:
+        data = bytes(range(256)) * 20000
+        await aio_tcp.write_block(b":WAV:DATA ", memoryview(data), chunk_size=2 ** 16)
+        reply = b":WAV:DATA %d %d\n" % (len(data), sum(data))
+        assert await aio_tcp.readline() == reply
+        await aio_tcp.write_block(b"EMPTY ", b"")
+        assert await aio_tcp.readline() == b"EMPTY 0 0\n"
+        numpy = pytest.importorskip("numpy")
+        array = numpy.linspace(-1, 1, 100000)
+        await aio_tcp.write_block(b"ARB ", array)
+        raw = array.tobytes()
+        assert await aio_tcp.readline() == b"ARB %d %d\n" % (len(raw), sum(raw))
+        with pytest.raises(TypeError):
+            await aio_tcp.write_block(b"ARB ", array[::2])
+    finally:
+        await aio_tcp.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_write_block_release():
+    # the buffer can be reused as soon as write_block returns
+    server = await asyncio.start_server(slow_block_handler, "127.0.0.1", 0)
+    # small send buffer: the end of the block is still in the transport
+    # buffer when write_block returns
+    aio_tcp = TCP(*server.sockets[0].getsockname(), profile=dict(sndbuf=4096))
+    try:
+        data = bytearray(b"\x01") * 2 ** 19
+        await aio_tcp.write_block(b"DATA ", data, chunk_size=2 ** 16)
+        data[:] = bytes(len(data))
+        assert await aio_tcp.readline() == b"%d %d\n" % (len(data), len(data))
+    finally:
+        await aio_tcp.close()
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,142 @@
+import time
+
+import pytest
+
+anyio = pytest.importorskip("anyio")
+
+import sockio.sio  # noqa: E402
+from sockio import socket_for_url  # noqa: E402
+from sockio.anyio import TCP, BlockStream, LineStream  # noqa: E402
+from sockio.common import ConnectionTimeoutError  # noqa: E402
+from sockio.sim import Simulator  # noqa: E402
+
+from conftest import IDN_REQ, IDN_REP, WRONG_REQ, WRONG_REP, SIM_TABLE  # noqa: E402
+
+
+BACKENDS = ["asyncio"]
+try:
+    import trio  # noqa: F401
+
+    BACKENDS.append("trio")
+except ImportError:
+    pass
+
+
+@pytest.fixture(params=BACKENDS)
+def anyio_backend(request):
+    return request.param
+
+
+TABLE = dict(SIM_TABLE)
+TABLE["commands"] = SIM_TABLE["commands"] + [
+    dict(regex=rb"sleep (.*)", reply=b"OK", latency=0.2),
+    dict(request=b"data?", reply=b"1.2345", stream=dict(count=3, rate=100)),
+    dict(request=b"block?", reply=b"message", stream=dict(count=3, rate=100)),
+]
+
+
+@pytest.fixture(scope="module")
+def thread_sim():
+    # simulator running in a separate thread so it serves any backend
+    loop = sockio.sio.DefaultEventLoop
+    sim = loop.run_coroutine(Simulator(TABLE).start()).result()
+    yield sim
+    loop.run_coroutine(sim.stop()).result()
+
+
+@pytest.mark.anyio
+async def test_write_readline(thread_sim):
+    sock = TCP(*thread_sim.address)
+    assert not sock.connected()
+    for request, expected in [(IDN_REQ, IDN_REP), (WRONG_REQ, WRONG_REP)]:
+        assert await sock.write_readline(request) == expected
+    assert sock.connected()
+    assert sock.connection_counter == 1
+    reply = await sock.writelines_readlines([IDN_REQ, WRONG_REQ])
+    assert reply == [IDN_REP, WRONG_REP]
+    assert await sock.write_readlines(2 * IDN_REQ, 2) == 2 * [IDN_REP]
+    await sock.close()
+    assert not sock.connected()
+
+
+@pytest.mark.anyio
+async def test_reads(thread_sim):
+    sock = TCP(*thread_sim.address)
+    await sock.write(IDN_REQ)
+    assert await sock.readexactly(5) == IDN_REP[:5]
+    assert await sock.readuntil(b"\n") == IDN_REP[5:]
+    await sock.write(IDN_REQ)
+    for i in range(100):
+        if sock.in_waiting() >= len(IDN_REP):
+            break
+        await anyio.sleep(0.001)
+    assert await sock.readbuffer() == IDN_REP
+    assert await sock.readbuffer() == b""
+    await sock.write(IDN_REQ)
+    assert await sock.read(1024) == IDN_REP
+    await sock.close()
+
+
+@pytest.mark.anyio
+async def test_open_fail(unused_tcp_port):
+    sock = TCP("127.0.0.1", unused_tcp_port)
+    with pytest.raises(ConnectionRefusedError):
+        await sock.write_readline(IDN_REQ)
+    assert not sock.connected()
+    assert sock.connection_counter == 0
+
+
+@pytest.mark.anyio
+async def test_timeout_and_reconnect(thread_sim):
+    sock = TCP(*thread_sim.address, timeout=0.05)
+    start = time.perf_counter()
+    with pytest.raises(ConnectionTimeoutError):
+        await sock.write_readline(b"sleep 1\n")
+    assert time.perf_counter() - start < 0.1
+    assert not sock.connected()
+    assert await sock.write_readline(IDN_REQ, timeout=1) == IDN_REP
+    assert sock.connection_counter == 2
+    await sock.close()
+
+
+@pytest.mark.anyio
+async def test_streams(thread_sim):
+    sock = TCP(*thread_sim.address)
+    await sock.write(b"data?\n")
+    lines = []
+    async for line in LineStream(sock):
+        lines.append(line)
+        if len(lines) == 3:
+            break
+    assert lines == 3 * [b"1.2345\n"]
+    await sock.write(b"block?\n")
+    blocks = []
+    async for block in BlockStream(sock, 8):
+        blocks.append(block)
+        if len(blocks) == 3:
+            break
+    assert blocks == 3 * [b"message\n"]
+    await sock.close()
+
+
+@pytest.mark.anyio
+async def test_callbacks(thread_sim):
+    state = dict(made=0, lost=0)
+    sock = TCP(
+        *thread_sim.address,
+        on_connection_made=lambda: state.__setitem__("made", state["made"] + 1),
+        on_connection_lost=lambda exc: state.__setitem__("lost", state["lost"] + 1),
+    )
+    await sock.open()
+    assert state == dict(made=1, lost=0)
+    await sock.close()
+    assert state == dict(made=1, lost=1)
+
+
+@pytest.mark.anyio
+async def test_socket_for_url(thread_sim):
+    url = "tcp://{}:{}".format(*thread_sim.address)
+    sock = socket_for_url(url, concurrency="trio")
+    assert isinstance(sock, TCP)
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    await sock.close()
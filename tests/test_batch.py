@@ -0,0 +1,52 @@
+import pytest
+
+from sockio.batch import LineBatch, split_lines
+
+
+LINES = [b"1.2345 5.4321\n", b"\n", b"12345.54321\n"]
+
+
+def test_split_lines():
+    data = b"".join(LINES) + b"partial"
+    assert list(split_lines(data)) == [0, 14, 15, 27]
+    assert list(split_lines(data, n=2)) == [0, 14, 15]
+    assert list(split_lines(data, eol=b"\r\n")) == [0]
+    assert list(split_lines(bytearray(b"a\r\nb\r\n"), eol=b"\r\n")) == [0, 3, 6]
+    long_data = 100 * b"".join(LINES)
+    assert len(split_lines(long_data)) == 301
+    assert len(split_lines(long_data, n=7)) == 8
+
+
+def test_line_batch():
+    batch = LineBatch.from_lines(LINES)
+    assert len(batch) == 3
+    assert batch.nbytes == 27
+    assert batch == LINES
+    assert list(batch) == LINES
+    assert batch.tolist() == LINES
+    assert batch[0] == LINES[0]
+    assert batch[-1] == LINES[-1]
+    assert batch[1:] == LINES[1:]
+    assert bytes(batch.view(2)) == LINES[2]
+    assert [bytes(view) for view in batch.views()] == LINES
+    with pytest.raises(IndexError):
+        batch[3]
+    assert not LineBatch()
+    assert LineBatch() == []
+
+
+def test_line_batch_concat():
+    a = LineBatch.from_lines(LINES[:1])
+    b = LineBatch.from_lines(LINES[1:])
+    batch = LineBatch.concat([a, LineBatch(), b])
+    assert batch == LINES
+    assert batch == LineBatch.from_lines(LINES)
+    assert LineBatch.concat([a]) is a
+
+
+def test_line_batch_numpy():
+    numpy = pytest.importorskip("numpy")
+    array = LineBatch.from_lines(LINES).to_numpy()
+    assert array.dtype == numpy.dtype("S14")
+    assert array.tolist() == LINES
+    assert len(LineBatch().to_numpy()) == 0
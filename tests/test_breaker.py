@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from sockio.aio import TCP
+from sockio.common import CircuitOpenError
+from sockio.breaker import CLOSED, OPEN, HALF_OPEN, CircuitBreaker
+
+from conftest import IDN_REQ, IDN_REP, server_coro
+
+
+def test_breaker_states(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("sockio.breaker.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=1, max_reset_timeout=3)
+    breaker.before()
+    breaker.failure()
+    assert breaker.state == CLOSED
+    breaker.before()
+    breaker.failure()
+    assert breaker.state == OPEN and breaker.trips == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.before("acme:5000")
+    now[0] += 1
+    breaker.before()  # probe
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()  # only one probe at a time
+    breaker.failure()
+    assert breaker.state == OPEN and breaker.retry_in() == 2
+    now[0] += 2
+    breaker.before()
+    breaker.failure()
+    assert breaker.retry_in() == 3  # max_reset_timeout
+    now[0] += 3
+    breaker.before()
+    breaker.success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.stats()["circuit_rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_tcp_circuit_breaker(unused_tcp_port):
+    sock = TCP(
+        "127.0.0.1",
+        unused_tcp_port,
+        circuit_breaker=dict(failure_threshold=2, reset_timeout=0.1),
+    )
+    assert sock.stats()["circuit"] == CLOSED
+    for _ in range(2):
+        with pytest.raises(ConnectionRefusedError):
+            await sock.write_readline(IDN_REQ)
+    assert sock.stats()["circuit"] == OPEN
+    server = await server_coro(port=unused_tcp_port)
+    try:
+        # fails fast while open, even if the server is back
+        with pytest.raises(CircuitOpenError):
+            await sock.write_readline(IDN_REQ)
+        with pytest.raises(CircuitOpenError):
+            await sock.open()
+        await asyncio.sleep(0.1)
+        assert await sock.write_readline(IDN_REQ) == IDN_REP
+        stats = sock.stats()
+        assert stats["circuit"] == CLOSED
+        assert stats["circuit_trips"] == 1 and stats["circuit_rejected"] == 2
+    finally:
+        await sock.close()
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_tcp_circuit_breaker_admission(unused_tcp_port, controller):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.before()
+    breaker.failure()
+    sock = TCP("127.0.0.1", unused_tcp_port, circuit_breaker=breaker)
+    # take all the admission slots
+    for _ in range(controller.max_connecting):
+        await controller.acquire()
+    task = asyncio.ensure_future(sock.open())
+    await asyncio.sleep(0.01)
+    assert breaker.state == HALF_OPEN and controller.waiting() == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    for _ in range(controller.max_connecting):
+        controller.release()
+    # cancelled while waiting for admission: not a failure, probe released
+    assert breaker.state == HALF_OPEN and breaker.failures == 1
+    with pytest.raises(ConnectionRefusedError):
+        await sock.open()
+    assert breaker.state == OPEN and breaker.trips == 2
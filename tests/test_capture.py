@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from sockio.aio import TCP
+from sockio.capture import (
+    CLOSE, OPEN, RECEIVED, SENT, Capture, CaptureFile, ReplayServer
+)
+
+from conftest import IDN_REQ, IDN_REP, WRONG_REQ, WRONG_REP
+
+
+async def record_session(aio_server, filename):
+    host, port = aio_server.sockets[0].getsockname()
+    with Capture(filename) as capture:
+        sock = TCP(host, port, capture=capture)
+        assert await sock.write_readline(IDN_REQ) == IDN_REP
+        assert await sock.write_readline(b"sleep 0.1\n") == b"OK\n"
+        replies = await sock.writelines_readlines([IDN_REQ, WRONG_REQ])
+        assert replies == [IDN_REP, WRONG_REP]
+        await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_capture(aio_server, tmp_path):
+    filename = tmp_path / "session.cap"
+    await record_session(aio_server, filename)
+    with CaptureFile(filename) as capture:
+        records = [(kind, bytes(data)) for _, kind, data in capture]
+        assert records[0] == (OPEN, b"")
+        assert records[-1] == (CLOSE, b"")
+        sent = b"".join(data for kind, data in records if kind == SENT)
+        received = b"".join(data for kind, data in records if kind == RECEIVED)
+        assert sent == IDN_REQ + b"sleep 0.1\n" + IDN_REQ + WRONG_REQ
+        assert received == IDN_REP + b"OK\n" + IDN_REP + WRONG_REP
+        times = [t for t, _, _ in capture]
+        assert times == sorted(times)
+        assert len(capture.sessions()) == 1
+
+
+@pytest.mark.asyncio
+async def test_capture_filename(aio_server, tmp_path):
+    filename = tmp_path / "session.cap"
+    sock = TCP(*aio_server.sockets[0].getsockname(), capture=str(filename))
+    for _ in range(2):
+        assert await sock.write_readline(IDN_REQ) == IDN_REP
+        await sock.close()
+        # the capture created by the TCP is closed with the connection
+        assert sock.capture.fobj is None
+    with CaptureFile(filename) as capture:
+        assert len(capture.sessions()) == 2
+        kinds = [kind for _, kind, _ in capture]
+        assert kinds == 2 * [OPEN, SENT, RECEIVED, CLOSE]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("timing", [True, False])
+async def test_replay(aio_server, tmp_path, timing):
+    filename = tmp_path / "session.cap"
+    await record_session(aio_server, filename)
+    async with ReplayServer(filename, timing=timing) as server:
+        for _ in range(2):
+            sock = TCP(*server.address)
+            assert await sock.write_readline(IDN_REQ) == IDN_REP
+            start = time.perf_counter()
+            assert await sock.write_readline(b"sleep 0.1\n") == b"OK\n"
+            dt = time.perf_counter() - start
+            assert (dt > 0.09) if timing else (dt < 0.05)
+            assert await sock.writelines_readlines([IDN_REQ, WRONG_REQ]) == [
+                IDN_REP, WRONG_REP
+            ]
+            await sock.close()
+        assert server.connections == 2
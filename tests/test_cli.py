@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from sockio.cli import Bench, LatencyHistogram, main, parse_request, repl
+
+from conftest import IDN_REQ, IDN_REP, WRONG_REP
+
+
+def test_parse_request():
+    assert parse_request("*idn?") == (IDN_REQ, 1.0)
+    assert parse_request("*idn?@3") == (IDN_REQ, 3.0)
+    assert parse_request("a@b") == (b"a@b\n", 1.0)
+    assert parse_request("*idn?\\r", b"\r") == (b"*idn?\r", 1.0)
+
+
+def test_histogram():
+    histogram = LatencyHistogram()
+    for dt in (10e-6, 20e-6, 30e-6, 1e-3):
+        histogram.record(dt)
+    histogram.record(15e-6, n=4)
+    assert histogram.count == 8
+    assert histogram.max == 1e-3
+    assert 10e-6 <= histogram.percentile(50) <= 32e-6
+    assert histogram.percentile(100) == 1e-3
+    other = LatencyHistogram()
+    other.record(2e-3)
+    histogram.merge(other)
+    assert histogram.count == 9
+    assert histogram.max == 2e-3
+    assert "#" in histogram.format()
+
+
+@pytest.mark.asyncio
+async def test_repl(aio_tcp):
+    stdin = io.StringIO("*idn?\n\nwrong question\n")
+    stdout = io.StringIO()
+    await repl(aio_tcp, reply="auto", stdin=stdin, stdout=stdout)
+    lines = stdout.getvalue().splitlines()
+    assert len(lines) == 1
+    assert lines[0].startswith(repr(IDN_REP))
+    # the non query was sent without reading its reply
+    assert await aio_tcp.readline() == WRONG_REP
+
+
+@pytest.mark.asyncio
+async def test_bench(aio_server):
+    host, port = aio_server.sockets[0].getsockname()
+    url = "tcp://{}:{}".format(host, port)
+    requests = [parse_request("*idn?@2"), parse_request("wrong question")]
+    out = io.StringIO()
+    bench = Bench(url, requests, concurrency=3, depth=2)
+    result = await bench.run(count=60, interval=0.01, out=out)
+    assert result["requests"] >= 60
+    assert result["errors"] == 0
+    assert result["throughput"] > 0
+    assert "req/s" in out.getvalue()
+
+    result = await Bench(url, requests, concurrency=2).run(duration=0.1, interval=0)
+    assert result["requests"] > 0
+    assert 0.1 <= result["elapsed"] < 0.2
+
+
+@pytest.mark.asyncio
+async def test_bench_errors(aio_server):
+    host, port = aio_server.sockets[0].getsockname()
+    url = "tcp://{}:{}".format(host, port)
+    # the server closes the connection on each request
+    bench = Bench(url, [parse_request("kill")])
+    result = await bench.run(duration=0.2, interval=0)
+    assert result["requests"] == 0
+    # backs off 10, 20, 40, 80ms... instead of reconnecting in a tight loop
+    assert 1 <= result["errors"] <= 6
+
+
+def test_main_bench(sio_server, capsys):
+    host, port = sio_server.sockets[0].getsockname()
+    url = "tcp://{}:{}".format(host, port)
+    assert main(["bench", url, "-r", "*idn?", "-c", "2", "-n", "10", "-i", "0"]) == 0
+    out = capsys.readouterr().out
+    assert "requests: 10" in out
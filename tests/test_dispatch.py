@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from sockio.aio import TCP, ConnectionTimeoutError
+
+
+async def tagged_handler(reader, writer):
+    # "<tag> <delay>" -> "<tag> <delay>" after delay seconds (out of order)
+    async def reply(line):
+        tag, delay = line.split()
+        await asyncio.sleep(float(delay))
+        writer.write(line)
+
+    tasks = set()
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if line.startswith(b"kill"):
+            break
+        task = asyncio.ensure_future(reply(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    for task in tasks:
+        task.cancel()
+    writer.close()
+
+
+@pytest.fixture
+async def tagged_server():
+    server = await asyncio.start_server(tagged_handler, "127.0.0.1", 0)
+    yield server
+    server.close()
+    await server.wait_closed()
+
+
+def encode(data, tag):
+    return b"%d " % tag + data
+
+
+def extract(line):
+    return int(line.split(b" ", 1)[0])
+
+
+@pytest.mark.asyncio
+async def test_correlator(tagged_server):
+    sock = TCP(*tagged_server.sockets[0].getsockname())
+    async with sock.correlate(encode, extract) as correlator:
+        delays = [0.05, 0.01, 0.03, 0.0] * 50
+        requests = [b"%.2f\n" % delay for delay in delays]
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        replies = await asyncio.gather(*(correlator.request(r) for r in requests))
+        assert loop.time() - start < 0.2
+        assert [reply.split(b" ", 1)[1] for reply in replies] == requests
+        assert not correlator.pending
+        assert sock.connection_counter == 1
+
+
+@pytest.mark.asyncio
+async def test_correlator_timeout_and_reconnect(tagged_server):
+    sock = TCP(*tagged_server.sockets[0].getsockname())
+    unmatched = []
+    correlator = sock.correlate(
+        encode, extract, tags=range(3), on_unmatched=unmatched.append
+    )
+    with pytest.raises(ConnectionTimeoutError):
+        await correlator.request(b"0.1\n", timeout=0.02)
+    assert not correlator.pending
+    await asyncio.sleep(0.1)
+    assert unmatched == [b"0 0.1\n"]
+
+    pending = asyncio.ensure_future(correlator.request(b"1\n"))
+    await asyncio.sleep(0.01)
+    await correlator._send(b"kill\n")
+    with pytest.raises(ConnectionError):
+        await pending
+    assert await correlator.request(b"0\n") == b"2 0\n"
+    assert sock.connection_counter == 2
+    await correlator.close()
+
+
+async def event_handler(reader, writer):
+    # every reply is preceded by an event line; "slow <t>" replies after t seconds
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        writer.write(b"EVENT before " + line)
+        if line.startswith(b"slow"):
+            await asyncio.sleep(float(line.split()[1]))
+        writer.write(b"REPLY " + line)
+    writer.close()
+
+
+@pytest.fixture
+async def event_server():
+    server = await asyncio.start_server(event_handler, "127.0.0.1", 0)
+    yield server
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_router_queue(event_server):
+    sock = TCP(*event_server.sockets[0].getsockname())
+    async with sock.route(b"EVENT ", maxsize=2) as router:
+        assert await router.write_readline(b"a\n") == b"REPLY a\n"
+        replies = await router.write_readlines(b"b\nc\n", 2)
+        assert replies == [b"REPLY b\n", b"REPLY c\n"]
+        assert await router.next_event() == b"EVENT before b\n"
+        assert await router.next_event() == b"EVENT before c\n"
+        assert router.dropped_events == 1
+        with pytest.raises(ConnectionTimeoutError):
+            await router.next_event(timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_router_callback_and_timeout(event_server):
+    sock = TCP(*event_server.sockets[0].getsockname())
+    events = []
+
+    def is_event(line):
+        return line.startswith(b"EVENT")
+
+    async with sock.route(is_event, on_event=events.append) as router:
+        with pytest.raises(ConnectionTimeoutError):
+            await router.write_readline(b"slow 0.05\n", timeout=0.01)
+        # the late reply of the timed out request must not be taken
+        assert await router.write_readline(b"d\n") == b"REPLY d\n"
+        assert events == [b"EVENT before slow 0.05\n", b"EVENT before d\n"]
+        assert sock.connection_counter == 1
+        with pytest.raises(RuntimeError):
+            await router.next_event()
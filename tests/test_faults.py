@@ -0,0 +1,101 @@
+import time
+import asyncio
+
+import pytest
+
+from sockio.aio import TCP, ConnectionTimeoutError
+from sockio.faults import FaultProxy, Reset, Restart, Shape, Shaping, Stall
+
+from conftest import IDN_REQ, IDN_REP
+
+
+@pytest.fixture
+async def proxy(sim_server):
+    async with FaultProxy(*sim_server.address) as proxy:
+        yield proxy
+
+
+@pytest.mark.asyncio
+async def test_proxy_forward(proxy):
+    sock = TCP(*proxy.address)
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    assert await sock.writelines_readlines(3 * [IDN_REQ]) == 3 * [IDN_REP]
+    await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_proxy_shaping(sim_server):
+    shaping = Shaping(latency=0.02, fragment=3, bandwidth=10000)
+    async with FaultProxy(*sim_server.address, downstream=shaping) as proxy:
+        sock = TCP(*proxy.address)
+        start = time.perf_counter()
+        assert await sock.write_readline(IDN_REQ) == IDN_REP
+        # latency + len(IDN_REP) / bandwidth
+        assert time.perf_counter() - start > 0.02 + 0.002
+        await proxy.inject(Shape())
+        start = time.perf_counter()
+        assert await sock.write_readline(IDN_REQ) == IDN_REP
+        assert time.perf_counter() - start < 0.02
+        await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_proxy_reset(proxy):
+    sock = TCP(*proxy.address)
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    await proxy.inject(Reset())
+    with pytest.raises(ConnectionError):
+        await sock.write_readline(IDN_REQ)
+    # auto-reconnect
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+
+    # reset in the middle of a reply
+    await proxy.inject(Reset(after=5))
+    with pytest.raises(ConnectionError):
+        await sock.write_readline(IDN_REQ)
+    assert not sock.connected()
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_proxy_stall(proxy):
+    sock = TCP(*proxy.address, timeout=0.05)
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    asyncio.ensure_future(proxy.inject(Stall(0.1)))
+    await asyncio.sleep(0)
+    with pytest.raises(ConnectionTimeoutError):
+        await sock.write_readline(IDN_REQ)
+    await asyncio.sleep(0.1)
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_proxy_schedule_restart(sim_server):
+    schedule = [(0.05, Restart(0.1))]
+    async with FaultProxy(*sim_server.address, schedule=schedule) as proxy:
+        sock = TCP(*proxy.address)
+        assert await sock.write_readline(IDN_REQ) == IDN_REP
+        await asyncio.sleep(0.1)
+        with pytest.raises(ConnectionError):
+            await sock.write_readline(IDN_REQ)
+        await asyncio.sleep(0.1)
+        assert await sock.write_readline(IDN_REQ) == IDN_REP
+        assert [type(fault) for _, fault in proxy.events] == [Restart]
+        await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_probe_stall(proxy):
+    # the probe started by an auto-reconnect gets the socket timeout too
+    sock = TCP(*proxy.address, timeout=0.2, probe=IDN_REQ, probe_interval=0.1)
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    proxy.stall()
+    await asyncio.sleep(0.6)
+    assert sock.stats()["timeouts"] == 1
+    assert sock._probe_task is None
+    assert not sock._lock.locked()
+    proxy.resume()
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    await sock.close()
@@ -0,0 +1,93 @@
+import asyncio
+import operator
+import concurrent.futures
+
+import pytest
+
+from sockio.aio import BlockStream, LineStream
+from sockio.common import ConnectionEOFError
+from sockio.pipeline import Pipeline
+
+
+class Source:
+    """asynchronous iterable of batches given in advance"""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+
+    async def _read_batch(self):
+        if not self.batches:
+            raise ConnectionEOFError()
+        await asyncio.sleep(0)
+        return self.batches.pop(0)
+
+
+async def collect(pipeline):
+    return [record async for record in pipeline]
+
+
+@pytest.mark.asyncio
+async def test_operators():
+    batches = [[1, 2, 3], [4], [5, 6, 7, 8, 9], [10]]
+    data = list(range(1, 11))
+
+    def pipeline():
+        return Pipeline(Source(batches))
+
+    assert await collect(pipeline()) == data
+    assert await collect(pipeline().map(str)) == [str(i) for i in data]
+    even = pipeline().filter(lambda i: i % 2 == 0)
+    assert await collect(even) == [2, 4, 6, 8, 10]
+    assert await collect(pipeline().decimate(3)) == [1, 4, 7, 10]
+    windows = [[1, 2, 3, 4], [5, 6, 7, 8]]
+    assert await collect(pipeline().window(4)) == windows
+    assert await collect(pipeline().window(4, 2)) == [
+        [1, 2, 3, 4], [3, 4, 5, 6], [5, 6, 7, 8], [7, 8, 9, 10]
+    ]
+    assert await collect(pipeline().window(2, 4)) == [[1, 2], [5, 6], [9, 10]]
+    assert await collect(pipeline().window(3).reduce(operator.add)) == [6, 15, 24]
+    sizes = [len(b) async for b in pipeline().rebatch(4).batches()]
+    assert sizes == [4, 4, 2]
+    doubled = pipeline().map_batch(lambda batch: batch + batch)
+    assert len(await collect(doubled)) == 20
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["thread", "process"])
+async def test_executor_ordered(kind):
+    pool_class = dict(
+        thread=concurrent.futures.ThreadPoolExecutor,
+        process=concurrent.futures.ProcessPoolExecutor,
+    )[kind]
+    batches = [list(range(i, i + 10)) for i in range(0, 1000, 10)]
+    with pool_class(4) as pool:
+        pipeline = Pipeline(Source(batches)).map(abs, executor=pool, concurrency=4)
+        assert await collect(pipeline) == list(range(1000))
+
+
+@pytest.mark.asyncio
+async def test_line_stream(aio_tcp):
+    await aio_tcp.write(b"data? 5\n")
+    stream = LineStream(aio_tcp).map(bytes.split).map(lambda fields: float(fields[0]))
+    assert await collect(stream.decimate(2)) == 3 * [1.2345]
+
+
+@pytest.mark.asyncio
+async def test_block_stream(aio_tcp):
+    await aio_tcp.write(b"data? -6\n")
+    stream = BlockStream(aio_tcp, 12).window(2).map(b"".join)
+    assert await collect(stream) == [
+        b"message 0000message 0001",
+        b"message 0002message 0003",
+        b"message 0004message 0005",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_reduce_rebatch(aio_tcp):
+    await aio_tcp.write(b"data? 4\n")
+    stream = LineStream(aio_tcp).map(bytes.split).reduce(max)
+    assert await collect(stream) == 4 * [b"5.4321"]
+    await aio_tcp.write(b"data? -5\n")
+    batches = BlockStream(aio_tcp, 12).rebatch(2).batches()
+    assert [len(batch) async for batch in batches] == [2, 2, 1]
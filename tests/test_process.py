@@ -0,0 +1,75 @@
+import pytest
+
+from sockio import socket_for_url
+from sockio.common import ConnectionTimeoutError
+from sockio.process import Worker
+
+from conftest import IDN_REQ, IDN_REP, WRONG_REQ, WRONG_REP
+
+
+async def idn_upper(tcp, n):
+    # runs in the worker process
+    return [(await tcp.write_readline(IDN_REQ)).upper() for _ in range(n)]
+
+
+@pytest.fixture(scope="module")
+def worker():
+    with Worker(arena_size=2 ** 19, shm_threshold=2 ** 10) as worker:
+        yield worker
+
+
+@pytest.fixture
+def proc_tcp(sio_server, worker):
+    addr = sio_server.sockets[0].getsockname()
+    sock = worker.tcp(*addr, timeout=1)
+    yield sock
+    sock.delete()
+
+
+def test_write_readline(proc_tcp):
+    assert not proc_tcp.connected()
+    for request, expected in [(IDN_REQ, IDN_REP), (WRONG_REQ, WRONG_REP)]:
+        assert proc_tcp.write_readline(request) == expected
+    assert proc_tcp.connected()
+    assert proc_tcp.connection_counter == 1
+    assert proc_tcp.stats()["samples"] == 2
+    reply = proc_tcp.writelines_readlines([IDN_REQ, WRONG_REQ])
+    assert reply == [IDN_REP, WRONG_REP]
+    proc_tcp.close()
+    assert not proc_tcp.connected()
+
+
+def test_bulk_replies(proc_tcp):
+    # 300 x 100KB through a 512KB arena: wraps around many times
+    for size in range(100000, 100300):
+        reply = proc_tcp.write_readline(b"big %d\n" % size)
+        assert reply == size * b"x" + b"\n"
+    replies = proc_tcp.write_readlines(b"big 5000\nbig 6000\n", 2)
+    assert replies == [5000 * b"x" + b"\n", 6000 * b"x" + b"\n"]
+    # bigger than the arena: pickled
+    assert len(proc_tcp.write_readline(b"big 900000\n")) == 900001
+
+
+def test_errors(proc_tcp):
+    with pytest.raises(ConnectionTimeoutError):
+        proc_tcp.write_readline(b"sleep 0.5\n", timeout=0.05)
+    assert proc_tcp.write_readline(IDN_REQ) == IDN_REP
+
+
+def test_call_and_futures(sio_server, proc_tcp, worker):
+    assert proc_tcp.call(idn_upper, 3) == 3 * [IDN_REP.upper()]
+    addr = sio_server.sockets[0].getsockname()
+    sock = worker.tcp(*addr, resolve_futures=False)
+    futures = [sock.write_readline(IDN_REQ) for _ in range(5)]
+    assert [future.result() for future in futures] == 5 * [IDN_REP]
+    sock.delete()
+
+
+def test_socket_for_url(sio_server):
+    host, port = sio_server.sockets[0].getsockname()
+    sock = socket_for_url("tcp://{}:{}".format(host, port), concurrency="process")
+    assert sock.write_readline(IDN_REQ) == IDN_REP
+    assert sock.port == port
+    worker = sock._owner.worker
+    del sock
+    assert worker.conn.closed
@@ -1,3 +1,5 @@
+import socket
+
 import pytest
 
 from sockio.py2 import TCP
@@ -176,3 +178,35 @@ def test_read(py2_tcp):
             reply += py2_tcp.read(1024)
             n += 1
         assert expected == reply
+
+
+def test_spin(sio_server):
+    addr = sio_server.sockets[0].getsockname()
+    sock = TCP(*addr, spin=200e-6)
+    try:
+        for request, expected in [(IDN_REQ, IDN_REP), (WRONG_REQ, WRONG_REP)]:
+            assert sock.write_readline(request) == expected
+        assert sock.writelines_readlines([IDN_REQ, WRONG_REQ]) == [IDN_REP, WRONG_REP]
+        sock.write(IDN_REQ)
+        reply = b""
+        while len(reply) < len(IDN_REP):
+            reply += sock.read(1024)
+        assert reply == IDN_REP
+        assert sock.connection_counter == 1
+        conn = sock.conn
+        assert conn.spin_hits + conn.spin_misses >= 4
+    finally:
+        sock.close()
+
+
+def test_spin_timeout(sio_server):
+    addr = sio_server.sockets[0].getsockname()
+    sock = TCP(*addr, timeout=0.1, spin=50e-6)
+    try:
+        with pytest.raises(socket.timeout):
+            sock.write_readline(b"sleep 0.5\n")
+        assert not sock.connected()
+        assert sock.write_readline(IDN_REQ) == IDN_REP
+        assert sock.connection_counter == 2
+    finally:
+        sock.close()
@@ -0,0 +1,86 @@
+import multiprocessing
+
+import pytest
+
+from sockio.aio import TCP
+from sockio.shm import OverrunError, Publisher, Subscriber
+
+
+def test_publish_subscribe():
+    with Publisher(capacity=1024) as pub:
+        with Subscriber(pub.name) as sub1, Subscriber(pub.name) as sub2:
+            assert sub1.read(timeout=0) is None
+            for i in range(10):
+                pub.write("record {}".format(i).encode())
+            expected = ["record {}".format(i).encode() for i in range(10)]
+            assert [sub1.read() for _ in range(10)] == expected
+            view = sub2.read_view()
+            assert isinstance(view, memoryview)
+            assert view == b"record 0"
+            assert sub2.valid()
+            view.release()
+            pub.close()
+            assert list(sub2) == expected[1:]
+            assert sub1.closed and sub2.closed
+            assert sub1.lost == sub2.lost == 0
+
+
+def test_overrun():
+    with Publisher(capacity=256) as pub:
+        strict = Subscriber(pub.name, overrun="raise")
+        with Subscriber(pub.name) as sub, strict:
+            for i in range(100):
+                pub.write(b"%03d" % i)
+            pub.close()
+            records = list(sub)
+            assert sub.lost > 0
+            assert len(records) + sub.lost == 100
+            assert records[-1] == b"099"
+            assert records == [b"%03d" % i for i in range(100 - len(records), 100)]
+            with pytest.raises(OverrunError) as error:
+                strict.read()
+            assert error.value.lost == sub.lost
+            assert strict.read() == records[0]
+
+
+def test_record_too_big():
+    with Publisher(capacity=64) as pub:
+        with pytest.raises(ValueError):
+            pub.write(100 * b"x")
+
+
+def consume(name, queue):
+    with Subscriber(name) as sub:
+        queue.put((list(sub), sub.lost))
+
+
+def test_multiprocess():
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    with Publisher(capacity=2 ** 16) as pub:
+        workers = [
+            ctx.Process(target=consume, args=(pub.name, queue)) for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        for i in range(1000):
+            pub.write(b"%04d" % i)
+        pub.close()
+        results = [queue.get(timeout=30) for _ in workers]
+        for worker in workers:
+            worker.join()
+    for records, lost in results:
+        assert lost == 0
+        assert records == [b"%04d" % i for i in range(1000)]
+
+
+@pytest.mark.asyncio
+async def test_publish_stream(aio_server):
+    host, port = aio_server.sockets[0].getsockname()
+    sock = TCP(host, port)
+    await sock.write(b"data? 5\n")
+    async with Publisher(sock, capacity=4096) as pub:
+        with Subscriber(pub.name) as sub:
+            await pub.run()
+            assert list(sub) == 5 * [b"1.2345 5.4321 12345.54321\n"]
+    await sock.close()
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from sockio.aio import TCP
+from sockio.sim import CommandTable, Simulator, block_header, make_delay
+
+from conftest import IDN_REQ, IDN_REP, WRONG_REQ, WRONG_REP
+
+
+def test_make_delay():
+    assert make_delay(None) is None
+    assert make_delay(0) is None
+    assert make_delay(0.1)() == 0.1
+    delay = make_delay(0.1, jitter=0.01)
+    assert all(0.09 <= delay() <= 0.11 for _ in range(100))
+    delay = make_delay(dict(dist="uniform", low=0.1, high=0.2))
+    assert all(0.1 <= delay() <= 0.2 for _ in range(100))
+    assert make_delay(dict(dist="exponential", mean=0.1))() >= 0
+    assert make_delay(dict(dist="normal", mu=0, sigma=1))() >= 0
+    with pytest.raises(ValueError):
+        make_delay(dict(dist="unknown"))
+
+
+def test_block_header():
+    assert block_header(5) == b"#15"
+    assert block_header(12345) == b"#512345"
+
+
+@pytest.mark.asyncio
+async def test_sim(sim_server):
+    sock = TCP(*sim_server.address)
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    assert await sock.write_readline(IDN_REQ.upper()) == IDN_REP
+    assert await sock.write_readline(WRONG_REQ) == WRONG_REP
+    assert await sock.write_readline(b"echo hello\n") == b"hello\n"
+    reply = await sock.writelines_readlines([IDN_REQ, b"echo 1\n", WRONG_REQ])
+    assert reply == [IDN_REP, b"1\n", WRONG_REP]
+    await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_sim_latency_order():
+    table = {
+        "slow?": dict(reply="slow", latency=0.05),
+        "fast?": "fast",
+    }
+    async with Simulator(table) as sim:
+        sock = TCP(*sim.address)
+        start = time.perf_counter()
+        reply = await sock.writelines_readlines([b"slow?\n", b"fast?\n", b"slow?\n"])
+        dt = time.perf_counter() - start
+        # replies are serialized like in a real instrument
+        assert reply == [b"slow\n", b"fast\n", b"slow\n"]
+        assert dt >= 0.1
+        await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_sim_block_and_stream():
+    table = {
+        "commands": [
+            dict(request="curve?", block=b"0123456789"),
+            dict(request="data?", reply="1.2345", stream=dict(count=5, rate=100)),
+            dict(request="none"),
+        ]
+    }
+    async with Simulator(table) as sim:
+        sock = TCP(*sim.address)
+        assert await sock.write_readline(b"curve?\n") == b"#2100123456789\n"
+        start = time.perf_counter()
+        lines = await sock.write_readlines(b"data?\n", 5)
+        assert lines == 5 * [b"1.2345\n"]
+        assert time.perf_counter() - start >= 0.04
+        # a command without reply
+        await sock.write(b"none\n")
+        assert await sock.write_readline(b"curve?\n") == b"#2100123456789\n"
+        await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_sim_yaml(tmp_path):
+    pytest.importorskip("yaml")
+    config = tmp_path / "sim.yml"
+    config.write_text(
+        """
+eol: "\\r"
+default: "ERR"
+commands:
+  - request: "*IDN?"
+    reply: "ACME"
+  - regex: "VOLT (.*)"
+    reply: "OK \\\\1"
+    latency: {dist: uniform, low: 0.001, high: 0.002}
+"""
+    )
+    table = CommandTable.from_yaml(str(config))
+    assert table.eol == b"\r"
+    async with Simulator(str(config)) as sim:
+        sock = TCP(*sim.address, eol=b"\r")
+        assert await sock.write_readline(b"*idn?\r") == b"ACME\r"
+        assert await sock.write_readline(b"VOLT 5\r") == b"OK 5\r"
+        assert await sock.write_readline(b"bla\r") == b"ERR\r"
+        await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_sim_throughput(sim_server):
+    n, depth = 20000, 100
+    sock = TCP(*sim_server.address)
+    start = time.perf_counter()
+    for _ in range(n // depth):
+        await sock.writelines_readlines(depth * [IDN_REQ], compact=True)
+    rate = n / (time.perf_counter() - start)
+    print("simulator throughput: {:.0f} req/s".format(rate))
+    assert rate > 10000
+    await sock.close()
@@ -1,6 +1,9 @@
+import time
+
 import pytest
 
-from sockio.sio import TCP
+from sockio.aio import ConnectionTimeoutError
+from sockio.sio import TCP, FIRST_COMPLETED, as_completed, deadline, submit_many, wait
 
 from conftest import IDN_REQ, IDN_REP, WRONG_REQ, WRONG_REP
 
@@ -272,3 +275,62 @@ def test_read(sio_tcp):
             reply += sio_tcp.read(1024)
             n += 1
         assert expected == reply
+
+
+def test_deadline(sio_tcp):
+    start = time.monotonic()
+    with pytest.raises(ConnectionTimeoutError):
+        with deadline(0.1):
+            for i in range(10):
+                sio_tcp.write_readline(b"sleep 0.03\n")
+    dt = time.monotonic() - start
+    assert dt > 0.1 and dt < 0.15
+    assert sio_tcp.write_readline(IDN_REQ) == IDN_REP
+
+
+def test_submit_many(sio_tcp):
+    futures = submit_many(sio_tcp.write_readline, 50 * [IDN_REQ])
+    assert len(futures) == 50
+    assert [future.result() for future in futures] == 50 * [IDN_REP]
+
+    futures = submit_many(sio_tcp.write_readline, [(IDN_REQ,), {"data": WRONG_REQ}])
+    assert [future.result() for future in futures] == [IDN_REP, WRONG_REP]
+
+
+def test_submit_many_aio_method(sio_tcp):
+    # methods of the underlying aio object keep their lock/reconnect wrapper
+    aio_tcp = sio_tcp._ref
+    assert not aio_tcp.connected()
+    loop = sio_tcp._event_loop
+    futures = loop.submit_many(aio_tcp.write, [IDN_REQ])
+    assert futures[0].result() is None
+    assert sio_tcp.readline() == IDN_REP
+    futures = loop.submit_many(aio_tcp.write_readline, 3 * [IDN_REQ])
+    assert [future.result() for future in futures] == 3 * [IDN_REP]
+
+
+def test_as_completed_wait(sio_tcp):
+    requests = [b"sleep 0.05\n", IDN_REQ]
+    futures = submit_many(sio_tcp.write_readline, requests)
+    assert {f.result() for f in as_completed(futures)} == {b"OK\n", IDN_REP}
+
+    futures = submit_many(sio_tcp.write_readline, 5 * [b"sleep 0.05\n"])
+    done, not_done = wait(futures, timeout=0.01)
+    assert not done and len(not_done) == 5
+    done, not_done = wait(futures, return_when=FIRST_COMPLETED)
+    assert done
+    result = wait(futures)
+    assert len(result.done) == 5 and not result.not_done
+
+    # repeated futures are given once
+    future = submit_many(sio_tcp.write_readline, [IDN_REQ])[0]
+    assert list(as_completed([future, future])) == [future]
+
+
+def test_submit_many_error(sio_tcp):
+    futures = submit_many(sio_tcp.write_readline, [b"sleep 0.1\n"])
+    with deadline(0.01):
+        futures += submit_many(sio_tcp.write_readline, [IDN_REQ])
+    assert futures[0].result() == b"OK\n"
+    with pytest.raises(ConnectionTimeoutError):
+        futures[1].result()
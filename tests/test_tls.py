@@ -0,0 +1,68 @@
+import ssl
+import shutil
+import subprocess
+
+import pytest
+
+from sockio import socket_for_url
+from sockio.aio import TCP
+
+from conftest import IDN_REQ, IDN_REP, server_coro
+
+
+@pytest.fixture(scope="module")
+def certificate(tmp_path_factory):
+    openssl = shutil.which("openssl")
+    if openssl is None:
+        pytest.skip("openssl not available")
+    path = tmp_path_factory.mktemp("tls")
+    cert, key = str(path / "cert.pem"), str(path / "key.pem")
+    subprocess.run(
+        [openssl, "req", "-x509", "-newkey", "ec", "-pkeyopt",
+         "ec_paramgen_curve:prime256v1", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+@pytest.fixture
+async def tls_server(certificate):
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(*certificate)
+    server = await server_coro(ssl=context)
+    yield server
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_tls_session_resumption(tls_server, certificate):
+    port = tls_server.sockets[0].getsockname()[1]
+    context = ssl.create_default_context(cafile=certificate[0])
+    sock = TCP("127.0.0.1", port, ssl=context)
+    for _ in range(3):
+        assert await sock.write_readline(IDN_REQ) == IDN_REP
+        # auto-reconnect on the next call
+        await sock.close()
+    stats = sock.stats()
+    assert stats["tls_handshakes"] == 3
+    assert stats["tls_resumed"] == 2
+    sock.ssl.clear()
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    assert sock.stats()["tls_resumed"] == 2
+    await sock.close()
+
+
+@pytest.mark.asyncio
+async def test_tls_url(tls_server, certificate):
+    port = tls_server.sockets[0].getsockname()[1]
+    sock = socket_for_url("tls://localhost:{}".format(port))
+    assert sock.ssl is not None
+    # self-signed certificate: not trusted by the default context
+    with pytest.raises(ssl.SSLCertVerificationError):
+        await sock.open()
+    context = ssl.create_default_context(cafile=certificate[0])
+    sock = socket_for_url("tls://localhost:{}".format(port), ssl=context)
+    assert await sock.write_readline(IDN_REQ) == IDN_REP
+    await sock.close()